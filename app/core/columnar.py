@@ -0,0 +1,267 @@
+# app/core/columnar.py
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import UTC
+from typing import Any
+from uuid import UUID
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.routing import Match
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # valfritt beroende; utan pyarrow ger kolumnformaten 415
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+PARQUET = "application/vnd.apache.parquet"
+COLUMNAR_MEDIA_TYPES = (ARROW_STREAM, ARROW_FILE, PARQUET)
+
+_UUID_RE = r"^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$"
+
+
+def media_type(content_type: str | None) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def is_columnar(content_type: str | None) -> bool:
+    return media_type(content_type) in COLUMNAR_MEDIA_TYPES
+
+
+class ColumnarRoute(APIRoute):
+    """
+    Route som bara matchar Arrow/Parquet-bodies. Registreras före JSON-routen
+    på samma path och metod; övriga requests faller igenom till den.
+    """
+
+    def matches(self, scope) -> tuple[Match, dict]:
+        match, child = super().matches(scope)
+        if match is Match.NONE:
+            return match, child
+        if not is_columnar(Headers(scope=scope).get("content-type")):
+            return Match.NONE, {}
+        return match, child
+
+
+# OpenAPI för JSON-routen: kolumnformaten som extra content types
+COLUMNAR_OPENAPI = {
+    "requestBody": {
+        "content": {
+            mt: {"schema": {"type": "string", "format": "binary"}}
+            for mt in COLUMNAR_MEDIA_TYPES
+        }
+    }
+}
+
+
+def _invalid(loc: tuple, msg: str, type_: str) -> RequestValidationError:
+    return RequestValidationError(
+        [{"type": type_, "loc": ("body", *loc), "msg": msg, "input": None}]
+    )
+
+
+def _decode(body: bytes, mt: str) -> pa.Table:
+    try:
+        if mt == PARQUET:
+            return pq.read_table(pa.BufferReader(body))
+        if mt == ARROW_FILE:
+            return pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        return pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+    except (pa.ArrowException, OSError) as e:
+        raise _invalid((), f"Invalid {mt} body: {e}", "columnar_invalid") from e
+
+
+async def read_table(request: Request) -> pa.Table:
+    """Avkodar bodyn en gång per request (rate limitern räknar också rader)."""
+    table = getattr(request.state, "columnar_table", None)
+    if table is not None:
+        return table
+    if pa is None:
+        raise HTTPException(status_code=415, detail="pyarrow is not installed")
+    body = await request.body()
+    mt = media_type(request.headers.get("content-type"))
+    table = await run_in_threadpool(_decode, body, mt)
+    request.state.columnar_table = table
+    return table
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    kind: str  # "str" | "uuid" | "float" | "timestamp" | "json"
+    required: bool = True
+    default: Any = None
+    gt: float | None = None
+    ge: float | None = None
+    le: float | None = None
+
+
+ODDS_COLUMNS = [
+    Column("match_id", "str"),
+    Column("bookmaker_id", "uuid"),
+    Column("selection_id", "uuid"),
+    Column("price", "float", gt=1.0),
+    Column("probability", "float", required=False, ge=0.0, le=1.0),
+    Column("captured_at", "timestamp"),
+    Column("source", "str", required=False),
+    Column("checksum", "str", required=False),
+]
+
+PREDICTION_COLUMNS = [
+    Column("match_id", "str"),
+    Column("model_id", "uuid"),
+    Column("version", "str", default="v1"),
+    Column("selection_id", "uuid"),
+    Column("probability", "float", ge=0.0, le=1.0),
+    Column("odds_fair", "float", required=False, gt=1.0),
+    Column("features", "json", required=False),
+    Column("predicted_at", "timestamp"),
+]
+
+
+def _first(mask) -> int:
+    return pc.index(mask, True).as_py()
+
+
+def _check_bounds(col, spec: Column) -> None:
+    checks = [
+        (spec.gt, pc.greater, "greater than", "greater_than"),
+        (spec.ge, pc.greater_equal, "greater than or equal to", "greater_than_equal"),
+        (spec.le, pc.less_equal, "less than or equal to", "less_than_equal"),
+    ]
+    for bound, op, text, type_ in checks:
+        if bound is None:
+            continue
+        bad = pc.invert(pc.fill_null(op(col, bound), True))
+        if pc.any(bad).as_py():
+            raise _invalid(
+                ("items", _first(bad), spec.name),
+                f"Input should be {text} {bound}",
+                type_,
+            )
+
+
+# Strängkolumner: med eller utan zon, upp till nanosekunder
+_TIMESTAMP_PARSE = [("us", "UTC"), ("us", None), ("ns", "UTC"), ("ns", None)]
+
+
+def _parse_timestamps(col):
+    for unit, tz in _TIMESTAMP_PARSE:
+        try:
+            return pc.cast(col, pa.timestamp(unit, tz=tz))
+        except pa.ArrowInvalid as e:
+            err = e
+    raise err
+
+
+def _timestamps(col) -> list:
+    if not pa.types.is_timestamp(col.type):
+        col = _parse_timestamps(col)
+    tz = col.type.tz
+    # trunkeras till mikrosekunder som JSON-vägen (timestamp[ns] är pandas/
+    # Arrow-standard); naiv = UTC-väggtid eftersom Arrow lagrar UTC
+    us = pa.timestamp("us")
+    values = pc.cast(col, options=pc.CastOptions(us, allow_time_truncate=True))
+    if tz is None:
+        return values.to_pylist()
+    # via naiv UTC + replace: betydligt billigare än to_pylist() med tidszon
+    return [
+        d.replace(tzinfo=UTC) if d is not None else None for d in values.to_pylist()
+    ]
+
+
+def _uuids(col) -> list:
+    # få unika id:n per batch: parsa ordboken en gång, slå upp per rad
+    if isinstance(col, pa.ChunkedArray):
+        col = col.combine_chunks()
+    enc = pc.dictionary_encode(col)
+    if pa.types.is_fixed_size_binary(col.type):
+        parsed = [UUID(bytes=b) for b in enc.dictionary.to_pylist()]
+    else:
+        parsed = [UUID(s) for s in enc.dictionary.to_pylist()]
+    return [parsed[i] if i is not None else None for i in enc.indices.to_pylist()]
+
+
+def _values(col, spec: Column) -> list:
+    if spec.kind == "float":
+        col = pc.cast(col, pa.float64())
+        _check_bounds(col, spec)
+        return col.to_pylist()
+    if spec.kind == "timestamp":
+        return _timestamps(col)
+    if spec.kind == "uuid":
+        if pa.types.is_fixed_size_binary(col.type) and col.type.byte_width == 16:
+            return _uuids(col)
+        col = pc.cast(col, pa.string())
+        bad = pc.invert(
+            pc.fill_null(
+                pc.match_substring_regex(col, _UUID_RE, ignore_case=True), True
+            )
+        )
+        if pc.any(bad).as_py():
+            raise _invalid(
+                ("items", _first(bad), spec.name),
+                "Input should be a valid UUID",
+                "uuid_parsing",
+            )
+        return _uuids(col)
+    if spec.kind == "json":
+        if pa.types.is_struct(col.type):
+            return col.to_pylist()
+        out = [json.loads(s) if s is not None else None for s in col.to_pylist()]
+        for i, v in enumerate(out):
+            if v is not None and not isinstance(v, dict):
+                raise _invalid(
+                    ("items", i, spec.name),
+                    "Input should be a valid dictionary",
+                    "dict_type",
+                )
+        return out
+    if pa.types.is_null(col.type):
+        return col.to_pylist()  # bara NULL (valfri kolumn)
+    if isinstance(col.type, pa.DictionaryType):
+        col = pc.cast(col, col.type.value_type)
+    if not (pa.types.is_string(col.type) or pa.types.is_large_string(col.type)):
+        # som JSON-vägen: ett tal är inte en giltig sträng
+        raise _invalid((spec.name,), "Input should be a valid string", "string_type")
+    return col.to_pylist()
+
+
+def rows_from_table(table: pa.Table, columns: list[Column]) -> list[dict]:
+    """
+    Validerar en Arrow-tabell kolumnvis (typer, NULL, gränser) och bygger
+    rad-dictarna som upsert-lagret tar emot, utan en Pydantic-modell per rad.
+    Fel rapporteras som JSON-vägens 422 med index för första felande rad.
+    """
+    n = table.num_rows
+    names, values = [], []
+    for spec in columns:
+        names.append(spec.name)
+        if spec.name not in table.column_names:
+            if spec.required and spec.default is None:
+                raise _invalid((spec.name,), "Field required", "missing")
+            values.append([spec.default] * n)
+            continue
+        col = table.column(spec.name)
+        if spec.required and col.null_count:
+            raise _invalid(
+                ("items", _first(pc.is_null(col)), spec.name),
+                "Field required",
+                "missing",
+            )
+        try:
+            values.append(_values(col, spec))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+            raise _invalid(
+                (spec.name,), f"Invalid {spec.kind} column: {e}", "type"
+            ) from e
+    return [dict(zip(names, vals, strict=True)) for vals in zip(*values, strict=True)]
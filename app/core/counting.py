@@ -0,0 +1,84 @@
+from __future__ import annotations
+import time
+import threading
+from collections import OrderedDict
+from typing import Hashable
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.settings import settings
+
+TOTAL_MODE_PATTERN = "^(exact|estimate|none)$"
+
+
+class CountCache:
+    """Liten TTL/LRU-cache för räknade totals, nyckel = tabell + filter."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, int]] = OrderedDict()
+
+    def get(self, key: Hashable) -> int | None:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: int) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL, settings.COUNT_CACHE_MAX)
+
+
+def _planner_estimate(db: Session, table: str, where_sql: str, params: dict) -> int:
+    plan = db.execute(
+        text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table} WHERE {where_sql}"), params
+    ).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(
+    db: Session, table: str, where_sql: str, params: dict, mode: str
+) -> int | None:
+    """
+    total för list-endpoints:
+    - exact:    COUNT(*) varje gång
+    - estimate: cachad count för samma filter, annars planerarens radestimat
+                (små mängder räknas exakt, de är billiga)
+    - none:     ingen count alls
+    """
+    if mode == "none":
+        return None
+
+    count_sql = text(f"SELECT COUNT(*) FROM {table} WHERE {where_sql}")
+    if mode == "exact":
+        return int(db.execute(count_sql, params).scalar_one())
+
+    key = (table, where_sql, tuple(sorted(params.items())))
+    cached = count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    total = _planner_estimate(db, table, where_sql, params)
+    if total <= settings.COUNT_ESTIMATE_EXACT_BELOW:
+        total = int(db.execute(count_sql, params).scalar_one())
+    count_cache.put(key, total)
+    return total
@@ -1,6 +1,12 @@
+from typing import Any, Callable, TypeVar
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .settings import settings as app_settings
+
+T = TypeVar("T")
 
 engine = create_engine(
     settings.db_url,
@@ -12,6 +18,18 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Async-variant (psycopg3 async). Skapar inga anslutningar förrän den används.
+async_engine = create_async_engine(
+    settings.db_url,
+    pool_size=30,
+    max_overflow=60,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -21,6 +39,40 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_session():
+    """
+    Session för async-handlers: AsyncSession om DB_ASYNC är på, annars en
+    vanlig Session (som då används via threadpoolen, se run_db).
+    """
+    if app_settings.DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def run_db(
+    db: Session | AsyncSession, fn: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """
+    Kör sync DB-logik `fn(session, ...)`:
+    - AsyncSession: via run_sync direkt på event-loopen (ingen threadpool-tråd)
+    - Session: i AnyIO-threadpoolen, som en vanlig sync-handler
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
 def ping_db():
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
@@ -40,6 +40,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         404: "not_found",
         405: "method_not_allowed",
         409: "conflict",
+        413: "payload_too_large",
+        415: "unsupported_media_type",
         422: "validation_error",
         429: "rate_limited",
         503: "service_unavailable",
@@ -49,13 +51,14 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         code = code_map.get(status, f"http_{status}")
         msg = (
             "HTTP error"
-            if status not in (400, 401, 403, 404, 409, 422, 429, 503)
+            if status not in (400, 401, 403, 404, 409, 413, 422, 429, 503)
             else {
                 400: "Bad request",
                 401: "Unauthorized",
                 403: "Forbidden",
                 404: "Not found",
                 409: "Conflict",
+                413: "Payload too large",
                 422: "Validation error",
                 429: "Too many requests",
                 503: "Service unavailable",
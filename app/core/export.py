@@ -0,0 +1,52 @@
+from __future__ import annotations
+import csv
+import io
+import json
+from typing import Callable, Iterator, Sequence
+from sqlalchemy import text
+from app.core.db import SessionLocal
+from app.core.settings import settings
+
+EXPORT_FORMAT_PATTERN = "^(ndjson|csv)$"
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _csv_lines(rows: Sequence[Sequence]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+def stream_query(
+    sql: str,
+    params: dict,
+    to_item: Callable[[dict], dict],
+    fmt: str,
+    columns: Sequence[str],
+    fetch_size: int | None = None,
+) -> Iterator[str]:
+    """
+    Strömmar en fråga som NDJSON eller CSV via en server-side cursor
+    (psycopg named cursor) – en bit om `fetch_size` rader åt gången, så
+    minnet är konstant oavsett antal rader.
+
+    Äger sin egen session: FastAPI stänger beroenden innan en
+    StreamingResponse har skickats klart.
+    """
+    fetch_size = fetch_size or settings.EXPORT_FETCH_SIZE
+    with SessionLocal() as db:
+        result = db.execute(
+            text(sql),
+            params,
+            execution_options={"stream_results": True, "yield_per": fetch_size},
+        )
+        if fmt == "csv":
+            yield _csv_lines([columns])
+        for part in result.mappings().partitions(fetch_size):
+            items = [to_item(r) for r in part]
+            if fmt == "csv":
+                yield _csv_lines([[it[c] for c in columns] for it in items])
+            else:
+                yield "".join(
+                    json.dumps(it, separators=(",", ":")) + "\n" for it in items
+                )
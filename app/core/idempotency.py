@@ -0,0 +1,60 @@
+from __future__ import annotations
+import asyncio
+import logging
+from app.core.redis_client import get_redis
+from app.core.settings import settings
+
+log = logging.getLogger(__name__)
+
+
+class IdempotencyCache:
+    """
+    Snabbväg för replays: idempotency_key -> bet_id i Redis med TTL.
+    Best effort: timeout/fel loggas och behandlas som miss, så att
+    Postgres alltid är sanningen.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    @property
+    def ttl(self) -> int:
+        return settings.BETS_IDEMPOTENCY_TTL
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _key(self, idempotency_key: str) -> str:
+        return f"{self.prefix}:{idempotency_key}"
+
+    async def get(self, idempotency_key: str) -> str | None:
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.wait_for(
+                get_redis().get(self._key(idempotency_key)),
+                timeout=settings.BETS_IDEMPOTENCY_TIMEOUT,
+            )
+        except Exception as e:
+            log.debug("idempotency cache get failed: %s", e)
+            return None
+
+    async def put_many(self, entries: dict[str, str]) -> None:
+        if not self.enabled or not entries:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for idem_key, bet_id in entries.items():
+                pipe.set(self._key(idem_key), bet_id, ex=self.ttl)
+            await asyncio.wait_for(
+                pipe.execute(), timeout=settings.BETS_IDEMPOTENCY_TIMEOUT
+            )
+        except Exception as e:
+            log.debug("idempotency cache put failed: %s", e)
+
+    async def put(self, idempotency_key: str, bet_id: str) -> None:
+        await self.put_many({idempotency_key: bet_id})
+
+
+bets_idempotency = IdempotencyCache("idem:bets")
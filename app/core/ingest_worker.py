@@ -0,0 +1,72 @@
+# app/core/ingest_worker.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable
+
+from app.core.db import SessionLocal
+from app.core.settings import settings
+from app.crud.ingest import drain_odds_queue
+
+log = logging.getLogger(__name__)
+
+
+class IngestWorkerPool:
+    """
+    Bakgrundsworkers (asyncio-tasks) som tömmer ingest-kön. Själva
+    upserten körs i en tråd med en egen sync-session per varv.
+    Routern väcker poolen vid enqueue; annars pollas kön med
+    INGEST_POLL_INTERVAL så att batcher från andra processer också tas.
+    """
+
+    def __init__(self, drain: Callable[..., int]):
+        self._drain = drain
+        self._tasks: list[asyncio.Task] = []
+        self._wake: asyncio.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _drain_once(self) -> int:
+        with SessionLocal() as db:
+            return self._drain(db)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                handled = await asyncio.to_thread(self._drain_once)
+            except Exception:
+                log.exception("ingest worker failed; retrying after poll interval")
+                handled = 0
+            if handled:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=settings.INGEST_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, workers: int | None = None) -> None:
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        n = workers or settings.INGEST_WORKERS
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(n)]
+
+    def notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wake = None
+
+
+odds_ingest_workers = IngestWorkerPool(drain_odds_queue)
@@ -0,0 +1,43 @@
+# app/core/json_pages.py
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# rows = Python mappar rader -> orjson, json = Postgres bygger items-arrayen
+READ_MODE_PATTERN = "^(rows|json)$"
+
+
+def fetch_json_page(
+    db: Session,
+    page_sql: str,
+    params: dict,
+    order_clause: str,
+    key_columns: tuple[str, str],
+) -> tuple[str, int, tuple[Any, Any] | None]:
+    """
+    Kör sidfrågan och låt Postgres serialisera raderna (row_to_json).
+
+    `page_sql` ska välja exakt item-kolumnerna (med casts för JSON-typerna).
+    Returnerar (items-JSON som text, antal rader, (tid, id) för sista raden
+    eller None) så att cursor och next_offset räknas som i rad-läget.
+    """
+    ts_col, id_col = key_columns
+    sql = text(
+        f"""
+        WITH page AS ({page_sql})
+        SELECT '[' || COALESCE(
+                   string_agg(row_to_json(page)::text, ',' ORDER BY {order_clause}),
+                   ''
+               ) || ']' AS items,
+               count(*) AS n,
+               (array_agg({ts_col} ORDER BY {order_clause}))[count(*)] AS last_ts,
+               (array_agg({id_col} ORDER BY {order_clause}))[count(*)] AS last_id
+        FROM page
+    """
+    )
+    row = db.execute(sql, params).one()
+    last = (row.last_ts, row.last_id) if row.n else None
+    return row.items, row.n, last
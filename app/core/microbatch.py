@@ -0,0 +1,121 @@
+# app/core/microbatch.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Hashable
+
+from app.core.db import SessionLocal
+from app.core.settings import settings
+from app.crud.odds import bulk_upsert_odds_grouped, odds_key
+
+log = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Group commit för små skrivningar i en process: samtidiga requests
+    samlas i ett fönster (WINDOW_MS eller MAX_ROWS rader) och körs som en
+    upsert i en tråd; varje anropare får tillbaka sina egna räknare.
+
+    - En batch i taget skrivs; under tiden fylls nästa fönster på.
+    - En request vars nycklar redan väntar förseglar fönstret först, så att
+      samma snapshot aldrig hamnar två gånger i ett statement och senaste
+      skrivning vinner som utan batchning. Likaså en request som skulle ta
+      fönstret över MAX_ROWS.
+    - Misslyckas en batch körs dess requests en och en, så att bara den
+      felande anroparen får felet.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[list[dict]]], list[dict]],
+        key: Callable[[dict], Hashable],
+    ):
+        self._flush = flush
+        self._key = key
+        self._pending: list[tuple[list[dict], asyncio.Future]] = []
+        self._pending_keys: set = set()
+        self._pending_rows = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._ready: deque[list[tuple[list[dict], asyncio.Future]]] = deque()
+        self._writer: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ODDS_MICROBATCH_WINDOW_MS > 0
+
+    def accepts(self, rows: list[dict]) -> bool:
+        if not self.enabled or not rows:
+            return False
+        if len(rows) > settings.ODDS_MICROBATCH_MAX_REQUEST_ROWS:
+            return False
+        # dubbletter inom en request går den vanliga vägen (slås ihop där)
+        return len({self._key(r) for r in rows}) == len(rows)
+
+    async def submit(self, rows: list[dict]) -> dict:
+        loop = asyncio.get_running_loop()
+        keys = {self._key(r) for r in rows}
+        # försegla först om requesten skulle spränga MAX_ROWS (eller krocka)
+        overflow = self._pending_rows + len(rows) > settings.ODDS_MICROBATCH_MAX_ROWS
+        if keys & self._pending_keys or overflow:
+            self._seal()
+
+        fut = loop.create_future()
+        self._pending.append((rows, fut))
+        self._pending_keys |= keys
+        self._pending_rows += len(rows)
+
+        if self._pending_rows >= settings.ODDS_MICROBATCH_MAX_ROWS:
+            self._seal()
+        elif self._timer is None:
+            self._timer = loop.call_later(
+                settings.ODDS_MICROBATCH_WINDOW_MS / 1000, self._seal
+            )
+        return await fut
+
+    def _seal(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self._ready.append(self._pending)
+        self._pending, self._pending_keys, self._pending_rows = [], set(), 0
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._write_ready())
+
+    async def _write_ready(self) -> None:
+        try:
+            while self._ready:
+                await self._write(self._ready.popleft())
+        finally:
+            self._writer = None
+
+    async def _write(self, batch: list[tuple[list[dict], asyncio.Future]]) -> None:
+        try:
+            results = await asyncio.to_thread(self._flush, [rows for rows, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                _, fut = batch[0]
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+            log.warning(
+                "micro-batch of %d requests failed; retrying one by one", len(batch)
+            )
+            for item in batch:
+                await self._write([item])
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():  # anroparen kan ha avbrutit (disconnect)
+                fut.set_result(result)
+
+
+def _flush_odds(groups: list[list[dict]]) -> list[dict]:
+    with SessionLocal() as db:
+        return bulk_upsert_odds_grouped(db, groups)
+
+
+odds_microbatcher = MicroBatcher(_flush_odds, odds_key)
@@ -1,52 +1,100 @@
+import asyncio
+import inspect
 import math
-from typing import Callable, Optional
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Sequence, Union
 from fastapi import Request, HTTPException, Response
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+from app.core.columnar import is_columnar, read_table
 from app.core.redis_client import get_redis
+from app.core.settings import settings
+from app.observability.metrics import (
+    RATELIMIT_BREAKER_OPEN,
+    RATELIMIT_BREAKER_TRIPS,
+    RATELIMIT_FALLBACK,
+    RATELIMIT_REDIS_ERRORS,
+)
 
+# Token bucket över en eller flera hinkar, atomiskt i ett anrop.
+# KEYS[i] = hink i; ARGV[1] = cost (minst), ARGV[2] = lease (högst, >= cost);
+# ARGV[2i+1], ARGV[2i+2] = capacity, refill (tokens/s) för KEYS[i].
+# Klockan tas från Redis TIME i scriptet (ingen extra round-trip, ingen
+# klock-skev mellan noder). Beviljar min(lease, tokens i snålaste hinken)
+# om det räcker till cost i ALLA hinkar, annars dras inget. cost är aldrig
+# större än minsta capacity (större requests får 413 i _limit_dependency).
+# Returnerar {allowed, granted, tokens_1, retry_after_1, reset_1, tokens_2, ...}.
 _LUA = """
-local key      = KEYS[1]
-local capacity = tonumber(ARGV[1])
-local refill   = tonumber(ARGV[2])  -- tokens per second
-local now_ms   = tonumber(ARGV[3])  -- current time in ms
-local cost     = tonumber(ARGV[4])  -- tokens to consume (usually 1)
-
-local data = redis.call('HMGET', key, 'tokens', 'ts')
-local tokens = tonumber(data[1])
-local ts     = tonumber(data[2])
-
-if tokens == nil then
-  tokens = capacity
-  ts = now_ms
-end
+if redis.replicate_commands then redis.replicate_commands() end
+
+local t      = redis.call('TIME')
+local now_ms = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost   = tonumber(ARGV[1])
+local lease  = tonumber(ARGV[2])
+
+local caps, refills, tokens = {}, {}, {}
+local allowed = 1
+local granted = lease
 
-local delta = now_ms - ts
-if delta < 0 then delta = 0 end
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[2 * i + 1])
+  local refill   = tonumber(ARGV[2 * i + 2])
 
-local add = delta * refill / 1000.0
-tokens = math.min(capacity, tokens + add)
+  local data = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local tk = tonumber(data[1])
+  local ts = tonumber(data[2])
+  if tk == nil then
+    tk = capacity
+    ts = now_ms
+  end
 
-local allowed = 0
-local retry_after = 0
+  local delta = now_ms - ts
+  if delta < 0 then delta = 0 end
+  tk = math.min(capacity, tk + delta * refill / 1000.0)
 
-if tokens >= cost then
-  tokens = tokens - cost
-  allowed = 1
-else
-  local need = cost - tokens
-  retry_after = math.ceil(need / refill)
+  caps[i], refills[i], tokens[i] = capacity, refill, tk
+  if tk < cost then allowed = 0 end
+  granted = math.min(granted, math.floor(tk))
 end
 
-redis.call('HMSET', key, 'tokens', tokens, 'ts', now_ms)
+if allowed == 0 then
+  granted = 0
+elseif granted < cost then
+  granted = cost
+end
+
+local out = {allowed, granted}
+for i = 1, #KEYS do
+  local tk = tokens[i]
+  local retry_after = 0
+  if allowed == 1 then
+    tk = tk - granted
+  elseif tk < cost then
+    retry_after = math.ceil((cost - tk) / refills[i])
+  end
+
+  redis.call('HMSET', KEYS[i], 'tokens', tk, 'ts', now_ms)
 
--- TTL = tid tills hinken blir full igen
-local reset = math.ceil((capacity - tokens) / refill)
-if reset < 1 then reset = 1 end
-redis.call('EXPIRE', key, reset)
+  -- TTL = tid tills hinken blir full igen
+  local reset = math.ceil((caps[i] - tk) / refills[i])
+  if reset < 1 then reset = 1 end
+  redis.call('EXPIRE', KEYS[i], reset)
 
-return {allowed, tokens, retry_after, reset}
+  table.insert(out, tk)
+  table.insert(out, retry_after)
+  table.insert(out, reset)
+end
+
+return out
 """
 
+# (nyckel, capacity, refill_per_sec)
+BucketSpec = tuple[str, int, float]
+
+# Sync eller async: request -> antal tokens
+CostGetter = Callable[[Request], Union[int, Awaitable[int]]]
+
 
 class RateLimiter:
     def __init__(self, redis: Redis):
@@ -57,25 +105,190 @@ class RateLimiter:
         if not self._sha:
             self._sha = await self.redis.script_load(_LUA)
 
-    async def _now_ms(self) -> int:
-        # Redis TIME för att undvika klock-skev på flera noder
-        sec, usec = await self.redis.time()
-        return sec * 1000 + math.floor(usec / 1000)
+    async def allow_many(
+        self, buckets: Sequence[BucketSpec], cost: int = 1, lease: int = 0
+    ) -> tuple[int, int, list[tuple[float, int, int]]]:
+        """
+        Kollar alla hinkar atomiskt i ett EVALSHA och drar upp till
+        max(cost, lease) tokens. Returnerar
+        (allowed, granted, [(tokens_left, retry_after, reset) per hink]).
+        """
+        await self._ensure_script()
+        keys = [b[0] for b in buckets]
+        args = [cost, max(cost, lease)]
+        args += [v for _, cap, refill in buckets for v in (cap, refill)]
+        try:
+            res = await self.redis.evalsha(self._sha, len(keys), *keys, *args)
+        except NoScriptError:
+            # scriptcachen tömd (restart/SCRIPT FLUSH): ladda om en gång i
+            # stället för att skicka hela scriptet med EVAL varje gång
+            self._sha = await self.redis.script_load(_LUA)
+            res = await self.redis.evalsha(self._sha, len(keys), *keys, *args)
+        states = [
+            (float(res[i]), int(res[i + 1]), int(res[i + 2]))
+            for i in range(2, 2 + 3 * len(keys), 3)
+        ]
+        return int(res[0]), int(res[1]), states
 
     async def allow(
         self, key: str, capacity: int, refill_per_sec: float, cost: int = 1
     ):
-        await self._ensure_script()
-        now_ms = await self._now_ms()
-        try:
-            allowed, tokens_left, retry_after, reset = await self.redis.evalsha(
-                self._sha, 1, key, capacity, refill_per_sec, now_ms, cost
-            )
-        except Exception:
-            allowed, tokens_left, retry_after, reset = await self.redis.eval(
-                _LUA, 1, key, capacity, refill_per_sec, now_ms, cost
-            )
-        return int(allowed), float(tokens_left), int(retry_after), int(reset)
+        allowed, _, [(tokens_left, retry_after, reset)] = await self.allow_many(
+            [(key, capacity, refill_per_sec)], cost
+        )
+        return allowed, tokens_left, retry_after, reset
+
+
+class LocalLeases:
+    """
+    Processlokala token-lån ur Redis-hinkarna (per worker). Ett lån gäller
+    en uppsättning hinknycklar och förbrukas lokalt tills det tar slut eller
+    går ut (ttl); först då går nästa request till Redis. Outnyttjade tokens
+    i ett utgånget lån är förbrukade, så felet blir alltid åt det snålare
+    hållet: högst lease_size tokens per worker och hink.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+
+    def take(self, key: tuple, cost: int) -> tuple[int, float, int] | None:
+        """Dra `cost` ur lånet; (limit, remaining, reset) eller None vid miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, tokens, capacity, redis_tokens, reset = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        if tokens < cost:
+            return None
+        entry[1] = tokens - cost
+        self._entries.move_to_end(key)
+        return capacity, redis_tokens + entry[1], reset
+
+    def put(
+        self, key: tuple, tokens: int, capacity: int, redis_tokens: float, reset: int
+    ) -> None:
+        if tokens <= 0 or self.ttl <= 0 or self.max_entries <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = [
+            time.monotonic() + self.ttl,
+            tokens,
+            capacity,
+            redis_tokens,
+            reset,
+        ]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold fel i rad) -> open -> (reset_timeout) ->
+    half-open: ett provanrop; lyckas det stängs kretsen, annars öppnas den igen.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial = False
+        if self._opened_at is not None:
+            self._opened_at = None
+            RATELIMIT_BREAKER_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        state = self.state
+        self._trial = False
+        self._failures += 1
+        if state == "half-open" or (
+            state == "closed" and self._failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            RATELIMIT_BREAKER_TRIPS.inc()
+            RATELIMIT_BREAKER_OPEN.set(1)
+
+
+# Redis-hälsan är gemensam för alla hinkar i processen
+redis_breaker = CircuitBreaker(settings.RL_BREAKER_FAILURES, settings.RL_BREAKER_RESET)
+
+
+class LocalTokenBuckets:
+    """
+    Processlokal token bucket med samma semantik som Lua-scriptet, används
+    när Redis inte svarar. `share` skalar capacity/refill per worker
+    (1.0 = varje worker får hela budgeten, 0 = släpp igenom allt).
+    """
+
+    def __init__(self, share: float, max_entries: int):
+        self.share = share
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def allow_many(
+        self, buckets: Sequence[BucketSpec], cost: int = 1
+    ) -> tuple[int, int, list[tuple[float, int, int]]]:
+        if self.share <= 0:
+            return 1, cost, [(float(cap), 0, 1) for _, cap, _ in buckets]
+
+        now = time.monotonic()
+        scaled = [
+            (key, cap * self.share, refill * self.share) for key, cap, refill in buckets
+        ]
+        # med share < 1 kan en tillåten request kosta mer än den lokala hinken
+        # rymmer; då får den tömma hinken i stället för att aldrig släppas in
+        cost = min(cost, max(1, math.floor(min(cap for _, cap, _ in scaled))))
+
+        current = []
+        allowed = 1
+        for key, cap, refill in scaled:
+            tokens, ts = self._entries.get(key, (cap, now))
+            tokens = min(cap, tokens + (now - ts) * refill)
+            current.append((key, cap, refill, tokens))
+            if tokens < cost:
+                allowed = 0
+
+        states = []
+        for key, cap, refill, tokens in current:
+            retry_after = 0
+            if allowed:
+                tokens -= cost
+            elif tokens < cost:
+                retry_after = math.ceil((cost - tokens) / refill) if refill > 0 else 1
+            self._entries[key] = (tokens, now)
+            self._entries.move_to_end(key)
+            reset = max(1, math.ceil((cap - tokens) / refill)) if refill > 0 else 1
+            states.append((tokens, retry_after, reset))
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return allowed, (cost if allowed else 0), states
 
 
 def _headers(resp: Response, limit: int, remaining: int, reset: int):
@@ -84,39 +297,113 @@ def _headers(resp: Response, limit: int, remaining: int, reset: int):
     resp.headers["X-RateLimit-Reset"] = str(max(reset, 0))
 
 
-def rate_limit_dependency(
+def _too_large(cost: int, max_cost: int) -> str:
+    rows = settings.RL_ROWS_PER_TOKEN
+    if rows > 0:
+        return (
+            f"Request costs {cost} rate-limit tokens but the bucket holds "
+            f"{max_cost}; send at most {max_cost * rows} items per request"
+        )
+    return f"Request costs {cost} rate-limit tokens but the bucket holds {max_cost}"
+
+
+def _bucket_key(bucket_id: str, suffix: str) -> str:
+    # hash-tag {bucket_id}: alla hinkar för samma bucket_id hamnar i samma
+    # slot, så att multi-key-scriptet även fungerar mot Redis Cluster
+    return f"rl:{{{bucket_id}}}:{suffix}"
+
+
+def _limit_dependency(
     bucket_id: str,
-    capacity: int,
-    refill_per_sec: float,
-    cost_getter: Optional[Callable[[Request], int]] = None,
-    key_from_api_key: bool = True,
+    buckets: Sequence[tuple[bool, int, float]],
+    cost_getter: Optional[CostGetter] = None,
+    lease: Optional[int] = None,
 ) -> Callable[[Request, Response], None]:
     """
-    Skapar en FastAPI-dependency som applicerar token-bucket.
-    - bucket_id: t.ex. "odds_post" eller "predictions_post"
-    - capacity/refill_per_sec: hinkstorlek och påfyllning (tokens/sek)
-    - cost_getter: om du vill debitera >1 token per request (t.ex payload storlek)
-    - key_from_api_key: True => per-nyckel; False => global
+    Gemensam dependency för en eller flera hinkar (key_from_api_key,
+    capacity, refill_per_sec) som kollas i ett enda Redis-anrop.
+    Med lease > 0 lånas upp till `lease` tokens per anrop till en lokal
+    hink, så att Redis-anropen skalar med lånade tokens i stället för requests.
+    Redis-anropet har en hård timeout och går via en circuit breaker; vid
+    fel/timeout eller öppen krets avgör en lokal token bucket (fail-open).
+    Headers speglar den hink som begränsar mest.
     """
     limiter = RateLimiter(get_redis())
+    lease = settings.RL_LEASE_SIZE if lease is None else lease
+    leases = LocalLeases(settings.RL_LEASE_TTL, settings.RL_LEASE_MAX_KEYS)
+    fallback = LocalTokenBuckets(settings.RL_FALLBACK_SHARE, settings.RL_LEASE_MAX_KEYS)
 
     async def _dep(request: Request, response: Response):
         api_key = request.headers.get("X-API-Key", "anonymous")
         # Unik nyckel: per API-key eller global
-        suffix = api_key if key_from_api_key else "global"
-        key = f"rl:{bucket_id}:{suffix}"
+        specs = [
+            (_bucket_key(bucket_id, api_key if per_key else "global"), cap, refill)
+            for per_key, cap, refill in buckets
+        ]
 
         cost = 1
         if cost_getter:
             try:
-                cost = max(1, int(cost_getter(request)))
+                c = cost_getter(request)
+                if inspect.isawaitable(c):
+                    c = await c
+                cost = max(1, int(c))
             except Exception:
                 cost = 1
+        # En request som kostar mer än den minsta hinken rymmer kan aldrig
+        # släppas in utan skuld (och skulle svältas ut av små requests som
+        # håller hinken under full); avvisa den direkt så att klienten delar
+        # upp batchen i stället för att få 429 i all evighet
+        max_cost = min(spec[1] for spec in specs)
+        if cost > max_cost:
+            raise HTTPException(status_code=413, detail=_too_large(cost, max_cost))
+
+        lease_key = tuple(spec[0] for spec in specs)
+        if lease > 0:
+            hit = leases.take(lease_key, cost)
+            if hit is not None:
+                capacity, remaining, reset = hit
+                _headers(response, capacity, math.floor(remaining), reset)
+                return
 
-        allowed, tokens_left, retry_after, reset = await limiter.allow(
-            key=key, capacity=capacity, refill_per_sec=refill_per_sec, cost=cost
+        result = None
+        if redis_breaker.allow_request():
+            try:
+                result = await asyncio.wait_for(
+                    limiter.allow_many(specs, cost=cost, lease=lease),
+                    timeout=settings.RL_REDIS_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                redis_breaker.record_failure()
+                RATELIMIT_REDIS_ERRORS.labels("timeout").inc()
+            except Exception:
+                redis_breaker.record_failure()
+                RATELIMIT_REDIS_ERRORS.labels("error").inc()
+            else:
+                redis_breaker.record_success()
+
+        if result is None:
+            # Redis långsam/nere eller kretsen öppen: besluta lokalt
+            result = fallback.allow_many(specs, cost=cost)
+            RATELIMIT_FALLBACK.labels(
+                bucket_id, "allowed" if result[0] else "denied"
+            ).inc()
+        allowed, granted, states = result
+        if allowed:
+            i = min(range(len(states)), key=lambda j: states[j][0])
+        else:
+            i = max(range(len(states)), key=lambda j: states[j][1])
+        capacity = specs[i][1]
+        tokens_left, retry_after, reset = states[i]
+
+        if lease > 0 and allowed:
+            leases.put(lease_key, granted - cost, capacity, tokens_left, reset)
+        _headers(
+            response,
+            capacity,
+            math.floor(tokens_left + max(0, granted - cost)),
+            reset,
         )
-        _headers(response, capacity, math.floor(tokens_left), reset)
 
         if not allowed:
             retry = max(1, retry_after)
@@ -134,6 +421,48 @@ def rate_limit_dependency(
     return _dep
 
 
+def rate_limit_dependency(
+    bucket_id: str,
+    capacity: int,
+    refill_per_sec: float,
+    cost_getter: Optional[CostGetter] = None,
+    key_from_api_key: bool = True,
+    lease: Optional[int] = None,
+) -> Callable[[Request, Response], None]:
+    """
+    Skapar en FastAPI-dependency som applicerar token-bucket.
+    - bucket_id: t.ex. "odds_post" eller "predictions_post"
+    - capacity/refill_per_sec: hinkstorlek och påfyllning (tokens/sek)
+    - cost_getter: om du vill debitera >1 token per request (t.ex payload storlek,
+      se bulk_items_cost); får vara async
+    - key_from_api_key: True => per-nyckel; False => global
+    - lease: tokens att låna till lokal hink per Redis-anrop
+      (None => RL_LEASE_SIZE, 0 => varje request går till Redis)
+    """
+    return _limit_dependency(
+        bucket_id, [(key_from_api_key, capacity, refill_per_sec)], cost_getter, lease
+    )
+
+
+async def bulk_items_cost(request: Request) -> int:
+    """
+    Kostnad för bulk-endpoints: en token per RL_ROWS_PER_TOKEN rader i
+    {"items": [...]}. Läser den body som FastAPI redan parsat (Starlette
+    cachar request.json()), så payloaden parsas inte två gånger. Arrow/
+    Parquet-bodies avkodas här och återanvänds av routen (read_table).
+    """
+    rows_per_token = settings.RL_ROWS_PER_TOKEN
+    if rows_per_token <= 0:
+        return 1
+    if is_columnar(request.headers.get("content-type")):
+        n = (await read_table(request)).num_rows  # Arrow/Parquet-body
+    else:
+        body = await request.json()
+        items = body.get("items") if isinstance(body, dict) else None
+        n = len(items) if isinstance(items, list) else 0
+    return max(1, math.ceil(n / rows_per_token))
+
+
 async def noop_dependency(request: Request, response: Response):
     return None
 
@@ -142,7 +471,7 @@ def per_key_limiter(
     bucket_id: str,
     capacity: int,
     refill_per_sec: float,
-    cost_getter: Optional[Callable[[Request], int]] = None,
+    cost_getter: Optional[CostGetter] = None,
 ):
     return rate_limit_dependency(
         bucket_id, capacity, refill_per_sec, cost_getter, key_from_api_key=True
@@ -153,8 +482,29 @@ def global_limiter(
     bucket_id: str,
     capacity: int,
     refill_per_sec: float,
-    cost_getter: Optional[Callable[[Request], int]] = None,
+    cost_getter: Optional[CostGetter] = None,
 ):
     return rate_limit_dependency(
         bucket_id, capacity, refill_per_sec, cost_getter, key_from_api_key=False
     )
+
+
+def combined_limiter(
+    bucket_id: str,
+    per_key_capacity: int,
+    per_key_refill: float,
+    global_capacity: int,
+    global_refill: float,
+    cost_getter: Optional[CostGetter] = None,
+    lease: Optional[int] = None,
+):
+    """Per-nyckel- och global hink i ett atomiskt anrop (en round-trip)."""
+    return _limit_dependency(
+        bucket_id,
+        [
+            (True, per_key_capacity, per_key_refill),
+            (False, global_capacity, global_refill),
+        ],
+        cost_getter,
+        lease,
+    )
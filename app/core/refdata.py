@@ -0,0 +1,96 @@
+from __future__ import annotations
+import time
+import threading
+from collections import OrderedDict
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from app.core.settings import settings
+
+# kind -> (tabell, id-kolumn) för referensdata som sällan ändras
+REF_TABLES: dict[str, tuple[str, str]] = {
+    "bookmaker": ("core.bookmakers", "bookmaker_id"),
+    "selection": ("core.selections", "selection_id"),
+    "model": ("core.models", "model_id"),
+}
+
+
+class RefDataCache:
+    """
+    Processlokal cache över id:n som finns i referenstabellerna.
+    Cachar bara positiva träffar (nya rader syns direkt), med TTL per
+    post och LRU-gräns på antal poster.
+
+    Appen skriver aldrig referensdata (den seedas utanför API:t), så cachen
+    invalideras inte: en borttagen rad räknas som känd i högst
+    REFDATA_CACHE_TTL sekunder. Under den tiden stoppas skrivningen i
+    stället av FK-constrainten (IntegrityError -> 404, se app/core/errors.py).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, UUID], float] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def split(self, kind: str, ids: Iterable[UUID]) -> tuple[set[UUID], list[UUID]]:
+        """Returnerar (kända id:n, id:n som måste slås upp i DB)."""
+        hits: set[UUID] = set()
+        misses: list[UUID] = []
+        now = time.monotonic()
+        with self._lock:
+            for i in ids:
+                key = (kind, i)
+                expires = self._entries.get(key)
+                if expires is not None and expires > now:
+                    self._entries.move_to_end(key)
+                    hits.add(i)
+                else:
+                    if expires is not None:
+                        del self._entries[key]
+                    misses.append(i)
+        return hits, misses
+
+    def add(self, kind: str, ids: Iterable[UUID]) -> None:
+        if not self.enabled:
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for i in ids:
+                key = (kind, i)
+                self._entries[key] = expires
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+ref_cache = RefDataCache(settings.REFDATA_CACHE_TTL, settings.REFDATA_CACHE_MAX)
+
+
+def find_missing(db: Session, kind: str, ids: list[UUID]) -> list[UUID]:
+    """
+    Returnerar de id:n (i inskickad ordning) som inte finns i referenstabellen.
+    Endast cache-missar frågas mot Postgres.
+    """
+    if not ids:
+        return []
+    table, col = REF_TABLES[kind]
+
+    if not ref_cache.enabled:
+        lookup = list(ids)
+    else:
+        _, lookup = ref_cache.split(kind, ids)
+        if not lookup:
+            return []
+
+    stmt = text(f"SELECT {col} FROM {table} WHERE {col} IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    existing = {x[0] for x in db.execute(stmt, {"ids": lookup})}
+    ref_cache.add(kind, existing)
+    return [i for i in lookup if i not in existing]
@@ -0,0 +1,39 @@
+# app/core/responses.py
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+def _default(obj: Any) -> Any:
+    # NUMERIC-kolumner kommer som Decimal; API:t har alltid returnerat float
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class LeanJSONResponse(Response):
+    """
+    JSON-svar för listendpoints som serialiseras direkt med orjson.
+
+    UUID och datetime serialiseras nativt (samma format som str()/isoformat()),
+    Decimal blir float. En Response som returneras direkt passerar inte
+    response_model-valideringen; modellen ligger kvar på routen för OpenAPI.
+    Använd bara för rader läst ur databasen med exakt modellens kolumner.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+def json_items_response(items_json: str, **meta: Any) -> Response:
+    """Sidsvar där items redan är JSON-text (från Postgres); bara metadatan serialiseras."""
+    body = b'{"items":' + items_json.encode("utf-8")
+    if meta:
+        body += b"," + orjson.dumps(meta, default=_default)[1:]
+    else:
+        body += b"}"
+    return Response(body, media_type="application/json")
@@ -1,8 +1,13 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 
+# Det grupperade odds-statementet (mikrobatchning) binder 9 parametrar per rad
+# och Postgres tillåter max 65535 per statement (se app/crud/chunking.py)
+ODDS_MICROBATCH_ROW_LIMIT = 65535 // 9
+
 
 class Settings(BaseSettings):
 
@@ -18,6 +23,110 @@ class Settings(BaseSettings):
     RL_ODDS_PER_KEY_REFILL: float = 20.0
     RL_ODDS_GLOBAL_CAP: int = 100
     RL_ODDS_GLOBAL_REFILL: float = 100.0
+    RL_PREDICTIONS_PER_KEY_CAP: int = 20
+    RL_PREDICTIONS_PER_KEY_REFILL: float = 20.0
+    RL_PREDICTIONS_GLOBAL_CAP: int = 100
+    RL_PREDICTIONS_GLOBAL_REFILL: float = 100.0
+    # Bulk-POST kostar en token per så många rader (0 = en token per request);
+    # en batch som kostar mer än minsta capacity avvisas med 413
+    RL_ROWS_PER_TOKEN: int = 100
+    # Lokal förhandsadmission: lånade tokens per Redis-anrop (0 = exakt, alltid
+    # Redis), lånets livslängd och max antal nycklar med lån per worker
+    RL_LEASE_SIZE: int = 0
+    RL_LEASE_TTL: float = 1.0
+    RL_LEASE_MAX_KEYS: int = 10000
+    # Redis-skydd: timeout per anrop (s), fel i rad innan kretsen öppnas,
+    # sekunder innan ett provanrop, andel av budgeten för lokal fallback per worker
+    RL_REDIS_TIMEOUT: float = 0.05
+    RL_BREAKER_FAILURES: int = 5
+    RL_BREAKER_RESET: float = 5.0
+    RL_FALLBACK_SHARE: float = 1.0
+
+    # Batcher >= tröskeln går via COPY + staging-tabell (0 = avstängt)
+    ODDS_COPY_THRESHOLD: int = 5000
+    # Max rader per upsert-statement; större batcher delas upp och pipelinas
+    UPSERT_CHUNK_SIZE: int = 1000
+
+    # Async DB-lager (AsyncEngine) för heta routes; av = sync-sessioner i threadpool
+    DB_ASYNC: bool = False
+
+    # Histogram-buckets (sekunder) för http_request_duration_seconds
+    METRICS_LATENCY_BUCKETS: str = (
+        "0.001,0.0025,0.005,0.0075,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5"
+    )
+
+    # total=estimate på list-endpoints: cache per filter + exakt count under gränsen
+    COUNT_CACHE_TTL: float = 30.0
+    COUNT_CACHE_MAX: int = 1000
+    COUNT_ESTIMATE_EXACT_BELOW: int = 10000
+
+    # Cache för FK-validering mot bookmakers/selections/models (0 = avstängt);
+    # TTL:en är också gränsen för hur länge en borttagen rad räknas som känd
+    REFDATA_CACHE_TTL: float = 300.0
+    REFDATA_CACHE_MAX: int = 10000
+
+    # Redis-cache för POST /bets-replays (idempotency_key -> bet_id), sekunder
+    # (0 = av, varje replay går till Postgres) och timeout per Redis-anrop
+    BETS_IDEMPOTENCY_TTL: int = 0
+    BETS_IDEMPOTENCY_TIMEOUT: float = 0.05
+
+    # Standardläge för GET /odds och /predictions (rows | json, se app/core/json_pages.py)
+    LIST_READ_MODE: str = "rows"
+
+    # Asynkron ingest för POST /odds (klienten skickar "Prefer: respond-async"):
+    # batchen köas i core.ingest_queue, svaret blir 202 och workers upsertar
+    INGEST_ASYNC_ENABLED: bool = False
+    INGEST_WORKERS: int = 2
+    INGEST_POLL_INTERVAL: float = 0.5
+    # Små köade batcher slås ihop till en upsert (max antal batcher / rader)
+    INGEST_COALESCE_BATCHES: int = 50
+    INGEST_COALESCE_ROWS: int = 5000
+    # Transienta fel: batchen ligger kvar och tas om efter BACKOFF sekunder
+    # (fördubblas per försök, högst BACKOFF_MAX); 'failed' efter MAX_ATTEMPTS
+    INGEST_MAX_ATTEMPTS: int = 5
+    INGEST_RETRY_BACKOFF: float = 1.0
+    INGEST_RETRY_BACKOFF_MAX: float = 60.0
+
+    # Mikrobatchning av små POST /odds: samtidiga requests med högst
+    # MAX_REQUEST_ROWS rader samlas i WINDOW_MS (0 = av) eller tills
+    # MAX_ROWS rader (högst ODDS_MICROBATCH_ROW_LIMIT) och körs som en
+    # upsert/commit
+    ODDS_MICROBATCH_WINDOW_MS: float = 0
+    ODDS_MICROBATCH_MAX_ROWS: int = 1000
+    ODDS_MICROBATCH_MAX_REQUEST_ROWS: int = 20
+
+    # Dubbletter (samma snapshot-nyckel) inom en odds-batch slås ihop; senaste
+    # raden vinner om inte källan rankas lägre här (kommaseparerad, högst först)
+    ODDS_DEDUP_SOURCE_PRIORITY: str = ""
+
+    # Processlokal cache över senast skrivna odds-värden per snapshot-nyckel;
+    # exakta omsändningar inom TTL (sekunder, 0 = av) når aldrig databasen.
+    # Ser inte skrivningar från andra processer, så håll TTL:en kort.
+    ODDS_RECENT_CACHE_TTL: float = 0
+    ODDS_RECENT_CACHE_MAX: int = 100000
+
+    # Rader per hämtning från server-side cursorn i /odds/export
+    EXPORT_FETCH_SIZE: int = 5000
+
+    # core.odds är månadspartitionerad på captured_at
+    ODDS_PARTITION_MONTHS_AHEAD: int = 3
+    # Partitioner äldre än så kopplas loss och droppas (0 = behåll allt)
+    ODDS_PARTITION_RETENTION_MONTHS: int = 0
+    # Kör partitionsunderhåll vid uppstart (annars via scripts/maintain_odds_partitions.py)
+    ODDS_PARTITION_MAINTENANCE_ON_STARTUP: bool = False
+
+    @model_validator(mode="after")
+    def _check_microbatch_rows(self) -> "Settings":
+        if not 1 <= self.ODDS_MICROBATCH_MAX_ROWS <= ODDS_MICROBATCH_ROW_LIMIT:
+            raise ValueError(
+                f"ODDS_MICROBATCH_MAX_ROWS must be 1..{ODDS_MICROBATCH_ROW_LIMIT}"
+            )
+        if self.ODDS_MICROBATCH_MAX_REQUEST_ROWS > self.ODDS_MICROBATCH_MAX_ROWS:
+            raise ValueError(
+                "ODDS_MICROBATCH_MAX_REQUEST_ROWS must not exceed "
+                "ODDS_MICROBATCH_MAX_ROWS"
+            )
+        return self
 
 
 settings = Settings()
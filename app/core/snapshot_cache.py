@@ -0,0 +1,72 @@
+from __future__ import annotations
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+class SnapshotCache:
+    """
+    Processlokal cache: nyckel -> senast skrivna värden (t.ex. pris/checksum
+    per odds-snapshot). Används för att släppa exakta omsändningar innan de
+    når databasen. TTL per post och LRU-gräns på antal poster.
+
+    Ser bara skrivningar från den egna processen: ändrar en annan process
+    samma nyckel kan en omsändning av det gamla värdet släppas felaktigt
+    inom TTL:en, så håll den kort.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Hashable]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def unseen(
+        self,
+        items: list[T],
+        key: Callable[[T], Hashable],
+        value: Callable[[T], Hashable],
+    ) -> list[T]:
+        """Returnerar de items vars värden skiljer sig från det som cachats."""
+        if not self.enabled:
+            return items
+        out: list[T] = []
+        now = time.monotonic()
+        with self._lock:
+            for it in items:
+                k = key(it)
+                hit = self._entries.get(k)
+                if hit is not None and hit[0] > now and hit[1] == value(it):
+                    self._entries.move_to_end(k)
+                    continue
+                out.append(it)
+        return out
+
+    def remember(
+        self,
+        items: Iterable[T],
+        key: Callable[[T], Hashable],
+        value: Callable[[T], Hashable],
+    ) -> None:
+        """Anropas efter commit med raderna som nu ligger i databasen."""
+        if not self.enabled:
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for it in items:
+                k = key(it)
+                self._entries[k] = (expires, value(it))
+                self._entries.move_to_end(k)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,9 +1,19 @@
 from __future__ import annotations
+import uuid
+from datetime import datetime
 from typing import Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import select, text, func
+from sqlalchemy import select, text
 from app.models.bets import Bet
+from app.core.counting import count_rows
+from app.core.pagination import encode_cursor
+
+
+_BET_COLUMNS = """
+    bet_id, external_id, user_ref, match_id, bookmaker_id, selection_id,
+    stake, price, placed_at, status, result, payout, idempotency_key
+"""
 
 
 def list_bets_page(
@@ -12,26 +22,66 @@ def list_bets_page(
     status: Optional[str],
     limit: int = 100,
     offset: int = 0,
+    after: Optional[Tuple[datetime, uuid.UUID]] = None,
+    total_mode: str = "exact",
 ):
-    base = select(Bet)
+    """
+    Sida av bets sorterat på (placed_at DESC, bet_id ASC).
+    Med after (avkodad cursor): keyset-paginering utan OFFSET och count,
+    som för user_ref går via idx_bets_user_placed_at.
+    Returnerar (rows, total, next_offset, next_cursor).
+    """
+    where = ["1=1"]
+    params: dict = {}
     if user_ref:
-        base = base.where(Bet.user_ref == user_ref)
+        where.append("user_ref = :user_ref")
+        params["user_ref"] = user_ref
     if status:
-        base = base.where(Bet.status == status)  # <-- rätt kolumn
+        where.append("status = :status")  # <-- rätt kolumn
+        params["status"] = status
 
-    total = db.execute(
-        select(func.count()).select_from(base.order_by(None).subquery())
-    ).scalar_one()
+    total = None
+    if after is None:
+        total = count_rows(db, "core.bets", " AND ".join(where), params, total_mode)
+    else:
+        cur_ts, cur_id = after
+        # blandad riktning -> ingen radjämförelse; den enkla gränsen ger indexintervallet
+        where.append("placed_at <= :cur_ts")
+        where.append(
+            "(placed_at < :cur_ts OR (placed_at = :cur_ts AND bet_id > :cur_id))"
+        )
+        params["cur_ts"] = cur_ts
+        params["cur_id"] = cur_id
 
-    page_stmt = (
-        base.order_by(Bet.placed_at.desc(), Bet.bet_id.asc())
-        .limit(limit)
-        .offset(offset)
+    offset_clause = "" if after else "OFFSET :offset"
+    stmt = text(
+        f"""
+        SELECT {_BET_COLUMNS}
+        FROM core.bets
+        WHERE {" AND ".join(where)}
+        ORDER BY placed_at DESC, bet_id ASC
+        LIMIT :limit
+        {offset_clause}
+    """
     )
-    rows = db.execute(page_stmt).scalars().all()
+    exec_params = {**params, "limit": limit}
+    if after is None:
+        exec_params["offset"] = offset
+    rows = db.execute(stmt, exec_params).all()
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.placed_at, last.bet_id)
 
-    next_offset = (offset + limit) if (offset + limit) < total else None
-    return rows, total, next_offset
+    next_offset = None
+    if after is None:
+        no = offset + len(rows)
+        if total_mode == "exact":
+            next_offset = no if no < total else None
+        else:
+            next_offset = no if len(rows) == limit else None
+    return rows, total, next_offset, next_cursor
 
 
 def create_bet(db: Session, data: Dict[str, Any]) -> dict:
@@ -168,3 +218,141 @@ def insert_bet_idempotent(db: Session, data: dict) -> Tuple[bool, Optional[str]]
         return False, None
 
     return bool(row["inserted"]), str(row["bet_id"])
+
+
+# En rad per input (unnest över kolumn-arrayer => samma SQL-text oavsett
+# batchstorlek). bet_id genereras i förväg så att RETURNING kan mappas
+# tillbaka till input; ON CONFLICT DO NOTHING täcker både idempotency_key
+# och (user_ref, external_id).
+_BETS_BATCH_SQL = text(
+    """
+    WITH input AS (
+        SELECT *
+        FROM unnest(
+            CAST(:bet_id AS uuid[]),
+            CAST(:external_id AS text[]),
+            CAST(:user_ref AS text[]),
+            CAST(:match_id AS text[]),
+            CAST(:bookmaker_id AS uuid[]),
+            CAST(:selection_id AS uuid[]),
+            CAST(:stake AS numeric[]),
+            CAST(:price AS numeric[]),
+            CAST(:placed_at AS timestamptz[]),
+            CAST(:idempotency_key AS text[])
+        ) WITH ORDINALITY AS t(
+            bet_id, external_id, user_ref, match_id, bookmaker_id,
+            selection_id, stake, price, placed_at, idempotency_key, ord
+        )
+    ),
+    ins AS (
+        INSERT INTO core.bets (
+            bet_id, external_id, user_ref, match_id, bookmaker_id, selection_id,
+            stake, price, placed_at, status, idempotency_key
+        )
+        SELECT bet_id, external_id, user_ref, match_id, bookmaker_id, selection_id,
+               stake, price, placed_at, 'open', idempotency_key
+        FROM input
+        ORDER BY ord
+        ON CONFLICT DO NOTHING
+        RETURNING bet_id
+    )
+    SELECT i.ord,
+           ins.bet_id IS NOT NULL AS inserted,
+           COALESCE(
+               ins.bet_id,
+               (SELECT b.bet_id FROM core.bets b
+                 WHERE b.idempotency_key = i.idempotency_key LIMIT 1),
+               (SELECT b.bet_id FROM core.bets b
+                 WHERE b.user_ref = i.user_ref AND b.external_id = i.external_id
+                 LIMIT 1)
+           ) AS bet_id
+    FROM input i
+    LEFT JOIN ins ON ins.bet_id = i.bet_id
+    ORDER BY i.ord
+"""
+)
+
+# Rader som krockade med en annan rad i samma statement (eller en samtidig
+# skrivare) syns inte i statementets snapshot; slås upp efteråt.
+_BETS_LOOKUP_SQL = text(
+    """
+    SELECT bet_id FROM core.bets
+    WHERE (CAST(:idempotency_key AS text) IS NOT NULL
+           AND idempotency_key = :idempotency_key)
+       OR (external_id IS NOT NULL
+           AND user_ref = :user_ref AND external_id = :external_id)
+    ORDER BY (idempotency_key IS NOT DISTINCT FROM :idempotency_key) DESC
+    LIMIT 1
+"""
+)
+
+_BATCH_COLS = [
+    "external_id",
+    "user_ref",
+    "match_id",
+    "bookmaker_id",
+    "selection_id",
+    "stake",
+    "price",
+    "placed_at",
+    "idempotency_key",
+]
+
+
+def _bet_key(data: dict) -> Optional[tuple]:
+    if data.get("idempotency_key"):
+        return ("idem", data["idempotency_key"])
+    if data.get("user_ref") and data.get("external_id"):
+        return ("ext", data["user_ref"], data["external_id"])
+    return None
+
+
+def insert_bets_batch(db: Session, items: list[dict]) -> list[dict]:
+    """
+    Idempotent multi-insert av bets i ett statement och en transaktion.
+    Returnerar per input-rad {"index", "status": created|replayed, "bet_id"}.
+    Dubbletter inom batchen (samma nyckel) blir replayed mot första raden.
+    """
+    first_by_key: dict[tuple, int] = {}
+    unique: list[int] = []  # index i items som skickas till DB
+    dup_of: dict[int, int] = {}
+    for i, it in enumerate(items):
+        key = _bet_key(it)
+        if key is not None and key in first_by_key:
+            dup_of[i] = first_by_key[key]
+            continue
+        if key is not None:
+            first_by_key[key] = i
+        unique.append(i)
+
+    rows = [items[i] for i in unique]
+    params: dict[str, list] = {"bet_id": [uuid.uuid4() for _ in rows]}
+    for col in _BATCH_COLS:
+        params[col] = [r.get(col) for r in rows]
+
+    results: dict[int, dict] = {}
+    for r in db.execute(_BETS_BATCH_SQL, params).mappings():
+        idx = unique[r["ord"] - 1]
+        bet_id = r["bet_id"]
+        if bet_id is None:
+            bet_id = db.execute(
+                _BETS_LOOKUP_SQL,
+                {
+                    c: items[idx].get(c)
+                    for c in ("idempotency_key", "user_ref", "external_id")
+                },
+            ).scalar()
+        results[idx] = {
+            "index": idx,
+            "status": "created" if r["inserted"] else "replayed",
+            "bet_id": str(bet_id) if bet_id else None,
+        }
+    db.commit()
+
+    for i, first in dup_of.items():
+        results[i] = {
+            "index": i,
+            "status": "replayed",
+            "bet_id": results[first]["bet_id"],
+        }
+    return [results[i] for i in range(len(items))]
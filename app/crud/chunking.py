@@ -0,0 +1,130 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Any, Callable, Sequence
+import psycopg
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+# Postgres tillåter max 65535 bind-parametrar per statement
+PG_MAX_PARAMS = 65535
+
+
+def lock_order_key(value: Any) -> Any:
+    """
+    Sorteringsvärde i samma ordning som Postgres `ORDER BY ... COLLATE "C"`:
+    text per kodpunkt (= UTF-8-byteordning), UUID som 128-bitars tal (= uuid-
+    typens byteordning), timestamptz per tidpunkt (naiv = UTC).
+    """
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def sort_and_chunk(
+    rows: list[dict], key_cols: Sequence[str], size: int, n_cols: int
+) -> list[list[dict]]:
+    """
+    Sorterar raderna på uniknyckeln med typade värden (se lock_order_key) och
+    delar upp dem i bitar om högst `size` rader. Ordningen är densamma som
+    COPY-vägens ORDER BY i SQL, så samtidiga skrivare låser nycklarna i samma
+    ordning oavsett väg och databasens kollation.
+    `size` kapas så att en bit aldrig överskrider PG_MAX_PARAMS.
+
+    Uppdelningen håller varje statement under parametergränsen men kortar inte
+    låstiden: alla bitar körs i samma transaktion och radlåsen hålls till
+    commit.
+    """
+    size = max(1, min(size, PG_MAX_PARAMS // max(1, n_cols)))
+    ordered = sorted(rows, key=lambda r: tuple(lock_order_key(r[k]) for k in key_cols))
+    return [ordered[i : i + size] for i in range(0, len(ordered), size)]
+
+
+def _pipelined_sync(raw: psycopg.Connection, statements) -> list[tuple]:
+    cursors = []
+    try:
+        with raw.pipeline():
+            for sql, params in statements:
+                cur = raw.cursor()
+                cur.execute(sql, params)
+                cursors.append(cur)
+        return [cur.fetchone() for cur in cursors]
+    finally:
+        for cur in cursors:
+            cur.close()
+
+
+async def _pipelined_async(raw: psycopg.AsyncConnection, statements) -> list[tuple]:
+    cursors = []
+    try:
+        async with raw.pipeline():
+            for sql, params in statements:
+                cur = raw.cursor()
+                await cur.execute(sql, params)
+                cursors.append(cur)
+        return [await cur.fetchone() for cur in cursors]
+    finally:
+        for cur in cursors:
+            await cur.close()
+
+
+def driver_connection(db: Session) -> Any:
+    """Rå psycopg-anslutning (sync eller async) i sessionens transaktion."""
+    return db.connection().connection.driver_connection
+
+
+def run_pipelined(db: Session, statements: list[tuple[str, Sequence]]) -> list[tuple]:
+    """
+    Skickar alla statements via psycopg3 pipeline mode och returnerar första
+    raden från varje. Fungerar även inuti AsyncSession.run_sync (async-driver).
+    """
+    raw = driver_connection(db)
+    if isinstance(raw, psycopg.AsyncConnection):
+        return await_only(_pipelined_async(raw, statements))
+    return _pipelined_sync(raw, statements)
+
+
+def _copy_sync(raw: psycopg.Connection, sql: str, types, rows) -> None:
+    with raw.cursor() as cur, cur.copy(sql) as cp:
+        cp.set_types(types)
+        for row in rows:
+            cp.write_row(row)
+
+
+async def _copy_async(raw: psycopg.AsyncConnection, sql: str, types, rows) -> None:
+    async with raw.cursor() as cur, cur.copy(sql) as cp:
+        cp.set_types(types)
+        for row in rows:
+            await cp.write_row(row)
+
+
+def copy_rows(db: Session, sql: str, types: Sequence[str], rows) -> None:
+    """Strömmar tupler med binär COPY ... FROM STDIN i sessionens transaktion."""
+    raw = driver_connection(db)
+    if isinstance(raw, psycopg.AsyncConnection):
+        await_only(_copy_async(raw, sql, types, rows))
+    else:
+        _copy_sync(raw, sql, types, rows)
+
+
+def upsert_chunks_pipelined(
+    db: Session,
+    build_sql: Callable[[int], str],
+    to_params: Callable[[dict], Sequence],
+    chunks: list[list[dict]],
+) -> dict:
+    """
+    Kör en upsert per bit via psycopg3 pipeline mode (alla statements skickas
+    utan att vänta på svar emellan) i sessionens transaktion.
+    `build_sql(n)` ska returnera SQL för n rader som ger (inserted, updated).
+    """
+    statements = [
+        (build_sql(len(chunk)), [v for r in chunk for v in to_params(r)])
+        for chunk in chunks
+    ]
+    inserted = updated = 0
+    for ins, upd in run_pipelined(db, statements):
+        inserted += int(ins)
+        updated += int(upd)
+
+    db.commit()
+    return {"inserted": inserted, "updated": updated}
@@ -0,0 +1,278 @@
+# app/crud/ingest.py
+from __future__ import annotations
+
+import json
+import logging
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.crud.odds import bulk_upsert_odds, dedup_odds
+from app.schemas.odds import OddsIn
+
+log = logging.getLogger(__name__)
+
+ODDS_ENTITY = "odds"
+
+# Fel som blir likadana vid nästa försök (ogiltig payload, constraint, typ/
+# värdefel i datan); allt annat räknas som transient och tas om med backoff
+PERMANENT_ERRORS = (ValidationError, DataError, IntegrityError)
+
+# SKIP LOCKED: parallella workers tar olika batcher utan att vänta på varandra
+_CLAIM_SQL = """
+    SELECT batch_id, item_count, payload
+    FROM core.ingest_queue
+    WHERE entity = :entity AND next_attempt_at <= now() {extra}
+    ORDER BY enqueued_at
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+"""
+
+
+def enqueue_odds_batch(db: Session, items: list[dict]) -> UUID:
+    """
+    Lägg en redan validerad batch (JSON-serialiserbara items) i kön.
+    Audit-raden skapas med status 'queued' i samma transaktion.
+    """
+    batch_id = uuid4()
+    sources = {it.get("source") for it in items}
+    params = {
+        "batch_id": batch_id,
+        "entity": ODDS_ENTITY,
+        "source": sources.pop() if len(sources) == 1 else None,
+        "n": len(items),
+    }
+    db.execute(
+        text(
+            """
+        INSERT INTO core.ingest_audit (audit_id, entity, source, count, status)
+        VALUES (:batch_id, :entity, :source, :n, 'queued')
+    """
+        ),
+        params,
+    )
+    db.execute(
+        text(
+            """
+        INSERT INTO core.ingest_queue (batch_id, entity, item_count, payload)
+        VALUES (:batch_id, :entity, :n, CAST(:payload AS jsonb))
+    """
+        ),
+        {**params, "payload": json.dumps(items)},
+    )
+    db.commit()
+    return batch_id
+
+
+def _claim(db: Session, limit: int, batch_id: UUID | None = None) -> list:
+    extra = "AND batch_id = :batch_id" if batch_id else ""
+    return db.execute(
+        text(_CLAIM_SQL.format(extra=extra)),
+        {"entity": ODDS_ENTITY, "limit": limit, "batch_id": batch_id},
+    ).all()
+
+
+def _coalesce(group: list) -> list[dict]:
+    # Senare batch vinner vid samma snapshot-nyckel, som vid sekventiell ingest
+    # (med samma källprioritet som inom en batch, se dedup_odds)
+    rows = [
+        OddsIn.model_validate(item).model_dump()
+        for batch in group
+        for item in batch.payload
+    ]
+    return dedup_odds(rows)[0]
+
+
+def _upsert_group(db: Session, group: list) -> dict:
+    ids = [b.batch_id for b in group]
+    rows = _coalesce(group)
+    db.execute(
+        text("DELETE FROM core.ingest_queue WHERE batch_id = ANY(:ids)"), {"ids": ids}
+    )
+    db.execute(
+        text(
+            """
+        UPDATE core.ingest_audit SET status = 'ok', finished_at = now()
+        WHERE audit_id = ANY(:ids)
+    """
+        ),
+        {"ids": ids},
+    )
+    # committar data, kö och status i en och samma transaktion
+    result = bulk_upsert_odds(db, rows)
+
+    # Räknare för hela gruppen; datan är redan committad, så ett fel här
+    # får inte markera batcherna som misslyckade
+    details = {
+        **result,
+        "coalesced_batches": len(group),
+        "coalesced_rows": len(rows),
+    }
+    try:
+        db.execute(
+            text(
+                "UPDATE core.ingest_audit SET details = :d WHERE audit_id = ANY(:ids)"
+            ),
+            {"d": json.dumps(details), "ids": ids},
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log.warning("could not record ingest details: %s", e)
+    return result
+
+
+def _mark_failed(db: Session, batch_id: UUID, exc: Exception) -> None:
+    # Tas bort ur kön så att en trasig batch inte blockerar resten
+    log.warning("ingest batch %s failed: %s", batch_id, exc)
+    db.execute(
+        text("DELETE FROM core.ingest_queue WHERE batch_id = :id"), {"id": batch_id}
+    )
+    db.execute(
+        text(
+            """
+        UPDATE core.ingest_audit
+        SET status = 'failed', finished_at = now(), details = :d
+        WHERE audit_id = :id
+    """
+        ),
+        {"id": batch_id, "d": json.dumps({"error": str(exc)[:1000]})},
+    )
+    db.commit()
+
+
+def _retry_later(db: Session, batch_id: UUID, exc: Exception) -> None:
+    # Batchen ligger kvar i kön (status 'queued') med exponentiell backoff;
+    # senaste felet syns i audit-radens details
+    attempts = db.execute(
+        text(
+            """
+        UPDATE core.ingest_queue
+        SET attempts = attempts + 1,
+            next_attempt_at = now() + make_interval(
+                secs => LEAST(:max_backoff, :backoff * power(2, attempts))
+            )
+        WHERE batch_id = :id
+        RETURNING attempts
+    """
+        ),
+        {
+            "id": batch_id,
+            "backoff": settings.INGEST_RETRY_BACKOFF,
+            "max_backoff": settings.INGEST_RETRY_BACKOFF_MAX,
+        },
+    ).scalar_one_or_none()
+    if attempts is None:
+        db.rollback()  # redan hanterad av en annan worker
+        return
+    if attempts >= settings.INGEST_MAX_ATTEMPTS:
+        db.rollback()
+        _mark_failed(db, batch_id, exc)
+        return
+    db.execute(
+        text("UPDATE core.ingest_audit SET details = :d WHERE audit_id = :id"),
+        {
+            "id": batch_id,
+            "d": json.dumps({"attempts": attempts, "error": str(exc)[:1000]}),
+        },
+    )
+    db.commit()
+    log.warning(
+        "ingest batch %s failed (attempt %d/%d), retrying: %s",
+        batch_id,
+        attempts,
+        settings.INGEST_MAX_ATTEMPTS,
+        exc,
+    )
+
+
+def _handle_failure(db: Session, batch_id: UUID, exc: Exception) -> None:
+    if isinstance(exc, PERMANENT_ERRORS):
+        _mark_failed(db, batch_id, exc)
+    else:
+        _retry_later(db, batch_id, exc)
+
+
+def _drain_one(db: Session, batch_id: UUID) -> None:
+    claimed = _claim(db, 1, batch_id)
+    if not claimed:
+        db.rollback()  # redan tagen av en annan worker
+        return
+    try:
+        _upsert_group(db, claimed)
+    except Exception as e:
+        db.rollback()
+        _handle_failure(db, batch_id, e)
+
+
+def drain_odds_queue(
+    db: Session, max_batches: int | None = None, max_rows: int | None = None
+) -> int:
+    """
+    Ta de äldsta köade batcherna och upserta dem som en sammanslagen batch
+    (högst max_batches batcher / max_rows rader, minst en batch).
+    Misslyckas gruppen körs batcherna en och en så att bara den trasiga
+    påverkas: permanenta fel (PERMANENT_ERRORS) markerar den 'failed', övriga
+    lämnar den i kön med backoff tills INGEST_MAX_ATTEMPTS försök är gjorda.
+    Returnerar antal hanterade batcher (0 = inga batcher redo).
+    """
+    max_batches = max_batches or settings.INGEST_COALESCE_BATCHES
+    max_rows = max_rows or settings.INGEST_COALESCE_ROWS
+
+    claimed = _claim(db, max_batches)
+    if not claimed:
+        db.rollback()
+        return 0
+
+    group, n_rows = [], 0
+    for batch in claimed:
+        if group and n_rows + batch.item_count > max_rows:
+            break
+        group.append(batch)
+        n_rows += batch.item_count
+
+    try:
+        _upsert_group(db, group)
+        return len(group)
+    except Exception as e:
+        db.rollback()
+        if len(group) == 1:
+            _handle_failure(db, group[0].batch_id, e)
+            return 1
+
+    log.warning(
+        "coalesced ingest of %d batches failed; retrying one by one", len(group)
+    )
+    for batch in group:
+        _drain_one(db, batch.batch_id)
+    return len(group)
+
+
+def get_ingest_batch(db: Session, batch_id: UUID) -> dict | None:
+    row = (
+        db.execute(
+            text(
+                """
+            SELECT audit_id AS batch_id, entity, source, count, status,
+                   started_at AS accepted_at, finished_at, details
+            FROM core.ingest_audit
+            WHERE audit_id = :id
+        """
+            ),
+            {"id": batch_id},
+        )
+        .mappings()
+        .first()
+    )
+    if row is None:
+        return None
+    out = dict(row)
+    try:
+        out["details"] = json.loads(row["details"]) if row["details"] else None
+    except ValueError:
+        out["details"] = {"message": row["details"]}  # äldre fritextrader
+    return out
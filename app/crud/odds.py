@@ -1,50 +1,345 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 from typing import Iterable
 from sqlalchemy.orm import Session
 from sqlalchemy import select, text, func
-from sqlalchemy.dialects.postgresql import insert
 
+from app.core.settings import settings
+from app.core.snapshot_cache import SnapshotCache
+from app.crud.chunking import copy_rows, sort_and_chunk, upsert_chunks_pipelined
 from app.models.odds import Odds
 from app.models.selections import Selection
 from app.models.markets import Market
 
+ODDS_KEYS = [
+    "match_id",
+    "bookmaker_id",
+    "selection_id",
+    "price",
+    "probability",
+    "captured_at",
+    "source",
+    "checksum",
+]
+
+# Uniknyckel (uq_odds_snapshot) – även sorteringsordning för låsning
+ODDS_UNIQUE_COLS = ["match_id", "bookmaker_id", "selection_id", "captured_at"]
+
+# Postgres-typer i samma ordning som ODDS_KEYS (för binär COPY)
+_COPY_TYPES = [
+    "text",
+    "uuid",
+    "uuid",
+    "numeric",
+    "numeric",
+    "timestamptz",
+    "text",
+    "text",
+]
+
+_STAGE_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS odds_stage (
+        match_id TEXT NOT NULL,
+        bookmaker_id UUID NOT NULL,
+        selection_id UUID NOT NULL,
+        price NUMERIC(10,4) NOT NULL,
+        probability NUMERIC(7,6),
+        captured_at TIMESTAMPTZ NOT NULL,
+        source TEXT,
+        checksum TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Oförändrade omsändningar (samma värden) skrivs inte om: ingen ny radversion,
+# ingen WAL och ingen rad i RETURNING. De räknas som "unchanged".
+#
+# xmax kan inte läsas i RETURNING på en partitionerad tabell; created_at sätts
+# till transaktionens now() vid insert och rörs inte vid update.
+_ODDS_INSERTED = "(created_at = now()) AS inserted"
+
+_ODDS_ON_CONFLICT = f"""
+        ON CONFLICT ON CONSTRAINT uq_odds_snapshot DO UPDATE SET
+            price = EXCLUDED.price,
+            probability = EXCLUDED.probability,
+            source = EXCLUDED.source,
+            checksum = EXCLUDED.checksum
+        WHERE (core.odds.price, core.odds.probability, core.odds.source,
+               core.odds.checksum)
+              IS DISTINCT FROM (EXCLUDED.price, EXCLUDED.probability,
+                                EXCLUDED.source, EXCLUDED.checksum)
+        RETURNING odds_id, match_id, bookmaker_id, selection_id, price,
+                  probability, captured_at, source, checksum, {_ODDS_INSERTED}
+"""
+
+# core.odds_latest hålls i takt i samma statement: nyaste snapshot per
+# (match, bookmaker, selection) ur batchen, ersätter bara om den inte är äldre
+_LATEST_FROM_MERGED = """
+    , latest AS (
+        INSERT INTO core.odds_latest (
+            match_id, bookmaker_id, selection_id, odds_id, price,
+            probability, captured_at, source, checksum
+        )
+        SELECT DISTINCT ON (match_id, bookmaker_id, selection_id)
+               match_id, bookmaker_id, selection_id, odds_id, price,
+               probability, captured_at, source, checksum
+        FROM merged
+        ORDER BY match_id, bookmaker_id, selection_id, captured_at DESC
+        ON CONFLICT (match_id, bookmaker_id, selection_id) DO UPDATE SET
+            odds_id = EXCLUDED.odds_id,
+            price = EXCLUDED.price,
+            probability = EXCLUDED.probability,
+            captured_at = EXCLUDED.captured_at,
+            source = EXCLUDED.source,
+            checksum = EXCLUDED.checksum,
+            updated_at = now()
+        WHERE core.odds_latest.captured_at <= EXCLUDED.captured_at
+    )
+"""
+
+_COUNTS_FROM_MERGED = f"""
+    {_LATEST_FROM_MERGED}
+    SELECT COUNT(*) FILTER (WHERE inserted) AS inserted,
+           COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM merged
+"""
+
+_STAGE_MERGE = f"""
+    WITH merged AS (
+        INSERT INTO core.odds (
+            match_id, bookmaker_id, selection_id, price,
+            probability, captured_at, source, checksum
+        )
+        SELECT match_id, bookmaker_id, selection_id, price,
+               probability, captured_at, source, checksum
+        FROM odds_stage
+        -- samma låsordning som sort_and_chunk i pipeline-vägen
+        ORDER BY match_id COLLATE "C", bookmaker_id, selection_id, captured_at
+        {_ODDS_ON_CONFLICT}
+    )
+    {_COUNTS_FROM_MERGED}
+"""
+
+# En VALUES-tuple för pipeline-vägen; explicita casts så att kolumner med
+# enbart NULL inte tolkas som text
+_ODDS_VALUES_ROW = (
+    "(%s, %s::uuid, %s::uuid, %s::numeric, %s::numeric, %s::timestamptz, %s, %s)"
+)
+
+
+def _odds_chunk_sql(n: int) -> str:
+    values = ", ".join([_ODDS_VALUES_ROW] * n)
+    return f"""
+    WITH merged AS (
+        INSERT INTO core.odds (
+            match_id, bookmaker_id, selection_id, price,
+            probability, captured_at, source, checksum
+        )
+        VALUES {values}
+        {_ODDS_ON_CONFLICT}
+    )
+    {_COUNTS_FROM_MERGED}
+"""
+
+
+def _odds_params(r: dict) -> tuple:
+    return tuple(r[k] for k in ODDS_KEYS)
+
+
+def _odds_grouped_sql(n: int) -> str:
+    # som _odds_chunk_sql men varje rad bär index för sin grupp (anropare);
+    # nycklarna är unika över grupperna så JOIN mot merged ger räknare per grupp
+    values = ", ".join(["(%s::int, " + _ODDS_VALUES_ROW[1:]] * n)
+    return f"""
+    WITH v (grp, {", ".join(ODDS_KEYS)}) AS (VALUES {values}),
+    merged AS (
+        INSERT INTO core.odds (
+            match_id, bookmaker_id, selection_id, price,
+            probability, captured_at, source, checksum
+        )
+        SELECT {", ".join(ODDS_KEYS)}
+        FROM v
+        -- samma låsordning som COPY- och pipeline-vägen
+        ORDER BY match_id COLLATE "C", bookmaker_id, selection_id, captured_at
+        {_ODDS_ON_CONFLICT}
+    )
+    {_LATEST_FROM_MERGED}
+    SELECT v.grp,
+           COUNT(*) FILTER (WHERE merged.inserted) AS inserted,
+           COUNT(*) FILTER (WHERE NOT merged.inserted) AS updated
+    FROM merged JOIN v USING (match_id, bookmaker_id, selection_id, captured_at)
+    GROUP BY v.grp
+"""
+
+
+def _source_rank() -> dict[str | None, int]:
+    # första källan i listan vinner; okända källor (och None) rankas lägst
+    sources = [s.strip() for s in settings.ODDS_DEDUP_SOURCE_PRIORITY.split(",")]
+    sources = [s for s in sources if s]
+    return {s: len(sources) - i for i, s in enumerate(sources)}
+
+
+def dedup_odds(rows: list[dict]) -> tuple[list[dict], int]:
+    """
+    Slår ihop rader med samma snapshot-nyckel (ON CONFLICT DO UPDATE får inte
+    träffa samma rad två gånger i ett statement). Senare rad vinner, om inte
+    ODDS_DEDUP_SOURCE_PRIORITY rankar den tidigares källa högre.
+    Returnerar (unika rader, antal sammanslagna rader).
+    """
+    rank = _source_rank()
+    by_key: dict[tuple, dict] = {}
+    for r in rows:
+        k = odds_key(r)
+        prev = by_key.get(k)
+        if prev is None or rank.get(r["source"], 0) >= rank.get(prev["source"], 0):
+            by_key[k] = r
+    return list(by_key.values()), len(rows) - len(by_key)
+
+
+def odds_key(r: dict) -> tuple:
+    """Snapshot-nyckeln (uq_odds_snapshot); naiv captured_at räknas som UTC."""
+    return (
+        r["match_id"],
+        str(r["bookmaker_id"]),
+        str(r["selection_id"]),
+        _to_tz(r["captured_at"]),
+    )
+
+
+def _odds_values(r: dict) -> tuple:
+    # det som jämförs för att avgöra om en omsändning är oförändrad
+    return (
+        _to_numeric(r["price"]),
+        _to_numeric(r["probability"]),
+        r["source"],
+        r["checksum"],
+    )
+
+
+# Senast skrivna värden per snapshot-nyckel (ODDS_RECENT_CACHE_TTL, 0 = av):
+# exakta omsändningar släpps innan de når databasen
+recent_odds = SnapshotCache(
+    settings.ODDS_RECENT_CACHE_TTL, settings.ODDS_RECENT_CACHE_MAX
+)
+
+
+def _to_numeric(v):
+    if v is None or isinstance(v, Decimal):
+        return v
+    return Decimal(str(v))
+
+
+def _to_tz(ts: datetime) -> datetime:
+    # Binär timestamptz kräver tz-medveten datetime; naiv tolkas som UTC
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _bulk_upsert_odds_copy(db: Session, rows: list[dict]) -> dict:
+    """
+    Stora batcher: strömma rader med binär COPY till en temporär (ologgad)
+    staging-tabell och merga sedan med en enda INSERT ... SELECT.
+    Slipper kompilera/parsa ett jättelikt VALUES-statement.
+    """
+    db.execute(text(_STAGE_DDL))
+
+    copy_rows(
+        db,
+        f"COPY odds_stage ({', '.join(ODDS_KEYS)}) FROM STDIN (FORMAT BINARY)",
+        _COPY_TYPES,
+        (
+            (
+                r["match_id"],
+                r["bookmaker_id"],
+                r["selection_id"],
+                _to_numeric(r["price"]),
+                _to_numeric(r["probability"]),
+                _to_tz(r["captured_at"]),
+                r["source"],
+                r["checksum"],
+            )
+            for r in rows
+        ),
+    )
+
+    res = db.execute(text(_STAGE_MERGE)).one()
+    db.commit()
+    return {"inserted": int(res.inserted), "updated": int(res.updated)}
+
+
+def _write_odds(db: Session, rows: list[dict]) -> dict:
+    threshold = settings.ODDS_COPY_THRESHOLD
+    if threshold > 0 and len(rows) >= threshold:
+        return _bulk_upsert_odds_copy(db, rows)
+
+    chunks = sort_and_chunk(
+        rows, ODDS_UNIQUE_COLS, settings.UPSERT_CHUNK_SIZE, len(ODDS_KEYS)
+    )
+    # även en enda bit går den här vägen (en round-trip) så att
+    # core.odds_latest uppdateras i samma statement
+    return upsert_chunks_pipelined(db, _odds_chunk_sql, _odds_params, chunks)
+
 
 def bulk_upsert_odds(db: Session, items: Iterable[dict]) -> dict:
+    """
+    Upsertar odds och returnerar {"inserted", "updated", "unchanged",
+    "collapsed"}. "unchanged" är rader som redan fanns med exakt samma
+    värden (släppta av recent_odds eller av WHERE-villkoret i ON CONFLICT),
+    "collapsed" dubbletter inom batchen som slagits ihop (se dedup_odds).
+    """
     items = list(items)
     if not items:
-        return {"inserted": 0, "updated": 0}
-
-    keys = [
-        "match_id",
-        "bookmaker_id",
-        "selection_id",
-        "price",
-        "probability",
-        "captured_at",
-        "source",
-        "checksum",
-    ]
-
-    rows = [{k: it.get(k) for k in keys} for it in items]
-    stmt = insert(Odds.__table__).values(rows)
-
-    stmt = stmt.on_conflict_do_update(
-        constraint="uq_odds_snapshot",
-        set_={
-            "price": stmt.excluded.price,
-            "probability": stmt.excluded.probability,
-            "source": stmt.excluded.source,
-            "checksum": stmt.excluded.checksum,
-        },
-    ).returning(text("(xmax = 0) AS inserted"))
-
-    res = db.execute(stmt)
-    returned = res.fetchall()
+        return {"inserted": 0, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    rows, collapsed = dedup_odds([{k: it.get(k) for k in ODDS_KEYS} for it in items])
+    fresh = recent_odds.unseen(rows, odds_key, _odds_values)
+    if fresh:
+        result = _write_odds(db, fresh)
+        recent_odds.remember(fresh, odds_key, _odds_values)
+    else:
+        db.commit()  # anroparens övriga ändringar (t.ex. ingest-kön)
+        result = {"inserted": 0, "updated": 0}
+    result["unchanged"] = len(rows) - result["inserted"] - result["updated"]
+    result["collapsed"] = collapsed
+    return result
+
+
+def bulk_upsert_odds_grouped(db: Session, groups: list[list[dict]]) -> list[dict]:
+    """
+    Upsertar flera anropares batcher i ett statement och en commit och
+    returnerar räknare per grupp som bulk_upsert_odds ("collapsed" är 0).
+    Snapshot-nycklarna måste vara unika över alla grupper
+    (se app/core/microbatch.py).
+    """
+    fresh = [recent_odds.unseen(group, odds_key, _odds_values) for group in groups]
+    tagged = [{**it, "grp": i} for i, group in enumerate(fresh) for it in group]
+    # sorterat över alla bitar (samma låsordning som övriga vägar); en bit per
+    # statement håller sig under PG_MAX_PARAMS, allt i en transaktion
+    chunks = sort_and_chunk(
+        tagged, ODDS_UNIQUE_COLS, settings.UPSERT_CHUNK_SIZE, len(ODDS_KEYS) + 1
+    )
+    counts: dict[int, tuple[int, int]] = {}
+    for chunk in chunks:
+        params = [v for r in chunk for v in (r["grp"], *_odds_params(r))]
+        rows = db.connection().exec_driver_sql(
+            _odds_grouped_sql(len(chunk)), tuple(params)
+        )
+        for grp, ins, upd in rows:
+            prev_ins, prev_upd = counts.get(grp, (0, 0))
+            counts[grp] = (prev_ins + int(ins), prev_upd + int(upd))
     db.commit()
 
-    inserted = sum(1 for r in returned if r.inserted)
-    updated = len(returned) - inserted
-    return {"inserted": inserted, "updated": updated}
+    results = []
+    for i, group in enumerate(groups):
+        recent_odds.remember(fresh[i], odds_key, _odds_values)
+        ins, upd = counts.get(i, (0, 0))
+        results.append(
+            {
+                "inserted": ins,
+                "updated": upd,
+                "unchanged": len(group) - ins - upd,
+                "collapsed": 0,
+            }
+        )
+    return results
 
 
 # Anävänds inte för tillfället:
@@ -0,0 +1,57 @@
+from __future__ import annotations
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.settings import settings
+
+log = logging.getLogger(__name__)
+
+
+def ensure_odds_partitions(db: Session, months_ahead: int | None = None) -> list[str]:
+    """Skapar månadspartitioner för core.odds från innevarande månad och framåt."""
+    if months_ahead is None:
+        months_ahead = settings.ODDS_PARTITION_MONTHS_AHEAD
+    names = (
+        db.execute(
+            text("SELECT core.ensure_odds_partitions(:n)"), {"n": max(0, months_ahead)}
+        )
+        .scalars()
+        .all()
+    )
+    db.commit()
+    return list(names)
+
+
+def drop_expired_odds_partitions(
+    db: Session, retention_months: int | None = None, drop: bool = True
+) -> list[str]:
+    """
+    Kopplar loss (och droppar om `drop`) partitioner vars hela intervall ligger
+    äldre än retention. 0 månader = ingen retention, inget tas bort.
+    """
+    if retention_months is None:
+        retention_months = settings.ODDS_PARTITION_RETENTION_MONTHS
+    if retention_months <= 0:
+        return []
+    names = (
+        db.execute(
+            text(
+                "SELECT core.drop_expired_odds_partitions("
+                "make_interval(months => :m), :drop)"
+            ),
+            {"m": retention_months, "drop": drop},
+        )
+        .scalars()
+        .all()
+    )
+    db.commit()
+    return list(names)
+
+
+def maintain_odds_partitions(db: Session) -> dict:
+    """Ett underhållsvarv: skapa framtida partitioner, rensa utgångna."""
+    created = ensure_odds_partitions(db)
+    expired = drop_expired_odds_partitions(db)
+    if expired:
+        log.info("odds partitions expired: %s", ", ".join(expired))
+    return {"partitions": created, "expired": expired}
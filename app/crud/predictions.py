@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 from sqlalchemy import text as _text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
+from psycopg.types.json import Jsonb
+from app.core.settings import settings
+from app.crud.chunking import sort_and_chunk, upsert_chunks_pipelined
 from app.models.predictions import Prediction
 
 
@@ -51,6 +54,51 @@ def list_predictions_page(
 
 UNIQUE_COLS = ["match_id", "model_id", "version", "selection_id"]
 
+PREDICTION_KEYS = [
+    "match_id",
+    "model_id",
+    "version",
+    "selection_id",
+    "probability",
+    "odds_fair",
+    "features",
+    "predicted_at",
+]
+
+_PRED_VALUES_ROW = (
+    "(%s, %s::uuid, %s, %s::uuid, %s::numeric, %s::numeric, %s::jsonb, %s::timestamptz)"
+)
+
+
+def _predictions_chunk_sql(n: int) -> str:
+    values = ", ".join([_PRED_VALUES_ROW] * n)
+    return f"""
+    WITH merged AS (
+        INSERT INTO core.predictions (
+            match_id, model_id, version, selection_id,
+            probability, odds_fair, features, predicted_at
+        )
+        VALUES {values}
+        ON CONFLICT (match_id, model_id, version, selection_id) DO UPDATE SET
+            probability = EXCLUDED.probability,
+            odds_fair = EXCLUDED.odds_fair,
+            features = EXCLUDED.features,
+            predicted_at = EXCLUDED.predicted_at
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted) AS inserted,
+           COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM merged
+"""
+
+
+def _prediction_params(r: dict) -> tuple:
+    features = r["features"]
+    return tuple(
+        Jsonb(features) if k == "features" and features is not None else r[k]
+        for k in PREDICTION_KEYS
+    )
+
 
 def bulk_upsert_predictions(db: Session, rows: list[dict]) -> dict:
     if not rows:
@@ -84,6 +132,15 @@ def bulk_upsert_predictions(db: Session, rows: list[dict]) -> dict:
     if not norm:
         return {"inserted": 0, "updated": 0}
 
+    chunks = sort_and_chunk(
+        norm, UNIQUE_COLS, settings.UPSERT_CHUNK_SIZE, len(PREDICTION_KEYS)
+    )
+    if len(chunks) > 1:
+        return upsert_chunks_pipelined(
+            db, _predictions_chunk_sql, _prediction_params, chunks
+        )
+    norm = chunks[0]
+
     ins = pg_insert(Prediction).values(norm)
     upsert = ins.on_conflict_do_update(
         index_elements=[
@@ -1,12 +1,11 @@
 import os
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlalchemy.exc import IntegrityError
-from opentelemetry import trace
-from app.core.request_id import RequestIdMiddleware
 from app.core.errors import (
     http_exception_handler,
     unhandled_exception_handler,
@@ -18,12 +17,15 @@ from app.routers.readiness import router as readiness_router
 from app.routers.odds import router as odds_router
 from app.routers.predictions import router as predictions_router
 from app.routers.bets import router as bets_router
-from app.observability.metrics import metrics_router, MetricsMiddleware
+from app.observability.metrics import metrics_router
+from app.observability.middleware import ObservabilityMiddleware
 from app.observability.logging import setup_logging
-from app.observability.request_log import RequestLoggingMiddleware
 from app.observability.tracing import setup_tracing
 from app.observability.trace_filter import TraceContextFilter
-from app.core.db import engine
+from app.core.db import engine, SessionLocal
+from app.core.settings import settings
+from app.crud.partitions import maintain_odds_partitions
+from app.core.ingest_worker import odds_ingest_workers
 
 load_dotenv()
 
@@ -43,6 +45,23 @@ tags_metadata = [
     {"name": "bets", "description": "Registrering och läsning av bets (idempotent)"},
 ]
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Partitionsunderhåll för core.odds; i drift normalt via cron-scriptet
+    if settings.ODDS_PARTITION_MAINTENANCE_ON_STARTUP:
+        try:
+            with SessionLocal() as db:
+                maintain_odds_partitions(db)
+        except Exception:
+            logging.getLogger(__name__).exception("odds partition maintenance failed")
+    # Workers för asynkron POST /odds (Prefer: respond-async)
+    if settings.INGEST_ASYNC_ENABLED:
+        odds_ingest_workers.start()
+    yield
+    await odds_ingest_workers.stop()
+
+
 app = FastAPI(
     title="100kbetting – Core API",
     version="0.1.0",
@@ -50,14 +69,13 @@ app = FastAPI(
     openapi_tags=tags_metadata,
     contact={"name": "100kbetting", "url": "https://example.com"},
     license_info={"name": "Proprietary"},
+    lifespan=lifespan,
 )
 
 setup_tracing(app, engine)
 
-# Request-ID
-app.add_middleware(RequestIdMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(MetricsMiddleware)
+# Request-ID, access-logg, metrics och trace-headers i en ren ASGI-middleware
+app.add_middleware(ObservabilityMiddleware)
 
 # Standardiserade gel
 app.add_exception_handler(RequestValidationError, request_validation_exception_handler)
@@ -79,18 +97,6 @@ if os.getenv("ENABLE_TEST_ENDPOINTS", "1") == "1":
         raise RuntimeError("kaboom")
 
 
-@app.middleware("http")
-async def add_trace_headers(request, call_next):
-    resp = await call_next(request)
-    sc = trace.get_current_span().get_span_context()
-    if sc and sc.is_valid:
-        resp.headers["trace-id"] = format(sc.trace_id, "032x")
-        resp.headers["span-id"] = format(sc.span_id, "016x")
-        # Alternativ enligt W3C:
-        # resp.headers["traceparent"] = f"00-{format(sc.trace_id,'032x')}-{format(sc.span_id,'016x')}-01"
-    return resp
-
-
 app.include_router(health_router, tags=["system"])
 app.include_router(readiness_router, tags=["system"])
 app.include_router(odds_router, tags=["odds"])
@@ -24,8 +24,9 @@ class Odds(Base):
     )
     price: Mapped[Decimal] = mapped_column(Numeric(10, 4), nullable=False)
     probability: Mapped[Decimal | None] = mapped_column(Numeric(7, 6))
+    # partitionsnyckel (månadsvisa range-partitioner), del av PK
     captured_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), nullable=False
+        TIMESTAMP(timezone=True), primary_key=True, nullable=False
     )
     source: Mapped[str | None] = mapped_column(String)
     checksum: Mapped[str | None] = mapped_column(String)
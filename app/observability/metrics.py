@@ -1,31 +1,62 @@
-import time
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import Response
-from prometheus_client import Counter, Histogram, generate_latest
+from starlette.types import Scope
+from prometheus_client import Counter, Gauge, Histogram, generate_latest
 from fastapi import APIRouter
+from app.core.settings import settings
+
+# Fast label för allt som inte matchar en route (scanners, 404-prober)
+UNMATCHED_ROUTE = "__unmatched__"
+OTHER_METHOD = "OTHER"
+_KNOWN_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+
+def _parse_buckets(raw: str) -> list[float]:
+    return sorted(float(b) for b in raw.split(",") if b.strip())
+
 
 REQUESTS = Counter(
     "http_requests_total", "Total HTTP requests", ["method", "path", "status"]
 )
 LATENCY = Histogram(
-    "http_request_duration_seconds", "Request latency seconds", ["method", "path"]
+    "http_request_duration_seconds",
+    "Request latency seconds",
+    ["method", "path"],
+    buckets=_parse_buckets(settings.METRICS_LATENCY_BUCKETS),
+)
+
+# Rate limiting: Redis-fel, circuit breaker och lokal fallback
+RATELIMIT_REDIS_ERRORS = Counter(
+    "ratelimit_redis_errors_total",
+    "Failed or timed out Redis rate-limit calls",
+    ["reason"],
+)
+RATELIMIT_BREAKER_TRIPS = Counter(
+    "ratelimit_breaker_trips_total", "Times the rate-limit circuit breaker opened"
 )
+RATELIMIT_BREAKER_OPEN = Gauge(
+    "ratelimit_breaker_open", "1 while the rate-limit circuit breaker is open"
+)
+RATELIMIT_FALLBACK = Counter(
+    "ratelimit_fallback_total",
+    "Rate-limit decisions made by the local fallback limiter",
+    ["bucket", "result"],
+)
+
+
+def route_label(scope: Scope) -> str:
+    """Matchad route-mall (t.ex. /odds) i stället för rå path -> begränsad kardinalitet."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or UNMATCHED_ROUTE
+
+
+def method_label(method: str) -> str:
+    return method if method in _KNOWN_METHODS else OTHER_METHOD
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start = time.perf_counter()
-        response: Response | None = None
-        try:
-            response = await call_next(request)
-            return response
-        finally:
-            duration = time.perf_counter() - start
-            status = response.status_code if response is not None else 500
-            path = request.url.path
-            REQUESTS.labels(request.method, path, str(status)).inc()
-            LATENCY.labels(request.method, path).observe(duration)
+def observe_request(scope: Scope, status: int, duration: float) -> None:
+    method, path = method_label(scope["method"]), route_label(scope)
+    REQUESTS.labels(method, path, str(status)).inc()
+    LATENCY.labels(method, path).observe(duration)
 
 
 # router som exponerar /metrics (behåll din befintliga om du redan har en)
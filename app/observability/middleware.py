@@ -0,0 +1,64 @@
+import time
+from uuid import uuid4
+from opentelemetry import trace
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.request_id import set_request_id, reset_request_id
+from app.observability.metrics import observe_request
+from app.observability.request_log import log_access
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+class ObservabilityMiddleware:
+    """
+    Ren ASGI-middleware som i ett pass sätter request-id, access-loggar,
+    registrerar metrics och lägger på trace-headers. Response-bodyn strömmas
+    rakt igenom (ingen BaseHTTPMiddleware i stacken).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = (
+            _header(scope, b"x-request-id")
+            or _header(scope, b"x-request_id")
+            or str(uuid4())
+        )
+        scope.setdefault("state", {})["request_id"] = rid
+        token = set_request_id(rid)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-request-id", rid.encode("latin-1")))
+                sc = trace.get_current_span().get_span_context()
+                if sc and sc.is_valid:
+                    headers.append((b"trace-id", format(sc.trace_id, "032x").encode()))
+                    headers.append((b"span-id", format(sc.span_id, "016x").encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            observe_request(scope, status, duration)
+            log_access(
+                rid, scope["method"], scope["path"], status, int(duration * 1000)
+            )
+            reset_request_id(token)
@@ -5,14 +5,19 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.db import get_session, run_db
 from app.core.security import require_scopes
 from app.core.docs import DEFAULT_ERROR_RESPONSES
-from app.schemas.bets import BetIn, BetCreateOut
+from app.core.refdata import find_missing
+from app.core.counting import TOTAL_MODE_PATTERN
+from app.core.pagination import decode_cursor
+from app.core.idempotency import bets_idempotency
+from app.core.responses import LeanJSONResponse
+from app.schemas.bets import BetIn, BetCreateOut, BetsBatchIn, BetsBatchOut
 from app.schemas.pages import BetsPage
-from app.crud.bets import list_bets_page, insert_bet_idempotent
+from app.crud.bets import list_bets_page, insert_bet_idempotent, insert_bets_batch
 
 router = APIRouter()
 
@@ -24,23 +29,13 @@ def _ensure_fk_exists_for_bets(db: Session, rows: list[dict]) -> None:
     sel_ids = sorted({UUID(str(r["selection_id"])) for r in rows})
     missing = []
 
-    if bm_ids:
-        stmt = text(
-            "SELECT bookmaker_id FROM core.bookmakers WHERE bookmaker_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing = {x[0] for x in db.execute(stmt, {"ids": bm_ids})}
-        miss = [str(x) for x in bm_ids if x not in existing]
-        if miss:
-            missing.append(f"unknown bookmaker_id(s): {', '.join(miss)}")
-
-    if sel_ids:
-        stmt = text(
-            "SELECT selection_id FROM core.selections WHERE selection_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing = {x[0] for x in db.execute(stmt, {"ids": sel_ids})}
-        miss = [str(x) for x in sel_ids if x not in existing]
-        if miss:
-            missing.append(f"unknown selection_id(s): {', '.join(miss)}")
+    miss = [str(x) for x in find_missing(db, "bookmaker", bm_ids)]
+    if miss:
+        missing.append(f"unknown bookmaker_id(s): {', '.join(miss)}")
+
+    miss = [str(x) for x in find_missing(db, "selection", sel_ids)]
+    if miss:
+        missing.append(f"unknown selection_id(s): {', '.join(miss)}")
 
     if missing:
         raise HTTPException(status_code=404, detail="; ".join(missing))
@@ -59,10 +54,22 @@ def _ensure_fk_exists_for_bets(db: Session, rows: list[dict]) -> None:
     status_code=201,
     dependencies=[Depends(require_scopes("bets:write"))],
 )
-def post_bet(
-    payload: BetIn, response: Response, db: Session = Depends(get_db)
+async def post_bet(
+    payload: BetIn,
+    response: Response,
+    db: Session | AsyncSession = Depends(get_session),
 ) -> BetCreateOut:
-    created, bet_id = insert_bet_idempotent(db, payload.model_dump())
+    key = payload.idempotency_key
+    # Replay som redan finns i cachen besvaras utan Postgres
+    cached = await bets_idempotency.get(key) if key else None
+    if cached:
+        response.status_code = 200
+        response.headers["x-idempotent-replayed"] = "true"
+        return BetCreateOut(created=False, bet_id=cached)
+
+    created, bet_id = await run_db(db, insert_bet_idempotent, payload.model_dump())
+    if key and bet_id:
+        await bets_idempotency.put(key, bet_id)
     # 200 om det var en idempotent replay, annars 201
     if not created:
         response.status_code = 200
@@ -72,6 +79,37 @@ def post_bet(
     return BetCreateOut(created=created, bet_id=bet_id)
 
 
+@router.post(
+    "/bets/batch",
+    tags=["bets"],
+    summary="Skapa många bets (idempotent per rad)",
+    description="Infogar alla bets i ett statement och en transaktion. Varje rad får status created eller replayed (idempotency_key eller user_ref+external_id fanns redan, även inom samma batch) samt bet_id.",
+    response_model=BetsBatchOut,
+    responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
+    dependencies=[Depends(require_scopes("bets:write"))],
+)
+async def post_bets_batch(
+    payload: BetsBatchIn,
+    db: Session | AsyncSession = Depends(get_session),
+) -> BetsBatchOut:
+    rows = [b.model_dump() for b in payload.items]
+    items = await run_db(db, _insert_bets_batch, rows)
+    await bets_idempotency.put_many(
+        {
+            r["idempotency_key"]: it["bet_id"]
+            for r, it in zip(rows, items)
+            if r.get("idempotency_key") and it["bet_id"]
+        }
+    )
+    created = sum(1 for it in items if it["status"] == "created")
+    return BetsBatchOut(items=items, created=created, replayed=len(items) - created)
+
+
+def _insert_bets_batch(db: Session, rows: list[dict]) -> list[dict]:
+    _ensure_fk_exists_for_bets(db, rows)  # 404 om bookmaker_id/selection_id saknas
+    return insert_bets_batch(db, rows)
+
+
 @router.get(
     "/bets",
     tags=["bets"],
@@ -80,35 +118,34 @@ def post_bet(
     responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
     dependencies=[Depends(require_scopes("read"))],
 )
-def get_bets(
+async def get_bets(
     user_ref: Optional[str] = None,
     bet_status: Optional[Literal["open", "won", "lost", "void", "settled"]] = Query(
         None, alias="status"
     ),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None),
+    total_mode: str = Query("exact", alias="total", pattern=TOTAL_MODE_PATTERN),
+    db: Session | AsyncSession = Depends(get_session),
 ):
-    rows, total, next_offset = list_bets_page(db, user_ref, bet_status, limit, offset)
-    return {
-        "items": [
-            {
-                "bet_id": str(r.bet_id),
-                "external_id": r.external_id,
-                "user_ref": r.user_ref,
-                "match_id": r.match_id,
-                "bookmaker_id": str(r.bookmaker_id),
-                "selection_id": str(r.selection_id),
-                "stake": float(r.stake),
-                "price": float(r.price),
-                "placed_at": r.placed_at.isoformat(),  # låt FastAPI/pydantic serialisera datetime
-                "status": r.status,
-                "result": r.result,
-                "payout": float(r.payout) if r.payout is not None else None,
-                "idempotency_key": r.idempotency_key,
-            }
-            for r in rows
-        ],
-        "total": int(total),
-        "next_offset": next_offset,
-    }
+    after = None
+    if cursor:
+        try:
+            cur_ts, cur_id = decode_cursor(cursor)
+            after = (cur_ts, UUID(str(cur_id)))
+        except Exception:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+
+    rows, total, next_offset, next_cursor = await run_db(
+        db, list_bets_page, user_ref, bet_status, limit, offset, after, total_mode
+    )
+    # råa rader (UUID/Decimal/datetime) serialiseras direkt av LeanJSONResponse
+    return LeanJSONResponse(
+        {
+            "items": [dict(r._mapping) for r in rows],
+            "total": total,
+            "next_cursor": next_cursor,
+            "next_offset": next_offset,
+        }
+    )
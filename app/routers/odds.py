@@ -1,16 +1,35 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 from uuid import UUID
 
 from app.schemas.odds import OddsBulkIn
-from app.schemas.pages import OddsPage
-from app.core.db import get_db
+from app.schemas.ingest import IngestAccepted, IngestBatchOut
+from app.schemas.pages import OddsPage, OddsLatestList
+from app.core.db import get_session, run_db
 from app.core.docs import DEFAULT_ERROR_RESPONSES
 from app.core.pagination import encode_cursor, decode_cursor
-from app.core.ratelimit import per_key_limiter, global_limiter, noop_dependency
+from app.core.counting import count_rows, TOTAL_MODE_PATTERN
+from app.core.export import stream_query, EXPORT_FORMAT_PATTERN, MEDIA_TYPES
+from app.core.responses import LeanJSONResponse, json_items_response
+from app.core.json_pages import fetch_json_page, READ_MODE_PATTERN
+from app.core.columnar import (
+    COLUMNAR_OPENAPI,
+    ODDS_COLUMNS,
+    ColumnarRoute,
+    read_table,
+    rows_from_table,
+)
+from app.core.refdata import find_missing
+from app.core.ratelimit import combined_limiter, bulk_items_cost, noop_dependency
 from app.crud.odds import bulk_upsert_odds
+from app.crud.ingest import enqueue_odds_batch, get_ingest_batch
+from app.core.ingest_worker import odds_ingest_workers
+from app.core.microbatch import odds_microbatcher
 from app.core.settings import settings
 from app.core.security import require_scopes
 
@@ -18,19 +37,17 @@ from app.core.security import require_scopes
 router = APIRouter()
 
 if settings.RATE_LIMIT_ENABLED:
-    _limit_odds_per_key = per_key_limiter(
-        "odds_post",
-        capacity=settings.RL_ODDS_PER_KEY_CAP,
-        refill_per_sec=settings.RL_ODDS_PER_KEY_REFILL,
-    )
-    _limit_odds_global = global_limiter(
+    # per-nyckel + global hink i ett Redis-anrop, kostnad per rad
+    _limit_odds = combined_limiter(
         "odds_post",
-        capacity=settings.RL_ODDS_GLOBAL_CAP,
-        refill_per_sec=settings.RL_ODDS_GLOBAL_REFILL,
+        per_key_capacity=settings.RL_ODDS_PER_KEY_CAP,
+        per_key_refill=settings.RL_ODDS_PER_KEY_REFILL,
+        global_capacity=settings.RL_ODDS_GLOBAL_CAP,
+        global_refill=settings.RL_ODDS_GLOBAL_REFILL,
+        cost_getter=bulk_items_cost,
     )
 else:
-    _limit_odds_per_key = noop_dependency
-    _limit_odds_global = noop_dependency
+    _limit_odds = noop_dependency
 
 
 def _ensure_fk_exists_for_odds(db: Session, rows: list[dict]) -> None:
@@ -42,46 +59,200 @@ def _ensure_fk_exists_for_odds(db: Session, rows: list[dict]) -> None:
 
     missing_parts = []
 
-    if bm_ids:
-        stmt_bm = text(
-            "SELECT bookmaker_id FROM core.bookmakers WHERE bookmaker_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing_bm = {x[0] for x in db.execute(stmt_bm, {"ids": bm_ids})}
-        missing_bm = [str(b) for b in bm_ids if b not in existing_bm]
-        if missing_bm:
-            missing_parts.append(f"unknown bookmaker_id(s): {', '.join(missing_bm)}")
-
-    if sel_ids:
-        stmt_sel = text(
-            "SELECT selection_id FROM core.selections WHERE selection_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing_sel = {x[0] for x in db.execute(stmt_sel, {"ids": sel_ids})}
-        missing_sel = [str(s) for s in sel_ids if s not in existing_sel]
-        if missing_sel:
-            missing_parts.append(f"unknown selection_id(s): {', '.join(missing_sel)}")
+    missing_bm = [str(b) for b in find_missing(db, "bookmaker", bm_ids)]
+    if missing_bm:
+        missing_parts.append(f"unknown bookmaker_id(s): {', '.join(missing_bm)}")
+
+    missing_sel = [str(s) for s in find_missing(db, "selection", sel_ids)]
+    if missing_sel:
+        missing_parts.append(f"unknown selection_id(s): {', '.join(missing_sel)}")
 
     if missing_parts:
         raise HTTPException(status_code=404, detail="; ".join(missing_parts))
 
 
+async def post_odds_columnar(
+    request: Request, db: Session | AsyncSession = Depends(get_session)
+):
+    table = await read_table(request)
+    rows = await run_in_threadpool(rows_from_table, table, ODDS_COLUMNS)
+    return await run_db(db, _upsert_odds, rows)
+
+
+# Arrow/Parquet-bodies: måste registreras före JSON-routen (samma path/metod)
+router.add_api_route(
+    "/odds",
+    post_odds_columnar,
+    methods=["POST"],
+    include_in_schema=False,  # dokumenteras som content types på JSON-routen
+    dependencies=[
+        Depends(require_scopes("odds:write")),
+        Depends(_limit_odds),
+    ],
+    route_class_override=ColumnarRoute,
+)
+
+
 @router.post(
     "/odds",
     summary="Bulk upsert odds",
-    description="Tar emot en lista av odds-snapshots och upsertar dem mot unik nyckel (match_id, bookmaker_id, selection_id, captured_at).",
-    responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
+    description=(
+        "Tar emot en lista av odds-snapshots och upsertar dem mot unik nyckel "
+        "(match_id, bookmaker_id, selection_id, captured_at). Med "
+        "`Prefer: respond-async` (och INGEST_ASYNC_ENABLED) köas batchen i "
+        "stället och svaret blir 202 med ett batch_id att följa upp via "
+        "GET /odds/ingest/{batch_id}. Bodyn kan även skickas som Arrow IPC "
+        "eller Parquet med en kolumn per fält; den valideras då kolumnvis."
+    ),
+    openapi_extra=COLUMNAR_OPENAPI,
+    responses={
+        **DEFAULT_ERROR_RESPONSES,
+        200: {"description": "OK"},
+        202: {"description": "Köad", "model": IngestAccepted},
+    },
     dependencies=[
         Depends(require_scopes("odds:write")),
-        Depends(_limit_odds_per_key),
-        Depends(_limit_odds_global),
+        Depends(_limit_odds),
     ],
 )
-def post_odds(payload: OddsBulkIn, db: Session = Depends(get_db)):
+async def post_odds(
+    payload: OddsBulkIn,
+    request: Request,
+    db: Session | AsyncSession = Depends(get_session),
+):
+    if settings.INGEST_ASYNC_ENABLED and _prefers_async(request):
+        rows = [o.model_dump(mode="json") for o in payload.items]
+        batch_id = await run_db(db, _enqueue_odds, rows)
+        odds_ingest_workers.notify()
+        return JSONResponse(
+            status_code=202,
+            content=IngestAccepted(batch_id=batch_id, count=len(rows)).model_dump(
+                mode="json"
+            ),
+            headers={
+                "Location": f"/odds/ingest/{batch_id}",
+                "Preference-Applied": "respond-async",
+            },
+        )
     rows = [o.model_dump() for o in payload.items]
-    _ensure_fk_exists_for_odds(db, rows)  # 404 om model_id/selection_id saknas
+    if odds_microbatcher.accepts(rows):
+        # små skrivningar delar upsert/commit med samtidiga requests
+        await run_db(db, _ensure_fk_exists_for_odds, rows)
+        return await odds_microbatcher.submit(rows)
+    return await run_db(db, _upsert_odds, rows)
+
+
+def _prefers_async(request: Request) -> bool:
+    # RFC 7240: "Prefer: respond-async[, wait=10]"
+    prefs = request.headers.get("prefer", "")
+    return any(p.split(";")[0].strip() == "respond-async" for p in prefs.split(","))
+
+
+def _enqueue_odds(db: Session, rows: list[dict]):
+    _ensure_fk_exists_for_odds(db, rows)  # 404 redan vid mottagning
+    return enqueue_odds_batch(db, rows)
+
+
+@router.get(
+    "/odds/ingest/{batch_id}",
+    tags=["odds"],
+    summary="Status för köad odds-batch",
+    response_model=IngestBatchOut,
+    responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
+    dependencies=[Depends(require_scopes("read"))],
+)
+async def get_odds_ingest_batch(
+    batch_id: UUID, db: Session | AsyncSession = Depends(get_session)
+):
+    batch = await run_db(db, get_ingest_batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="unknown batch_id")
+    return batch
+
+
+def _upsert_odds(db: Session, rows: list[dict]) -> dict:
+    _ensure_fk_exists_for_odds(db, rows)  # 404 om bookmaker_id/selection_id saknas
     result = bulk_upsert_odds(db, rows)  # återanvänd rows
     return result
 
 
+@router.get(
+    "/odds/latest",
+    tags=["odds"],
+    summary="Senaste odds per bookmaker och selection",
+    description="Läser core.odds_latest (en rad per match_id, bookmaker_id, selection_id) i stället för att skanna historiken.",
+    response_model=OddsLatestList,
+    responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
+    dependencies=[Depends(require_scopes("read"))],
+)
+async def get_odds_latest(
+    match_id: str,
+    bookmaker_id: UUID | None = None,
+    selection_id: UUID | None = None,
+    db: Session | AsyncSession = Depends(get_session),
+):
+    return await run_db(
+        db,
+        _list_odds_latest,
+        match_id=match_id,
+        bookmaker_id=bookmaker_id,
+        selection_id=selection_id,
+    )
+
+
+def _list_odds_latest(
+    db: Session,
+    match_id: str,
+    bookmaker_id: UUID | None,
+    selection_id: UUID | None,
+) -> dict:
+    # PK-prefix (match_id[, bookmaker_id[, selection_id]]) -> indexuppslag
+    where = ["match_id = :match_id"]
+    params: dict = {"match_id": match_id}
+    if bookmaker_id:
+        where.append("bookmaker_id = :bookmaker_id")
+        params["bookmaker_id"] = bookmaker_id
+    if selection_id:
+        where.append("selection_id = :selection_id")
+        params["selection_id"] = selection_id
+
+    rows = (
+        db.execute(
+            text(
+                f"""
+            SELECT odds_id, match_id, bookmaker_id, selection_id, price,
+                   probability, captured_at, source, checksum, updated_at
+            FROM core.odds_latest
+            WHERE {" AND ".join(where)}
+            ORDER BY bookmaker_id, selection_id
+            """
+            ),
+            params,
+        )
+        .mappings()
+        .all()
+    )
+
+    items = [
+        {
+            "odds_id": str(r["odds_id"]),
+            "match_id": r["match_id"],
+            "bookmaker_id": str(r["bookmaker_id"]),
+            "selection_id": str(r["selection_id"]),
+            "price": float(r["price"]),
+            "probability": (
+                float(r["probability"]) if r["probability"] is not None else None
+            ),
+            "captured_at": r["captured_at"].isoformat(),
+            "source": r["source"],
+            "checksum": r["checksum"],
+            "updated_at": r["updated_at"].isoformat(),
+        }
+        for r in rows
+    ]
+    return {"items": items}
+
+
 @router.get(
     "/odds",
     tags=["odds"],
@@ -90,7 +261,7 @@ def post_odds(payload: OddsBulkIn, db: Session = Depends(get_db)):
     responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
     dependencies=[Depends(require_scopes("read"))],
 )
-def get_odds(
+async def get_odds(
     match_id: str | None = None,
     bookmaker_id: UUID | None = None,
     selection_id: UUID | None = None,
@@ -100,32 +271,159 @@ def get_odds(
     offset: int = Query(0, ge=0),
     cursor: str | None = Query(None),
     sort: str = Query("asc", pattern="^(asc|desc)$"),
-    db: Session = Depends(get_db),
+    total_mode: str = Query("exact", alias="total", pattern=TOTAL_MODE_PATTERN),
+    read_mode: str | None = Query(None, alias="read", pattern=READ_MODE_PATTERN),
+    db: Session | AsyncSession = Depends(get_session),
 ):
-    where_base = ["1=1"]
+    return await run_db(
+        db,
+        _list_odds,
+        match_id=match_id,
+        bookmaker_id=bookmaker_id,
+        selection_id=selection_id,
+        ts_from=ts_from,
+        ts_to=ts_to,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        sort=sort,
+        total_mode=total_mode,
+        read_mode=read_mode or settings.LIST_READ_MODE,
+    )
+
+
+ODDS_ROW_COLUMNS = """
+    odds_id, match_id, bookmaker_id, selection_id, price,
+    probability, captured_at, source, checksum, created_at
+"""
+# read=json: samma kolumner, NUMERIC som float8 så att JSON-talen blir som i rows-läget
+ODDS_JSON_COLUMNS = """
+    odds_id, match_id, bookmaker_id, selection_id, price::float8 AS price,
+    probability::float8 AS probability, captured_at, source, checksum, created_at
+"""
+
+ODDS_EXPORT_COLUMNS = [
+    "odds_id",
+    "match_id",
+    "bookmaker_id",
+    "selection_id",
+    "price",
+    "probability",
+    "captured_at",
+    "source",
+    "checksum",
+    "created_at",
+]
+
+
+@router.get(
+    "/odds/export",
+    tags=["odds"],
+    summary="Exportera odds-historik",
+    description="Strömmar alla odds som matchar filtren (sorterat på captured_at, odds_id) som NDJSON eller CSV via en server-side cursor, utan paginering.",
+    response_class=StreamingResponse,
+    responses={
+        **DEFAULT_ERROR_RESPONSES,
+        200: {
+            "description": "OK",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        },
+    },
+    dependencies=[Depends(require_scopes("read"))],
+)
+async def export_odds(
+    match_id: str | None = None,
+    bookmaker_id: UUID | None = None,
+    selection_id: UUID | None = None,
+    ts_from: datetime | None = Query(None, alias="ts_from"),
+    ts_to: datetime | None = Query(None, alias="ts_to"),
+    fmt: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+):
+    where, params = _odds_filters(match_id, bookmaker_id, selection_id, ts_from, ts_to)
+    sql = f"""
+        SELECT {", ".join(ODDS_EXPORT_COLUMNS)}
+        FROM core.odds
+        WHERE {" AND ".join(where)}
+        ORDER BY captured_at ASC, odds_id ASC
+    """
+    headers = {}
+    if fmt == "csv":
+        headers["content-disposition"] = 'attachment; filename="odds.csv"'
+    return StreamingResponse(
+        stream_query(sql, params, _odds_item, fmt, ODDS_EXPORT_COLUMNS),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
+
+
+def _odds_filters(
+    match_id: str | None,
+    bookmaker_id: UUID | None,
+    selection_id: UUID | None,
+    ts_from: datetime | None,
+    ts_to: datetime | None,
+) -> tuple[list[str], dict]:
+    where = ["1=1"]
     params: dict = {}
 
     if match_id:
-        where_base.append("match_id = :match_id")
+        where.append("match_id = :match_id")
         params["match_id"] = match_id
     if bookmaker_id:
-        where_base.append("bookmaker_id = :bookmaker_id")
+        where.append("bookmaker_id = :bookmaker_id")
         params["bookmaker_id"] = bookmaker_id
     if selection_id:
-        where_base.append("selection_id = :selection_id")
+        where.append("selection_id = :selection_id")
         params["selection_id"] = selection_id
     if ts_from:
-        where_base.append("captured_at >= :ts_from")
+        where.append("captured_at >= :ts_from")
         params["ts_from"] = ts_from
     if ts_to:
-        where_base.append("captured_at <= :ts_to")
-        params["ts_to"] = ts_to  # <-- fix
+        where.append("captured_at <= :ts_to")
+        params["ts_to"] = ts_to
+    return where, params
+
+
+def _odds_item(r) -> dict:
+    return {
+        "odds_id": str(r["odds_id"]),
+        "match_id": r["match_id"],
+        "bookmaker_id": str(r["bookmaker_id"]),
+        "selection_id": str(r["selection_id"]),
+        "price": float(r["price"]),
+        "probability": (
+            float(r["probability"]) if r["probability"] is not None else None
+        ),
+        "captured_at": r["captured_at"].isoformat(),
+        "source": r["source"],
+        "checksum": r["checksum"],
+        "created_at": r["created_at"].isoformat() if r["created_at"] else None,
+    }
+
+
+def _list_odds(
+    db: Session,
+    match_id: str | None,
+    bookmaker_id: UUID | None,
+    selection_id: UUID | None,
+    ts_from: datetime | None,
+    ts_to: datetime | None,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    sort: str,
+    total_mode: str,
+    read_mode: str = "rows",
+) -> Response:
+    where_base, params = _odds_filters(
+        match_id, bookmaker_id, selection_id, ts_from, ts_to
+    )
 
-    # total: utan cursor
+    # total: bara på första sidan (cursor-sidor har samma total)
     where_base_sql = " AND ".join(where_base)
-    total = db.execute(
-        text(f"SELECT COUNT(*) FROM core.odds WHERE {where_base_sql}"), params
-    ).scalar_one()
+    total = None
+    if not cursor:
+        total = count_rows(db, "core.odds", where_base_sql, params, total_mode)
 
     # cursor: läggs ovanpå basfiltren
     where = list(where_base)
@@ -138,64 +436,61 @@ def get_odds(
         except Exception:
             raise HTTPException(status_code=400, detail="invalid cursor")
         where.append(f"(captured_at, odds_id) {cmp} (:cur_ts, :cur_id)")
+        # radjämförelsen ger ingen partition pruning; den enkla gränsen gör det
+        where.append(f"captured_at {cmp}= :cur_ts")
         params["cur_ts"] = cur_ts
         params["cur_id"] = cur_id
 
     where_sql = " AND ".join(where)
-    order_clause = f"captured_at {order}, odds_id {order}"
+    if match_id and bookmaker_id and selection_id:
+        # uq_odds_snapshot: captured_at är unik inom nyckeln, ingen tiebreak
+        # behövs och constraint-indexet ger ordningen utan sortering
+        order_clause = f"captured_at {order}"
+    else:
+        order_clause = f"captured_at {order}, odds_id {order}"
 
     # Använd OFFSET bara när vi inte kör med cursor
     offset_clause = "" if cursor else "OFFSET :offset"
 
-    items_sql = text(
-        f"""
-        SELECT odds_id, match_id, bookmaker_id, selection_id, price,
-               probability, captured_at, source, checksum, created_at
+    columns = ODDS_JSON_COLUMNS if read_mode == "json" else ODDS_ROW_COLUMNS
+    page_sql = f"""
+        SELECT {columns}
         FROM core.odds
         WHERE {where_sql}
         ORDER BY {order_clause}
         LIMIT :limit
         {offset_clause}
     """
-    )
 
     exec_params = {**params, "limit": limit}
     if not cursor:
         exec_params["offset"] = offset
 
-    rows = db.execute(items_sql, exec_params).mappings().all()
-
-    items = [
-        {
-            "odds_id": str(r["odds_id"]),
-            "match_id": r["match_id"],
-            "bookmaker_id": str(r["bookmaker_id"]),
-            "selection_id": str(r["selection_id"]),
-            "price": float(r["price"]),
-            "probability": (
-                float(r["probability"]) if r["probability"] is not None else None
-            ),
-            "captured_at": r["captured_at"].isoformat(),
-            "source": r["source"],
-            "checksum": r["checksum"],
-            "created_at": r["created_at"].isoformat() if r["created_at"] else None,
-        }
-        for r in rows
-    ]
+    if read_mode == "json":
+        items_json, n, last = fetch_json_page(
+            db, page_sql, exec_params, order_clause, ("captured_at", "odds_id")
+        )
+    else:
+        rows = db.execute(text(page_sql), exec_params).mappings().all()
+        # råa rader (UUID/Decimal/datetime) serialiseras direkt av LeanJSONResponse
+        items = [dict(r) for r in rows]
+        n = len(rows)
+        last = (rows[-1]["captured_at"], rows[-1]["odds_id"]) if rows else None
 
     next_cursor = None
-    if len(rows) == limit:
-        last = rows[-1]
-        next_cursor = encode_cursor(last["captured_at"], last["odds_id"])
+    if n == limit:
+        next_cursor = encode_cursor(*last)
 
     next_offset = None
     if not cursor:
-        no = offset + len(items)
-        next_offset = no if no < total else None
+        no = offset + n
+        if total_mode == "exact":
+            next_offset = no if no < total else None
+        else:
+            # estimat/ingen total: fortsätt så länge sidan blev full
+            next_offset = no if n == limit else None
 
-    return {
-        "items": items,
-        "total": total,
-        "next_cursor": next_cursor,
-        "next_offset": next_offset,
-    }
+    meta = {"total": total, "next_cursor": next_cursor, "next_offset": next_offset}
+    if read_mode == "json":
+        return json_items_response(items_json, **meta)
+    return LeanJSONResponse({"items": items, **meta})
@@ -1,19 +1,48 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import text, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 from uuid import UUID
 
 from app.schemas.predictions import PredictionsBulkIn
 from app.schemas.pages import PredictionsPage
-from app.core.db import get_db
+from app.core.db import get_session, run_db
 from app.core.security import require_scopes
 from app.core.docs import DEFAULT_ERROR_RESPONSES
+from app.core.refdata import find_missing
 from app.core.pagination import encode_cursor, decode_cursor
+from app.core.counting import count_rows, TOTAL_MODE_PATTERN
+from app.core.responses import LeanJSONResponse, json_items_response
+from app.core.json_pages import fetch_json_page, READ_MODE_PATTERN
+from app.core.columnar import (
+    COLUMNAR_OPENAPI,
+    PREDICTION_COLUMNS,
+    ColumnarRoute,
+    read_table,
+    rows_from_table,
+)
+from app.core.ratelimit import combined_limiter, bulk_items_cost, noop_dependency
+from app.core.settings import settings
 from app.crud.predictions import bulk_upsert_predictions
 
 router = APIRouter()
 
+if settings.RATE_LIMIT_ENABLED:
+    # per-nyckel + global hink i ett Redis-anrop, kostnad per rad
+    _limit_predictions = combined_limiter(
+        "predictions_post",
+        per_key_capacity=settings.RL_PREDICTIONS_PER_KEY_CAP,
+        per_key_refill=settings.RL_PREDICTIONS_PER_KEY_REFILL,
+        global_capacity=settings.RL_PREDICTIONS_GLOBAL_CAP,
+        global_refill=settings.RL_PREDICTIONS_GLOBAL_REFILL,
+        cost_getter=bulk_items_cost,
+    )
+else:
+    _limit_predictions = noop_dependency
+
 
 def _ensure_fk_exists_for_predictions(db: Session, rows: list[dict]) -> None:
     if not rows:
@@ -23,37 +52,63 @@ def _ensure_fk_exists_for_predictions(db: Session, rows: list[dict]) -> None:
 
     missing = []
 
-    if model_ids:
-        stmt = text(
-            "SELECT model_id FROM core.models WHERE model_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing = {x[0] for x in db.execute(stmt, {"ids": model_ids})}
-        miss = [str(x) for x in model_ids if x not in existing]
-        if miss:
-            missing.append(f"unknown model_id(s): {', '.join(miss)}")
-
-    if sel_ids:
-        stmt = text(
-            "SELECT selection_id FROM core.selections WHERE selection_id IN :ids"
-        ).bindparams(bindparam("ids", expanding=True))
-        existing = {x[0] for x in db.execute(stmt, {"ids": sel_ids})}
-        miss = [str(x) for x in sel_ids if x not in existing]
-        if miss:
-            missing.append(f"unknown selection_id(s): {', '.join(miss)}")
+    miss = [str(x) for x in find_missing(db, "model", model_ids)]
+    if miss:
+        missing.append(f"unknown model_id(s): {', '.join(miss)}")
+
+    miss = [str(x) for x in find_missing(db, "selection", sel_ids)]
+    if miss:
+        missing.append(f"unknown selection_id(s): {', '.join(miss)}")
 
     if missing:
         raise HTTPException(status_code=404, detail="; ".join(missing))
 
 
+async def post_predictions_columnar(
+    request: Request, db: Session | AsyncSession = Depends(get_session)
+):
+    table = await read_table(request)
+    rows = await run_in_threadpool(rows_from_table, table, PREDICTION_COLUMNS)
+    return await run_db(db, _upsert_predictions, rows)
+
+
+# Arrow/Parquet-bodies: måste registreras före JSON-routen (samma path/metod)
+router.add_api_route(
+    "/predictions",
+    post_predictions_columnar,
+    methods=["POST"],
+    include_in_schema=False,  # dokumenteras som content types på JSON-routen
+    dependencies=[
+        Depends(require_scopes("predictions:write")),
+        Depends(_limit_predictions),
+    ],
+    route_class_override=ColumnarRoute,
+)
+
+
 @router.post(
     "/predictions",
     tags=["predictions"],
     summary="Bulk upsert predictions",
+    description=(
+        "JSON som standard; bodyn kan även skickas som Arrow IPC eller "
+        "Parquet med en kolumn per fält och valideras då kolumnvis."
+    ),
     responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
-    dependencies=[Depends(require_scopes("predictions:write"))],
+    openapi_extra=COLUMNAR_OPENAPI,
+    dependencies=[
+        Depends(require_scopes("predictions:write")),
+        Depends(_limit_predictions),
+    ],
 )
-def post_predictions(payload: PredictionsBulkIn, db: Session = Depends(get_db)):
+async def post_predictions(
+    payload: PredictionsBulkIn, db: Session | AsyncSession = Depends(get_session)
+):
     rows = [o.model_dump() for o in payload.items]
+    return await run_db(db, _upsert_predictions, rows)
+
+
+def _upsert_predictions(db: Session, rows: list[dict]) -> dict:
     _ensure_fk_exists_for_predictions(db, rows)  # 404 om model_id/selection_id saknas
     result = bulk_upsert_predictions(db, rows)
     return result
@@ -67,8 +122,8 @@ def post_predictions(payload: PredictionsBulkIn, db: Session = Depends(get_db)):
     dependencies=[Depends(require_scopes("read"))],
     responses={**DEFAULT_ERROR_RESPONSES, 200: {"description": "OK"}},
 )
-def get_predictions(
-    db: Session = Depends(get_db),
+async def get_predictions(
+    db: Session | AsyncSession = Depends(get_session),
     match_id: str | None = None,
     model_id: UUID | None = None,
     version: str | None = None,
@@ -79,7 +134,55 @@ def get_predictions(
     cursor: str | None = Query(None),
     offset: int = Query(0, ge=0),
     sort: str = Query("asc", pattern="^(asc|desc)$"),
+    total_mode: str = Query("exact", alias="total", pattern=TOTAL_MODE_PATTERN),
+    read_mode: str | None = Query(None, alias="read", pattern=READ_MODE_PATTERN),
 ):
+    return await run_db(
+        db,
+        _list_predictions,
+        match_id=match_id,
+        model_id=model_id,
+        version=version,
+        selection_id=selection_id,
+        ts_from=ts_from,
+        ts_to=ts_to,
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
+        sort=sort,
+        total_mode=total_mode,
+        read_mode=read_mode or settings.LIST_READ_MODE,
+    )
+
+
+PREDICTION_ROW_COLUMNS = """
+    prediction_id, match_id, model_id, version, selection_id,
+    probability, odds_fair, COALESCE(features, '{}'::jsonb) AS features,
+    predicted_at
+"""
+# read=json: samma kolumner, NUMERIC som float8 så att JSON-talen blir som i rows-läget
+PREDICTION_JSON_COLUMNS = """
+    prediction_id, match_id, model_id, version, selection_id,
+    probability::float8 AS probability, odds_fair::float8 AS odds_fair,
+    COALESCE(features, '{}'::jsonb) AS features, predicted_at
+"""
+
+
+def _list_predictions(
+    db: Session,
+    match_id: str | None,
+    model_id: UUID | None,
+    version: str | None,
+    selection_id: UUID | None,
+    ts_from: datetime | None,
+    ts_to: datetime | None,
+    limit: int,
+    cursor: str | None,
+    offset: int,
+    sort: str,
+    total_mode: str,
+    read_mode: str = "rows",
+) -> Response:
     where = ["1=1"]
     params: dict = {}
     if match_id:
@@ -105,11 +208,11 @@ def get_predictions(
     cmp = ">" if sort == "asc" else "<"
     order_clause = f"predicted_at {order}, prediction_id {order}"
 
-    # total utan cursor
+    # total: bara på första sidan (cursor-sidor har samma total)
     where_base_sql = " AND ".join(where)
-    total = db.execute(
-        text(f"SELECT COUNT(*) FROM core.predictions WHERE {where_base_sql}"), params
-    ).scalar_one()
+    total = None
+    if not cursor:
+        total = count_rows(db, "core.predictions", where_base_sql, params, total_mode)
 
     # cursorfilter ovanpå basen
     if cursor:
@@ -124,56 +227,45 @@ def get_predictions(
     where_sql = " AND ".join(where)
     offset_clause = "" if cursor else "OFFSET :offset"
 
-    items_sql = text(
-        f"""
-        SELECT prediction_id, match_id, model_id, version, selection_id,
-               probability, odds_fair, features, predicted_at
+    columns = PREDICTION_JSON_COLUMNS if read_mode == "json" else PREDICTION_ROW_COLUMNS
+    page_sql = f"""
+        SELECT {columns}
         FROM core.predictions
         WHERE {where_sql}
         ORDER BY {order_clause}
         LIMIT :limit
         {offset_clause}
     """
-    )
 
     exec_params = {**params, "limit": limit}
     if not cursor:
         exec_params["offset"] = offset
 
-    rows = db.execute(items_sql, exec_params).mappings().all()
-
-    items = [
-        {
-            "prediction_id": str(r["prediction_id"]),
-            "match_id": r["match_id"],
-            "model_id": str(r["model_id"]),
-            "version": r["version"],
-            "selection_id": str(r["selection_id"]),
-            "probability": (
-                float(r["probability"]) if r["probability"] is not None else None
-            ),
-            "odds_fair": float(r["odds_fair"]) if r["odds_fair"] is not None else None,
-            "features": r["features"] or {},
-            "predicted_at": r[
-                "predicted_at"
-            ].isoformat(),  # låt Pydantic serialisera datetime
-        }
-        for r in rows
-    ]
+    if read_mode == "json":
+        items_json, n, last = fetch_json_page(
+            db, page_sql, exec_params, order_clause, ("predicted_at", "prediction_id")
+        )
+    else:
+        rows = db.execute(text(page_sql), exec_params).mappings().all()
+        # råa rader (UUID/Decimal/datetime) serialiseras direkt av LeanJSONResponse
+        items = [dict(r) for r in rows]
+        n = len(rows)
+        last = (rows[-1]["predicted_at"], rows[-1]["prediction_id"]) if rows else None
 
     next_cursor = None
-    if len(rows) == limit:
-        last = rows[-1]
-        next_cursor = encode_cursor(last["predicted_at"], last["prediction_id"])
+    if n == limit:
+        next_cursor = encode_cursor(*last)
 
     next_offset = None
     if not cursor:
-        no = offset + len(items)
-        next_offset = no if no < total else None
-
-    return {
-        "items": items,
-        "total": int(total),
-        "next_cursor": next_cursor,
-        "next_offset": next_offset,
-    }
+        no = offset + n
+        if total_mode == "exact":
+            next_offset = no if no < total else None
+        else:
+            # estimat/ingen total: fortsätt så länge sidan blev full
+            next_offset = no if n == limit else None
+
+    meta = {"total": total, "next_cursor": next_cursor, "next_offset": next_offset}
+    if read_mode == "json":
+        return json_items_response(items_json, **meta)
+    return LeanJSONResponse({"items": items, **meta})
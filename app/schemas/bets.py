@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pydantic import Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from uuid import UUID
 from .base import APISchema
@@ -23,6 +23,26 @@ class BetCreateOut(APISchema):
     bet_id: Optional[UUID] = None
 
 
+# Max antal bets per POST /bets/batch
+BETS_BATCH_MAX = 1000
+
+
+class BetsBatchIn(APISchema):
+    items: List[BetIn] = Field(min_length=1, max_length=BETS_BATCH_MAX)
+
+
+class BetBatchItemOut(APISchema):
+    index: int  # position i inskickad items-lista
+    status: Literal["created", "replayed"]
+    bet_id: Optional[UUID] = None
+
+
+class BetsBatchOut(APISchema):
+    items: List[BetBatchItemOut]
+    created: int
+    replayed: int
+
+
 # (Valfritt men bra för tydlighet i list-svar)
 class BetOut(APISchema):
     bet_id: UUID
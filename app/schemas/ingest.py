@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Literal, Optional
+from uuid import UUID
+
+from .base import APISchema
+
+
+class IngestAccepted(APISchema):
+    batch_id: UUID
+    status: Literal["queued"] = "queued"
+    count: int
+
+
+class IngestBatchOut(APISchema):
+    batch_id: UUID
+    entity: str
+    source: Optional[str] = None
+    count: Optional[int] = None
+    status: str  # queued | ok | failed
+    accepted_at: datetime
+    finished_at: Optional[datetime] = None
+    # inserted/updated för sammanslagen grupp, error, eller attempts + error
+    # medan en batch väntar på nytt försök
+    details: Optional[dict] = None
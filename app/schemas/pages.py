@@ -18,11 +18,28 @@ class OddsItem(APISchema):
 
 class OddsPage(APISchema):
     items: List[OddsItem]
-    total: int
+    total: Optional[int] = None  # None vid cursor-sidor eller total=none
     next_cursor: Optional[str] = None
     next_offset: Optional[int]
 
 
+class OddsLatestItem(APISchema):
+    odds_id: str
+    match_id: str
+    bookmaker_id: str
+    selection_id: str
+    price: float
+    probability: float | None
+    captured_at: str
+    source: str | None
+    checksum: str | None
+    updated_at: str
+
+
+class OddsLatestList(APISchema):
+    items: List[OddsLatestItem]
+
+
 class PredictionItem(APISchema):
     prediction_id: str
     match_id: str
@@ -37,7 +54,7 @@ class PredictionItem(APISchema):
 
 class PredictionsPage(APISchema):
     items: List[PredictionItem]
-    total: int
+    total: Optional[int] = None  # None vid cursor-sidor eller total=none
     next_cursor: Optional[str] = None
     next_offset: Optional[int] = None
 
@@ -60,5 +77,6 @@ class BetItem(APISchema):
 
 class BetsPage(APISchema):
     items: List[BetItem]
-    total: int
-    next_offset: Optional[int]
+    total: Optional[int] = None  # None vid cursor-sidor eller total=none
+    next_cursor: Optional[str] = None
+    next_offset: Optional[int] = None
@@ -0,0 +1,226 @@
+"""Partition core.odds by captured_at (monthly range partitions)
+
+Revision ID: 5e1f0c9a7b21
+Revises: ab8852cf8896
+Create Date: 2026-10-18 09:12:40.118233
+
+"""
+
+from alembic import op
+
+
+revision = "5e1f0c9a7b21"
+down_revision = "ab8852cf8896"
+branch_labels = None
+depends_on = None
+
+# Antal framtida månader som skapas direkt vid migreringen
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    # 1) Flytta undan nuvarande heap; släpp dess index/constraints så att
+    #    namnen kan återanvändas på den partitionerade tabellen.
+    op.execute("ALTER TABLE core.odds RENAME TO odds_legacy")
+    op.execute("ALTER TABLE core.odds_legacy DROP CONSTRAINT IF EXISTS odds_pkey")
+    op.execute(
+        "ALTER TABLE core.odds_legacy DROP CONSTRAINT IF EXISTS uq_odds_snapshot"
+    )
+    for idx in (
+        "idx_odds_match",
+        "idx_odds_selection",
+        "idx_odds_bookmaker",
+        "idx_odds_captured_at",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS core.{idx}")
+
+    # 2) Partitionerad tabell. PK/unika nycklar måste innehålla partitionsnyckeln.
+    op.execute(
+        """
+    CREATE TABLE core.odds (
+        odds_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+        match_id TEXT NOT NULL,
+        bookmaker_id UUID NOT NULL
+            CONSTRAINT odds_bookmaker_id_fkey REFERENCES core.bookmakers(bookmaker_id),
+        selection_id UUID NOT NULL
+            CONSTRAINT odds_selection_id_fkey REFERENCES core.selections(selection_id),
+        price NUMERIC(10,4) NOT NULL,
+        probability NUMERIC(7,6),
+        captured_at TIMESTAMPTZ NOT NULL,
+        source TEXT,
+        checksum TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        CONSTRAINT odds_pkey PRIMARY KEY (odds_id, captured_at),
+        CONSTRAINT uq_odds_snapshot
+            UNIQUE (match_id, bookmaker_id, selection_id, captured_at),
+        CONSTRAINT chk_odds_price_gt_1 CHECK (price > 1.0),
+        CONSTRAINT chk_odds_prob_0_1
+            CHECK (probability IS NULL OR (probability >= 0 AND probability <= 1))
+    ) PARTITION BY RANGE (captured_at)
+    """
+    )
+    op.execute("CREATE INDEX idx_odds_match ON core.odds(match_id)")
+    op.execute("CREATE INDEX idx_odds_selection ON core.odds(selection_id)")
+    op.execute("CREATE INDEX idx_odds_bookmaker ON core.odds(bookmaker_id)")
+    op.execute("CREATE INDEX idx_odds_captured_at ON core.odds(captured_at)")
+
+    # Fångar rader utanför skapade månader (t.ex. sena/framtida snapshots)
+    op.execute("CREATE TABLE core.odds_default PARTITION OF core.odds DEFAULT")
+
+    # 3) Underhållsfunktioner (anropas av app/cron, se app/crud/partitions.py)
+    op.execute(
+        r"""
+    CREATE OR REPLACE FUNCTION core.create_odds_partition(p_at timestamptz)
+    RETURNS text LANGUAGE plpgsql AS $$
+    DECLARE
+        p_start timestamptz := date_trunc('month', p_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+        p_end   timestamptz := p_start + interval '1 month';
+        p_name  text := 'odds_p' || to_char(p_start AT TIME ZONE 'UTC', 'YYYYMM');
+    BEGIN
+        IF to_regclass('core.' || p_name) IS NOT NULL THEN
+            RETURN p_name;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE core.%I (LIKE core.odds INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+            p_name);
+        -- rader som redan hamnat i default-partitionen flyttas innan ATTACH
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM core.odds_default
+                            WHERE captured_at >= $1 AND captured_at < $2
+                            RETURNING *)
+             INSERT INTO core.%I SELECT * FROM moved', p_name)
+            USING p_start, p_end;
+        EXECUTE format(
+            'ALTER TABLE core.odds ATTACH PARTITION core.%I FOR VALUES FROM (%L) TO (%L)',
+            p_name, p_start, p_end);
+        RETURN p_name;
+    END;
+    $$;
+    """
+    )
+    op.execute(
+        r"""
+    CREATE OR REPLACE FUNCTION core.ensure_odds_partitions(p_months_ahead int)
+    RETURNS SETOF text LANGUAGE sql AS $$
+        SELECT core.create_odds_partition(
+            date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+            + make_interval(months => m))
+        FROM generate_series(0, p_months_ahead) AS m
+    $$;
+    """
+    )
+    op.execute(
+        r"""
+    CREATE OR REPLACE FUNCTION core.drop_expired_odds_partitions(
+        p_retention interval, p_drop boolean DEFAULT true)
+    RETURNS SETOF text LANGUAGE plpgsql AS $$
+    DECLARE
+        part record;
+    BEGIN
+        FOR part IN
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'core.odds'::regclass
+              AND c.relname ~ '^odds_p[0-9]{6}$'
+              AND (to_timestamp(substr(c.relname, 7), 'YYYYMM') AT TIME ZONE 'UTC')::timestamp
+                  + interval '1 month'
+                  <= (now() - p_retention) AT TIME ZONE 'UTC'
+            ORDER BY c.relname
+        LOOP
+            EXECUTE format('ALTER TABLE core.odds DETACH PARTITION core.%I', part.relname);
+            IF p_drop THEN
+                EXECUTE format('DROP TABLE core.%I', part.relname);
+            END IF;
+            RETURN NEXT part.relname;
+        END LOOP;
+    END;
+    $$;
+    """
+    )
+
+    # 4) Månader för befintlig historik + framtida månader, sedan kopiera data
+    op.execute(
+        """
+    SELECT core.create_odds_partition(m)
+    FROM (
+        SELECT DISTINCT date_trunc('month', captured_at AT TIME ZONE 'UTC')
+                        AT TIME ZONE 'UTC' AS m
+        FROM core.odds_legacy
+    ) s
+    """
+    )
+    op.execute(f"SELECT core.ensure_odds_partitions({MONTHS_AHEAD})")
+    op.execute(
+        """
+    INSERT INTO core.odds (
+        odds_id, match_id, bookmaker_id, selection_id, price,
+        probability, captured_at, source, checksum, created_at
+    )
+    SELECT odds_id, match_id, bookmaker_id, selection_id, price,
+           probability, captured_at, source, checksum, created_at
+    FROM core.odds_legacy
+    """
+    )
+    op.execute("DROP TABLE core.odds_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE core.odds RENAME TO odds_partitioned")
+    op.execute("ALTER TABLE core.odds_partitioned DROP CONSTRAINT IF EXISTS odds_pkey")
+    op.execute(
+        "ALTER TABLE core.odds_partitioned DROP CONSTRAINT IF EXISTS uq_odds_snapshot"
+    )
+    for idx in (
+        "idx_odds_match",
+        "idx_odds_selection",
+        "idx_odds_bookmaker",
+        "idx_odds_captured_at",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS core.{idx}")
+
+    op.execute(
+        """
+    CREATE TABLE core.odds (
+        odds_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+        match_id TEXT NOT NULL,
+        bookmaker_id UUID NOT NULL
+            CONSTRAINT odds_bookmaker_id_fkey REFERENCES core.bookmakers(bookmaker_id),
+        selection_id UUID NOT NULL
+            CONSTRAINT odds_selection_id_fkey REFERENCES core.selections(selection_id),
+        price NUMERIC(10,4) NOT NULL,
+        probability NUMERIC(7,6),
+        captured_at TIMESTAMPTZ NOT NULL,
+        source TEXT,
+        checksum TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        CONSTRAINT uq_odds_snapshot
+            UNIQUE (match_id, bookmaker_id, selection_id, captured_at),
+        CONSTRAINT chk_odds_price_gt_1 CHECK (price > 1.0),
+        CONSTRAINT chk_odds_prob_0_1
+            CHECK (probability IS NULL OR (probability >= 0 AND probability <= 1))
+    )
+    """
+    )
+    op.execute(
+        """
+    INSERT INTO core.odds (
+        odds_id, match_id, bookmaker_id, selection_id, price,
+        probability, captured_at, source, checksum, created_at
+    )
+    SELECT odds_id, match_id, bookmaker_id, selection_id, price,
+           probability, captured_at, source, checksum, created_at
+    FROM core.odds_partitioned
+    """
+    )
+    op.execute("CREATE INDEX idx_odds_match ON core.odds(match_id)")
+    op.execute("CREATE INDEX idx_odds_selection ON core.odds(selection_id)")
+    op.execute("CREATE INDEX idx_odds_bookmaker ON core.odds(bookmaker_id)")
+    op.execute("CREATE INDEX idx_odds_captured_at ON core.odds(captured_at)")
+
+    op.execute("DROP TABLE core.odds_partitioned CASCADE")
+    op.execute(
+        "DROP FUNCTION IF EXISTS core.drop_expired_odds_partitions(interval, boolean)"
+    )
+    op.execute("DROP FUNCTION IF EXISTS core.ensure_odds_partitions(int)")
+    op.execute("DROP FUNCTION IF EXISTS core.create_odds_partition(timestamptz)")
@@ -0,0 +1,53 @@
+"""core.odds_latest: senaste snapshot per (match, bookmaker, selection)
+
+Revision ID: 9b4d2e7c1a30
+Revises: 5e1f0c9a7b21
+Create Date: 2026-10-18 11:40:02.551907
+
+"""
+
+from alembic import op
+
+
+revision = "9b4d2e7c1a30"
+down_revision = "5e1f0c9a7b21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+    CREATE TABLE core.odds_latest (
+        match_id TEXT NOT NULL,
+        bookmaker_id UUID NOT NULL REFERENCES core.bookmakers(bookmaker_id),
+        selection_id UUID NOT NULL REFERENCES core.selections(selection_id),
+        odds_id UUID NOT NULL,
+        price NUMERIC(10,4) NOT NULL,
+        probability NUMERIC(7,6),
+        captured_at TIMESTAMPTZ NOT NULL,
+        source TEXT,
+        checksum TEXT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        CONSTRAINT odds_latest_pkey PRIMARY KEY (match_id, bookmaker_id, selection_id)
+    )
+    """
+    )
+    # Backfill från historiken
+    op.execute(
+        """
+    INSERT INTO core.odds_latest (
+        match_id, bookmaker_id, selection_id, odds_id, price,
+        probability, captured_at, source, checksum
+    )
+    SELECT DISTINCT ON (match_id, bookmaker_id, selection_id)
+           match_id, bookmaker_id, selection_id, odds_id, price,
+           probability, captured_at, source, checksum
+    FROM core.odds
+    ORDER BY match_id, bookmaker_id, selection_id, captured_at DESC
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS core.odds_latest")
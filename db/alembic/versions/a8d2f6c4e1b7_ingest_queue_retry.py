@@ -0,0 +1,37 @@
+"""Retry bookkeeping on core.ingest_queue (attempts, next_attempt_at)
+
+Revision ID: a8d2f6c4e1b7
+Revises: f3b7d1c9e5a2
+Create Date: 2026-10-18 19:26:12.540317
+
+"""
+
+from alembic import op
+
+
+revision = "a8d2f6c4e1b7"
+down_revision = "f3b7d1c9e5a2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Transienta fel (deadlock, timeout, tappad anslutning) lämnar batchen i
+    # kön; workers tar den igen först när next_attempt_at har passerats
+    op.execute(
+        """
+    ALTER TABLE core.ingest_queue
+        ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now();
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+    ALTER TABLE core.ingest_queue
+        DROP COLUMN IF EXISTS next_attempt_at,
+        DROP COLUMN IF EXISTS attempts;
+    """
+    )
@@ -0,0 +1,28 @@
+"""Composite index for per-user bets history (keyset pagination)
+
+Revision ID: c4e8a1f5d6b2
+Revises: 9b4d2e7c1a30
+Create Date: 2026-10-18 15:02:11.340871
+
+"""
+
+from alembic import op
+
+
+revision = "c4e8a1f5d6b2"
+down_revision = "9b4d2e7c1a30"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_bets_user_placed_at
+    ON core.bets(user_ref, placed_at DESC, bet_id);
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS core.idx_bets_user_placed_at;")
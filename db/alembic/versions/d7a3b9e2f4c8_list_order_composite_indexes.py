@@ -0,0 +1,77 @@
+"""Composite indexes matching GET /odds and GET /predictions filter + order shapes
+
+Revision ID: d7a3b9e2f4c8
+Revises: c4e8a1f5d6b2
+Create Date: 2026-10-18 16:20:37.512904
+
+"""
+
+from alembic import op
+
+
+revision = "d7a3b9e2f4c8"
+down_revision = "c4e8a1f5d6b2"
+branch_labels = None
+depends_on = None
+
+# Listningarna sorterar alltid på (tid, id) efter likhetsfilter. Varje index
+# nedan är (filterkolumner..., tid, id) så att planeraren kan läsa raderna i
+# ordning och stanna vid LIMIT i stället för att sortera hela träffmängden.
+# Enkelkolumnsindexen de ersätter är prefix av de nya och behövs inte längre
+# (FK-uppslag mot bookmakers/selections använder samma prefix).
+#
+# core.odds är partitionerad: CREATE INDEX på föräldern skapar indexet på alla
+# partitioner (CONCURRENTLY stöds inte på partitionerade tabeller).
+ODDS_INDEXES = {
+    "idx_odds_match_captured": "match_id, captured_at, odds_id",
+    "idx_odds_snapshot_captured": (
+        "match_id, bookmaker_id, selection_id, captured_at, odds_id"
+    ),
+    "idx_odds_bookmaker_captured": "bookmaker_id, captured_at, odds_id",
+    "idx_odds_selection_captured": "selection_id, captured_at, odds_id",
+    "idx_odds_captured_id": "captured_at, odds_id",
+}
+ODDS_REPLACED = {
+    "idx_odds_match": "match_id",
+    "idx_odds_selection": "selection_id",
+    "idx_odds_bookmaker": "bookmaker_id",
+    "idx_odds_captured_at": "captured_at",
+}
+
+# model_id utan version kan inte läsas i ordning ur (model_id, version, ...);
+# därför ett eget index för den formen
+PREDICTIONS_INDEXES = {
+    "idx_predictions_match_predicted": "match_id, predicted_at, prediction_id",
+    "idx_predictions_model_predicted": (
+        "model_id, version, predicted_at, prediction_id"
+    ),
+    "idx_predictions_model_id_predicted": "model_id, predicted_at, prediction_id",
+    "idx_predictions_selection_predicted": (
+        "selection_id, predicted_at, prediction_id"
+    ),
+    "idx_predictions_predicted_id": "predicted_at, prediction_id",
+}
+PREDICTIONS_REPLACED = {
+    "idx_predictions_match": "match_id",
+    "idx_predictions_model": "model_id",
+}
+
+
+def upgrade() -> None:
+    for name, cols in ODDS_INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON core.odds({cols})")
+    for name, cols in PREDICTIONS_INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON core.predictions({cols})")
+
+    for name in (*ODDS_REPLACED, *PREDICTIONS_REPLACED):
+        op.execute(f"DROP INDEX IF EXISTS core.{name}")
+
+
+def downgrade() -> None:
+    for name, col in ODDS_REPLACED.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON core.odds({col})")
+    for name, col in PREDICTIONS_REPLACED.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON core.predictions({col})")
+
+    for name in (*ODDS_INDEXES, *PREDICTIONS_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS core.{name}")
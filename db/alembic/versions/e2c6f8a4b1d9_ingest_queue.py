@@ -0,0 +1,42 @@
+"""Postgres-backed ingest queue for asynchronous POST /odds
+
+Revision ID: e2c6f8a4b1d9
+Revises: d7a3b9e2f4c8
+Create Date: 2026-10-18 17:41:03.226410
+
+"""
+
+from alembic import op
+
+
+revision = "e2c6f8a4b1d9"
+down_revision = "d7a3b9e2f4c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # En rad per accepterad batch tills en worker har upsertat den. Status och
+    # resultat ligger i core.ingest_audit (audit_id = batch_id).
+    op.execute(
+        """
+    CREATE TABLE IF NOT EXISTS core.ingest_queue (
+        batch_id UUID PRIMARY KEY
+            REFERENCES core.ingest_audit(audit_id) ON DELETE CASCADE,
+        entity TEXT NOT NULL,
+        item_count INTEGER NOT NULL,
+        payload JSONB NOT NULL,
+        enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """
+    )
+    op.execute(
+        """
+    CREATE INDEX IF NOT EXISTS idx_ingest_queue_entity_enqueued
+    ON core.ingest_queue(entity, enqueued_at);
+    """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS core.ingest_queue;")
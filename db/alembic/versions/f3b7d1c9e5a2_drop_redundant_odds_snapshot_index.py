@@ -0,0 +1,32 @@
+"""Drop idx_odds_snapshot_captured (duplicates the uq_odds_snapshot prefix)
+
+Revision ID: f3b7d1c9e5a2
+Revises: e2c6f8a4b1d9
+Create Date: 2026-10-18 19:02:44.118530
+
+"""
+
+from alembic import op
+
+
+revision = "f3b7d1c9e5a2"
+down_revision = "e2c6f8a4b1d9"
+branch_labels = None
+depends_on = None
+
+
+# uq_odds_snapshot är (match_id, bookmaker_id, selection_id, captured_at) och
+# unik, så med hela snapshotnyckeln fixerad finns högst en rad per captured_at.
+# Listfrågan sorterar då bara på captured_at (se _list_odds) och läser i
+# constraint-indexets ordning; odds_id-kolumnen i det här indexet tillförde
+# inget utöver ett extra index att underhålla vid varje insert. Ingen INCLUDE:
+# listningen läser alla kolumner, ett täckande index vore en kopia av tabellen.
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS core.idx_odds_snapshot_captured")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_odds_snapshot_captured "
+        "ON core.odds(match_id, bookmaker_id, selection_id, captured_at, odds_id)"
+    )
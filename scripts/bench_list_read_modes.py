@@ -0,0 +1,118 @@
+"""
+Mikrobenchmark: GET /odds- och /predictions-sidor i read=rows (typade rader ->
+dicts -> orjson) mot read=json (Postgres bygger items-arrayen med row_to_json).
+
+Anropar listfunktionerna direkt mot DATABASE_URL (ingen HTTP), inklusive
+rendering av svarskroppen. Seedar ROWS rader under ett eget match_id första
+gången. Exempel:  ROUNDS=7 python scripts/bench_list_read_modes.py
+"""
+
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.routers.odds import _list_odds  # noqa: E402
+from app.routers.predictions import _list_predictions  # noqa: E402
+
+MATCH_ID = os.environ.get("MATCH_ID", "m-bench-read-modes")
+ROWS = int(os.environ.get("ROWS", "5000"))
+N = int(os.environ.get("N", "50"))
+ROUNDS = int(os.environ.get("ROUNDS", "5"))
+LIMITS = (100, 1000)
+
+
+def seed(db) -> None:
+    bookmaker_id = db.execute(
+        text("SELECT bookmaker_id FROM core.bookmakers LIMIT 1")
+    ).scalar_one()
+    selection_id = db.execute(
+        text("SELECT selection_id FROM core.selections LIMIT 1")
+    ).scalar_one()
+    model_id = db.execute(text("SELECT model_id FROM core.models LIMIT 1")).scalar_one()
+    params = {
+        "m": MATCH_ID,
+        "b": bookmaker_id,
+        "s": selection_id,
+        "model": model_id,
+        "n": ROWS,
+    }
+    db.execute(
+        text(
+            """
+        INSERT INTO core.odds (match_id, bookmaker_id, selection_id, price,
+                               probability, captured_at, source, checksum)
+        SELECT :m, :b, :s, 1.5 + (g % 100) / 100.0, 0.5,
+               now() - make_interval(secs => g), 'bench', md5(g::text)
+        FROM generate_series(1, :n) AS g
+        ON CONFLICT DO NOTHING
+    """
+        ),
+        params,
+    )
+    db.execute(
+        text(
+            """
+        INSERT INTO core.predictions (match_id, model_id, version, selection_id,
+                                      probability, odds_fair, features, predicted_at)
+        SELECT :m, :model, 'bench-' || g, :s, 0.42, 2.38,
+               jsonb_build_object('form', g % 7, 'home', true),
+               now() - make_interval(secs => g)
+        FROM generate_series(1, :n) AS g
+        ON CONFLICT DO NOTHING
+    """
+        ),
+        params,
+    )
+    db.commit()
+
+
+def run(db, fn, limit: int, read_mode: str) -> tuple[float, int]:
+    args = dict(
+        match_id=MATCH_ID,
+        selection_id=None,
+        ts_from=None,
+        ts_to=None,
+        limit=limit,
+        offset=0,
+        cursor=None,
+        sort="asc",
+        total_mode="none",
+        read_mode=read_mode,
+    )
+    if fn is _list_odds:
+        args["bookmaker_id"] = None
+    else:
+        args.update(model_id=None, version=None)
+    fn(db, **args)  # warmup (plan + cache)
+    t0 = time.perf_counter()
+    size = 0
+    for _ in range(N):
+        size = len(fn(db, **args).body)
+    return (time.perf_counter() - t0) / N * 1e3, size
+
+
+def main():
+    with SessionLocal() as db:
+        seed(db)
+        print(f"N={N} rounds={ROUNDS} rows={ROWS} (median ms/sida, body-storlek)")
+        for name, fn in (("odds", _list_odds), ("predictions", _list_predictions)):
+            for limit in LIMITS:
+                for mode in ("rows", "json"):
+                    samples = [run(db, fn, limit, mode) for _ in range(ROUNDS)]
+                    med = statistics.median(s[0] for s in samples)
+                    size = samples[-1][1]
+                    print(
+                        f"  {name:<12} limit={limit:<5} {mode:<5}"
+                        f" {med:8.2f} ms  {size / 1024:8.1f} KiB"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Mikrobenchmark: overhead per request för ObservabilityMiddleware jämfört
+med samma app utan middleware.
+
+Kör ASGI-appen direkt (ingen socket/HTTP-parser), så siffrorna visar bara
+middleware-kostnaden. Exempel:  N=20000 python scripts/bench_middleware.py
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import PlainTextResponse  # noqa: E402
+
+from app.observability.middleware import ObservabilityMiddleware  # noqa: E402
+
+N = int(os.environ.get("N", "5000"))
+ROUNDS = int(os.environ.get("ROUNDS", "5"))
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/odds")
+    async def odds():
+        return PlainTextResponse("[]")
+
+    return app
+
+
+def build_bare() -> FastAPI:
+    return _base_app()
+
+
+def build_new() -> FastAPI:
+    app = _base_app()
+    app.add_middleware(ObservabilityMiddleware)
+    return app
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/odds",
+    "raw_path": b"/odds",
+    "root_path": "",
+    "query_string": b"match_id=m1",
+    "headers": [(b"host", b"bench"), (b"x-api-key", b"reader1")],
+    "client": ("127.0.0.1", 1234),
+    "server": ("bench", 80),
+}
+
+
+def _receiver():
+    # Som en riktig server: bodyn en gång, sedan blockera tills disconnect
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    return receive
+
+
+async def _send(_message):
+    return None
+
+
+async def run(app, n: int) -> float:
+    # en warmup-request bygger middleware-stacken
+    await app(dict(SCOPE), _receiver(), _send)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(SCOPE), _receiver(), _send)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+async def main():
+    logging.getLogger("access").disabled = True  # mät middleware, inte stdout
+    apps = {"bare": build_bare(), "new": build_new()}
+    results = {name: [] for name in apps}
+    for _ in range(ROUNDS):
+        for name, app in apps.items():
+            results[name].append(await run(app, N))
+
+    bare = statistics.median(results["bare"])
+    print(f"N={N} rounds={ROUNDS} (median µs/request)")
+    for name, samples in results.items():
+        med = statistics.median(samples)
+        print(f"  {name:<5} {med:8.1f} µs   overhead {med - bare:8.1f} µs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+"""
+Partitionsunderhåll för core.odds, tänkt att köras från cron (t.ex. dagligen):
+skapar månadspartitioner ODDS_PARTITION_MONTHS_AHEAD framåt och kopplar
+loss/droppar partitioner äldre än ODDS_PARTITION_RETENTION_MONTHS.
+
+    python scripts/maintain_odds_partitions.py [--detach-only]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.crud.partitions import (  # noqa: E402
+    ensure_odds_partitions,
+    drop_expired_odds_partitions,
+)
+
+
+def main() -> None:
+    drop = "--detach-only" not in sys.argv[1:]
+    with SessionLocal() as db:
+        created = ensure_odds_partitions(db)
+        expired = drop_expired_odds_partitions(db, drop=drop)
+    print(json.dumps({"partitions": created, "expired": expired, "dropped": drop}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.core.db as db_mod
+from app.core.config import settings as db_settings
+from app.core.settings import settings
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+@pytest.fixture()
+def async_db(monkeypatch):
+    # NullPool: TestClient kör varje request i en egen event-loop
+    eng = create_async_engine(db_settings.db_url, poolclass=NullPool)
+    monkeypatch.setattr(settings, "DB_ASYNC", True)
+    monkeypatch.setattr(
+        db_mod,
+        "AsyncSessionLocal",
+        async_sessionmaker(bind=eng, autoflush=False, expire_on_commit=False),
+    )
+    seen = []
+    orig = db_mod.run_db
+
+    async def _spy(db, fn, *args, **kwargs):
+        seen.append(type(db))
+        return await orig(db, fn, *args, **kwargs)
+
+    for mod in ("app.routers.odds", "app.routers.predictions", "app.routers.bets"):
+        monkeypatch.setattr(f"{mod}.run_db", _spy)
+    return seen
+
+
+def _odds(match_id: str, n: int):
+    base = datetime(2031, 3, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": 2.1,
+            "captured_at": (base + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("copy_threshold,chunk", [(0, 1000), (0, 2), (2, 1000)])
+def test_async_post_and_get_odds(
+    client, writer_headers, reader_headers, async_db, monkeypatch, copy_threshold, chunk
+):
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", copy_threshold)
+    monkeypatch.setattr(settings, "UPSERT_CHUNK_SIZE", chunk)
+    match_id = f"m_async_{uuid.uuid4().hex[:8]}"
+
+    r = client.post("/odds", headers=writer_headers, json={"items": _odds(match_id, 3)})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 3, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    r = client.get(
+        "/odds", headers=reader_headers, params={"match_id": match_id, "limit": 2}
+    )
+    assert r.status_code == 200, r.text
+    page = r.json()
+    assert page["total"] == 3 and len(page["items"]) == 2
+    assert async_db and all(t is AsyncSession for t in async_db)
+
+
+def test_async_fk_404_and_bets(client, writer_headers, reader_headers, async_db):
+    bad = _odds("m_async_404", 1)
+    bad[0]["bookmaker_id"] = str(uuid.UUID(int=0))
+    r = client.post("/odds", headers=writer_headers, json={"items": bad})
+    assert r.status_code == 404
+
+    user = f"u_async_{uuid.uuid4().hex[:8]}"
+    bet = {
+        "user_ref": user,
+        "match_id": "m_async",
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "stake": 10.0,
+        "price": 2.0,
+        "placed_at": "2031-03-01T00:00:00Z",
+        "idempotency_key": f"idem-{uuid.uuid4()}",
+    }
+    r = client.post("/bets", headers=writer_headers, json=bet)
+    assert r.status_code == 201, r.text
+    r = client.post("/bets", headers=writer_headers, json=bet)
+    assert r.status_code == 200
+    assert r.headers["x-idempotent-replayed"] == "true"
+
+    r = client.get("/bets", headers=reader_headers, params={"user_ref": user})
+    assert r.status_code == 200
+    assert r.json()["total"] == 1
+    assert async_db and all(t is AsyncSession for t in async_db)
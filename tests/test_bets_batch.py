@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _bet(**extra) -> dict:
+    return {
+        "match_id": "m_batch",
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "stake": 10.0,
+        "price": 2.5,
+        "placed_at": "2025-01-01T12:00:00Z",
+        **extra,
+    }
+
+
+def test_batch_created_and_replayed(client, writer_headers):
+    k1, k2 = f"batch-{uuid4()}", f"batch-{uuid4()}"
+    user, ext = f"u-{uuid4().hex[:8]}", "ticket-1"
+
+    # befintlig bet via single-endpointen
+    r = client.post("/bets", json=_bet(idempotency_key=k1), headers=writer_headers)
+    assert r.status_code == 201
+    existing_id = r.json()["bet_id"]
+
+    items = [
+        _bet(idempotency_key=k1),  # replay mot befintlig
+        _bet(idempotency_key=k2),  # ny
+        _bet(user_ref=user, external_id=ext),  # ny via (user_ref, external_id)
+        _bet(idempotency_key=k2),  # dubblett inom batchen
+        _bet(),  # utan nyckel -> alltid ny
+    ]
+    r = client.post("/bets/batch", json={"items": items}, headers=writer_headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    statuses = [it["status"] for it in body["items"]]
+    assert statuses == ["created" if i in (1, 2, 4) else "replayed" for i in range(5)]
+    assert [it["index"] for it in body["items"]] == list(range(5))
+    assert body["items"][0]["bet_id"] == existing_id
+    assert body["items"][3]["bet_id"] == body["items"][1]["bet_id"]
+    assert (body["created"], body["replayed"]) == (3, 2)
+
+    # hela batchen igen -> allt utom nyckellösa raden är replay
+    r = client.post("/bets/batch", json={"items": items}, headers=writer_headers)
+    again = r.json()["items"]
+    assert [it["status"] for it in again[:4]] == ["replayed"] * 4
+    assert [it["bet_id"] for it in again[:4]] == [
+        it["bet_id"] for it in body["items"][:4]
+    ]
+    assert again[4]["status"] == "created"
+
+
+def test_batch_pair_conflict_inside_batch(client, writer_headers):
+    # olika idempotency_key men samma (user_ref, external_id) i samma batch
+    user = f"u-{uuid4().hex[:8]}"
+    items = [
+        _bet(idempotency_key=f"a-{uuid4()}", user_ref=user, external_id="t"),
+        _bet(idempotency_key=f"b-{uuid4()}", user_ref=user, external_id="t"),
+    ]
+    r = client.post("/bets/batch", json={"items": items}, headers=writer_headers)
+    assert r.status_code == 200, r.text
+    out = r.json()["items"]
+    assert [it["status"] for it in out] == ["created", "replayed"]
+    assert out[0]["bet_id"] == out[1]["bet_id"]
+
+
+def test_batch_validation(client, writer_headers, reader_headers):
+    r = client.post("/bets/batch", json={"items": []}, headers=writer_headers)
+    assert r.status_code == 422
+    r = client.post(
+        "/bets/batch",
+        json={"items": [_bet(bookmaker_id=str(uuid4()))]},
+        headers=writer_headers,
+    )
+    assert r.status_code == 404
+    r = client.post("/bets/batch", json={"items": [_bet()]}, headers=reader_headers)
+    assert r.status_code == 403
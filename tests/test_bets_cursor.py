@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from app.core.db import SessionLocal
+from app.core.pagination import encode_cursor
+from app.crud.bets import list_bets_page
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _seed(client, headers, user: str) -> None:
+    # två par med samma placed_at för att täcka bet_id som tie-breaker
+    times = ["10:00", "11:00", "11:00", "12:00", "12:00"]
+    for t in times:
+        r = client.post(
+            "/bets",
+            json={
+                "match_id": "m_cursor",
+                "bookmaker_id": BOOKMAKER_ID,
+                "selection_id": SELECTION_ID,
+                "stake": 5.0,
+                "price": 2.0,
+                "placed_at": f"2025-02-01T{t}:00Z",
+                "user_ref": user,
+                "idempotency_key": f"cur-{uuid4()}",
+            },
+            headers=headers,
+        )
+        assert r.status_code == 201
+
+
+def test_bets_cursor_walks_same_order_as_offset(client, writer_headers, reader_headers):
+    user = f"u_cursor_{uuid4().hex[:8]}"
+    _seed(client, writer_headers, user)
+
+    r = client.get("/bets", params={"user_ref": user}, headers=reader_headers)
+    expected = [it["bet_id"] for it in r.json()["items"]]
+    assert len(expected) == 5
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"user_ref": user, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/bets", params=params, headers=reader_headers).json()
+        pages += 1
+        if cursor:
+            assert body["total"] is None and body["next_offset"] is None
+        seen += [it["bet_id"] for it in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert pages == 3
+
+
+def test_bets_total_none(client, writer_headers, reader_headers):
+    user = f"u_cursor_{uuid4().hex[:8]}"
+    _seed(client, writer_headers, user)
+    body = client.get(
+        "/bets",
+        params={"user_ref": user, "limit": 2, "total": "none"},
+        headers=reader_headers,
+    ).json()
+    assert body["total"] is None
+    assert body["next_offset"] == 2
+    assert body["next_cursor"]
+
+
+def test_bets_invalid_cursor(client, reader_headers):
+    r = client.get("/bets", params={"cursor": "not-a-cursor"}, headers=reader_headers)
+    assert r.status_code == 400
+    bad_id = encode_cursor(datetime.now(timezone.utc), "not-a-uuid")
+    r = client.get("/bets", params={"cursor": bad_id}, headers=reader_headers)
+    assert r.status_code == 400
+
+
+def test_user_cursor_page_uses_composite_index():
+    with SessionLocal() as db:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = "\n".join(
+            db.execute(
+                text(
+                    "EXPLAIN SELECT bet_id FROM core.bets "
+                    "WHERE user_ref = :u AND placed_at <= now() "
+                    "AND (placed_at < now() OR (placed_at = now() AND bet_id > :id)) "
+                    "ORDER BY placed_at DESC, bet_id ASC LIMIT 50"
+                ),
+                {"u": "someone", "id": uuid4()},
+            ).scalars()
+        )
+    assert "idx_bets_user_placed_at" in plan
+    assert "Sort" not in plan
+
+
+def test_list_bets_page_after_tuple(client, writer_headers):
+    user = f"u_cursor_{uuid4().hex[:8]}"
+    _seed(client, writer_headers, user)
+    with SessionLocal() as db:
+        rows, total, _, cur = list_bets_page(db, user, None, limit=3)
+        assert total == 5 and cur
+        rest, total2, next_offset, cur2 = list_bets_page(
+            db, user, None, limit=3, after=(rows[-1].placed_at, rows[-1].bet_id)
+        )
+    assert total2 is None and next_offset is None and cur2 is None
+    assert len(rest) == 2
+    assert not {r.bet_id for r in rows} & {r.bet_id for r in rest}
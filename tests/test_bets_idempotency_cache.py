@@ -0,0 +1,99 @@
+from uuid import uuid4
+
+import app.core.idempotency as idem
+import app.routers.bets as bets_router
+from app.core.settings import settings
+
+
+class DictRedis:
+    """Minimal async Redis: get/set + pipeline, med TTL-inspelning."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    def pipeline(self, transaction=True):
+        return _Pipe(self)
+
+
+class _Pipe:
+    def __init__(self, r):
+        self.r, self.ops = r, []
+
+    def set(self, key, value, ex=None):
+        self.ops.append((key, value, ex))
+
+    async def execute(self):
+        for key, value, ex in self.ops:
+            self.r.data[key], self.r.ttls[key] = value, ex
+        return [True] * len(self.ops)
+
+
+class DownRedis:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    def pipeline(self, transaction=True):
+        raise ConnectionError("down")
+
+
+def _payload(key: str) -> dict:
+    return {
+        "match_id": "m1",
+        "bookmaker_id": "024c6a47-1a14-4549-935f-31e22e747670",
+        "selection_id": "bea8671c-e889-4e3d-91d3-b407bc186408",
+        "stake": 10.0,
+        "price": 1.9,
+        "placed_at": "2025-01-01T12:00:00Z",
+        "idempotency_key": key,
+    }
+
+
+def test_replay_served_from_cache(client, writer_headers, monkeypatch):
+    fake = DictRedis()
+    monkeypatch.setattr(idem, "get_redis", lambda: fake)
+    monkeypatch.setattr(settings, "BETS_IDEMPOTENCY_TTL", 600)
+
+    key = f"cache-{uuid4()}"
+    r1 = client.post("/bets", json=_payload(key), headers=writer_headers)
+    assert r1.status_code == 201
+    bet_id = r1.json()["bet_id"]
+    assert fake.data[f"idem:bets:{key}"] == bet_id
+    assert fake.ttls[f"idem:bets:{key}"] == 600
+
+    def _no_db(*_a, **_k):
+        raise AssertionError("replay ska inte nå Postgres")
+
+    monkeypatch.setattr(bets_router, "insert_bet_idempotent", _no_db)
+    r2 = client.post("/bets", json=_payload(key), headers=writer_headers)
+    assert r2.status_code == 200
+    assert r2.json() == {"created": False, "bet_id": bet_id}
+    assert r2.headers["x-idempotent-replayed"] == "true"
+
+
+def test_batch_populates_cache(client, writer_headers, monkeypatch):
+    fake = DictRedis()
+    monkeypatch.setattr(idem, "get_redis", lambda: fake)
+    monkeypatch.setattr(settings, "BETS_IDEMPOTENCY_TTL", 60)
+
+    key = f"cache-{uuid4()}"
+    r = client.post(
+        "/bets/batch", json={"items": [_payload(key)]}, headers=writer_headers
+    )
+    assert r.status_code == 200, r.text
+    assert fake.data[f"idem:bets:{key}"] == r.json()["items"][0]["bet_id"]
+
+
+def test_redis_down_falls_back_to_db(client, writer_headers, monkeypatch):
+    monkeypatch.setattr(idem, "get_redis", lambda: DownRedis())
+    monkeypatch.setattr(settings, "BETS_IDEMPOTENCY_TTL", 600)
+
+    key = f"cache-{uuid4()}"
+    r1 = client.post("/bets", json=_payload(key), headers=writer_headers)
+    r2 = client.post("/bets", json=_payload(key), headers=writer_headers)
+    assert (r1.status_code, r2.status_code) == (201, 200)
+    assert r1.json()["bet_id"] == r2.json()["bet_id"]
+
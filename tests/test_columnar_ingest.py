@@ -0,0 +1,252 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from app.core.columnar import ARROW_FILE, ARROW_STREAM, PARQUET  # noqa: E402
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+MODEL_ID = "5c53bd4d-088d-48ca-8530-6d517a6597f9"
+
+
+def _body(table, media_type: str) -> bytes:
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET:
+        pq.write_table(table, sink)
+    elif media_type == ARROW_FILE:
+        with pa.ipc.new_file(sink, table.schema) as w:
+            w.write_table(table)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as w:
+            w.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _auth(headers: dict) -> dict:
+    return {k: v for k, v in headers.items() if k.lower() != "content-type"}
+
+
+def _post(client, headers, path, table, media_type=ARROW_STREAM):
+    return client.post(
+        path,
+        headers={**_auth(headers), "Content-Type": media_type},
+        content=_body(table, media_type),
+    )
+
+
+def _odds_table(mid: str, prices: list, **overrides):
+    n = len(prices)
+    cols = {
+        "match_id": [mid] * n,
+        "bookmaker_id": [BOOKMAKER_ID] * n,
+        "selection_id": [SELECTION_ID] * n,
+        "price": prices,
+        "captured_at": pa.array(
+            [datetime(2031, 5, 1, 10, i, tzinfo=timezone.utc) for i in range(n)],
+            pa.timestamp("ns", tz="UTC"),
+        ),
+        "source": ["arrow-test"] * n,
+    }
+    cols.update(overrides)
+    return pa.table(cols)
+
+
+@pytest.mark.parametrize("media_type", [ARROW_STREAM, ARROW_FILE, PARQUET])
+def test_post_odds_columnar(client, writer_headers, reader_headers, media_type):
+    match_id = f"m_arrow_{uuid.uuid4().hex[:8]}"
+    table = _odds_table(match_id, [2.0, 2.5, 3.0])
+
+    r = _post(client, writer_headers, "/odds", table, media_type)
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 3, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    items = client.get(f"/odds?match_id={match_id}", headers=reader_headers).json()
+    assert [it["price"] for it in items["items"]] == [2.0, 2.5, 3.0]
+    assert items["items"][0]["captured_at"].startswith("2031-05-01T10:00:00")
+    assert items["items"][0]["probability"] is None
+
+    # samma data som JSON -> oförändrat; JSON-vägen är kvar som standard
+    as_json = [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": p,
+            "captured_at": f"2031-05-01T10:0{i}:00Z",
+            "source": "arrow-test",
+        }
+        for i, p in enumerate([2.0, 2.5, 3.0])
+    ]
+    r = client.post("/odds", headers=writer_headers, json={"items": as_json})
+    assert r.json()["unchanged"] == 3
+
+
+def test_post_odds_columnar_string_columns(client, writer_headers):
+    match_id = f"m_arrow_{uuid.uuid4().hex[:8]}"
+    table = _odds_table(
+        match_id,
+        [2.0, 2.0],
+        captured_at=["2031-05-02T10:00:00", "2031-05-02T10:00:00"],  # naiv = UTC
+        probability=[0.4, None],
+    )
+    r = _post(client, writer_headers, "/odds", table)
+    assert r.status_code == 200, r.text
+    assert r.json()["collapsed"] == 1
+
+
+def test_post_odds_columnar_nanosecond_timestamps(client, writer_headers):
+    # pandas/Arrow skriver timestamp[ns]; trunkeras till µs som JSON-vägen
+    match_id = f"m_arrow_{uuid.uuid4().hex[:8]}"
+    table = _odds_table(
+        match_id,
+        [2.0, 2.0, 2.0],
+        captured_at=pa.array(
+            [1700000000123456789, 1700000000123456999, 1700000060000000001],
+            pa.timestamp("ns", tz="UTC"),
+        ),
+        source=pa.array([None, None, None]),  # bara NULL
+        checksum=pa.array(["a", "b", "c"]).dictionary_encode(),
+    )
+    r = _post(client, writer_headers, "/odds", table)
+    assert r.status_code == 200, r.text
+    assert r.json()["collapsed"] == 1  # samma mikrosekund
+
+    as_json = {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": 2.0,
+        "captured_at": "2023-11-14T22:13:20.123456999Z",
+        "checksum": "b",
+    }
+    r = client.post("/odds", headers=writer_headers, json={"items": [as_json]})
+    assert r.json()["unchanged"] == 1
+
+    strings = _odds_table(
+        match_id, [2.0], captured_at=["2023-11-14T22:14:20.000000001Z"], checksum=["c"]
+    ).drop_columns(["source"])
+    r = _post(client, writer_headers, "/odds", strings)
+    assert r.status_code == 200, r.text
+    assert r.json()["unchanged"] == 1
+
+
+@pytest.mark.parametrize(
+    "overrides,field",
+    [
+        ({"price": [2.0, 1.5, 1.0]}, "items.2.price"),
+        ({"probability": [0.5, None, 1.5]}, "items.2.probability"),
+        (
+            {"bookmaker_id": [BOOKMAKER_ID, "nope", BOOKMAKER_ID]},
+            "items.1.bookmaker_id",
+        ),
+        ({"match_id": ["m", None, "m"]}, "items.1.match_id"),
+        ({"price": ["a", "b", "c"]}, "price"),
+        ({"match_id": [1, 2, 3]}, "match_id"),  # som JSON: tal är inte sträng
+    ],
+)
+def test_post_odds_columnar_validation(client, writer_headers, overrides, field):
+    table = _odds_table("m_arrow_bad", [2.0, 2.0, 2.0], **overrides)
+    r = _post(client, writer_headers, "/odds", table)
+    assert r.status_code == 422, r.text
+    assert r.json()["fieldErrors"][0]["field"] == field
+
+
+def test_post_odds_columnar_missing_column_and_bad_body(client, writer_headers):
+    table = _odds_table("m_arrow_bad", [2.0]).drop_columns(["captured_at"])
+    r = _post(client, writer_headers, "/odds", table)
+    assert r.status_code == 422
+    assert r.json()["fieldErrors"][0]["field"] == "captured_at"
+
+    r = client.post(
+        "/odds",
+        headers={**_auth(writer_headers), "Content-Type": PARQUET},
+        content=b"not parquet",
+    )
+    assert r.status_code == 422
+
+
+def test_post_predictions_columnar(client, writer_headers, reader_headers):
+    match_id = f"m_arrow_{uuid.uuid4().hex[:8]}"
+    table = pa.table(
+        {
+            "match_id": [match_id] * 2,
+            "model_id": pa.array(
+                [uuid.UUID(MODEL_ID).bytes] * 2, pa.binary(16)
+            ),  # binär UUID
+            "selection_id": [SELECTION_ID] * 2,
+            "version": ["a1", "a2"],
+            "probability": [0.4, 0.6],
+            "odds_fair": [2.5, None],
+            "features": [json.dumps({"form": 0.7}), None],
+            "predicted_at": ["2031-05-01T10:00:00Z"] * 2,
+        }
+    )
+    r = _post(client, writer_headers, "/predictions", table, PARQUET)
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 2, "updated": 0}
+
+    page = client.get(
+        f"/predictions?match_id={match_id}", headers=reader_headers
+    ).json()
+    by_version = {it["version"]: it for it in page["items"]}
+    assert by_version["a1"]["features"] == {"form": 0.7}
+    assert not by_version["a2"]["features"]  # NULL, som utan features i JSON
+    assert by_version["a1"]["model_id"] == MODEL_ID
+
+    # version saknas -> "v1"; features som struct
+    table = table.drop_columns(["version", "features"]).append_column(
+        "features", pa.array([{"x": 1}, {"x": 2}])
+    )
+    r = _post(client, writer_headers, "/predictions", table)
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 1, "updated": 0}
+
+
+def test_post_predictions_columnar_features_must_be_objects(client, writer_headers):
+    table = pa.table(
+        {
+            "match_id": ["m1"],
+            "model_id": [MODEL_ID],
+            "selection_id": [SELECTION_ID],
+            "probability": [0.5],
+            "features": ["[1, 2]"],
+            "predicted_at": ["2031-05-01T10:00:00Z"],
+        }
+    )
+    r = _post(client, writer_headers, "/predictions", table)
+    assert r.status_code == 422
+    assert r.json()["fieldErrors"][0]["field"] == "items.0.features"
+
+
+def test_columnar_content_types_in_openapi(client):
+    spec = client.get("/openapi.json").json()
+    for path in ("/odds", "/predictions"):
+        content = spec["paths"][path]["post"]["requestBody"]["content"]
+        assert {"application/json", ARROW_STREAM, ARROW_FILE, PARQUET} <= set(content)
+
+
+def test_bulk_items_cost_counts_columnar_rows(monkeypatch):
+    import asyncio
+    from starlette.requests import Request
+    import app.core.ratelimit as rl
+
+    monkeypatch.setattr(rl.settings, "RL_ROWS_PER_TOKEN", 2)
+    body = _body(_odds_table("m", [2.0] * 5), ARROW_STREAM)
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/odds",
+        "headers": [(b"content-type", ARROW_STREAM.encode())],
+    }
+    req = Request(scope, receive)
+    assert asyncio.run(rl.bulk_items_cost(req)) == 3
+    assert req.state.columnar_table.num_rows == 5  # avkodas inte igen i routen
@@ -0,0 +1,104 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.core.db import SessionLocal
+from app.core.responses import LeanJSONResponse
+from app.schemas.pages import BetsPage, OddsPage, PredictionsPage
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+MODEL_ID = "5c53bd4d-088d-48ca-8530-6d517a6597f9"
+
+
+def test_render_matches_previous_conversions():
+    uid = uuid.uuid4()
+    ts = datetime(2026, 3, 1, 12, 30, 5, 120000, tzinfo=timezone.utc)
+    body = LeanJSONResponse(
+        {"id": uid, "price": Decimal("2.1000"), "p": None, "at": ts}
+    ).body
+    assert json.loads(body) == {
+        "id": str(uid),
+        "price": 2.1,
+        "p": None,
+        "at": ts.isoformat(),
+    }
+
+
+def test_odds_page_is_valid_odds_page(client, writer_headers, reader_headers):
+    match_id = f"m_lean_{uuid.uuid4().hex[:8]}"
+    r = client.post(
+        "/odds",
+        headers=writer_headers,
+        json={
+            "items": [
+                {
+                    "match_id": match_id,
+                    "bookmaker_id": BOOKMAKER_ID,
+                    "selection_id": SELECTION_ID,
+                    "price": 2.35,
+                    "captured_at": "2026-03-01T12:00:00Z",
+                }
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+
+    r = client.get(f"/odds?match_id={match_id}", headers=reader_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    page = OddsPage.model_validate(r.json())
+    (item,) = page.items
+    assert item.price == 2.35 and item.probability is None
+    assert item.bookmaker_id == BOOKMAKER_ID
+    assert datetime.fromisoformat(item.captured_at) == datetime(
+        2026, 3, 1, 12, tzinfo=timezone.utc
+    )
+
+
+def test_predictions_page_null_features_become_empty(client, reader_headers):
+    match_id = f"m_lean_{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.execute(
+            text(
+                "INSERT INTO core.predictions (match_id, model_id, version, "
+                "selection_id, probability, features) "
+                "VALUES (:m, :model, 'lean-1', :sel, 0.25, NULL)"
+            ),
+            {"m": match_id, "model": MODEL_ID, "sel": SELECTION_ID},
+        )
+        db.commit()
+
+    r = client.get(f"/predictions?match_id={match_id}", headers=reader_headers)
+    assert r.status_code == 200
+    (item,) = PredictionsPage.model_validate(r.json()).items
+    assert item.features == {} and item.odds_fair is None
+    assert item.probability == 0.25
+
+
+def test_bets_page_is_valid_bets_page(client, writer_headers, reader_headers):
+    user = f"u_lean_{uuid.uuid4().hex[:8]}"
+    r = client.post(
+        "/bets",
+        headers=writer_headers,
+        json={
+            "match_id": "m_lean_bets",
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "stake": 10.5,
+            "price": 1.9,
+            "placed_at": "2026-03-01T12:00:00Z",
+            "user_ref": user,
+        },
+    )
+    assert r.status_code == 201, r.text
+
+    r = client.get(f"/bets?user_ref={user}", headers=reader_headers)
+    assert r.status_code == 200
+    page = BetsPage.model_validate(r.json())
+    (item,) = page.items
+    assert (item.stake, item.price, item.payout) == (10.5, 1.9, None)
+    assert page.total == 1
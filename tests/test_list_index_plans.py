@@ -0,0 +1,134 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, text
+
+from app.core.db import SessionLocal, engine
+from app.routers.odds import _list_odds
+from app.routers.predictions import _list_predictions
+from app.core.pagination import encode_cursor
+
+BOOKMAKER_ID = uuid.UUID("024c6a47-1a14-4549-935f-31e22e747670")
+SELECTION_ID = uuid.UUID("bea8671c-e889-4e3d-91d3-b407bc186408")
+MODEL_ID = uuid.UUID("5c4c6a47-1a14-4549-935f-31e22e747671")
+CURSOR = encode_cursor(datetime(2026, 1, 1, tzinfo=timezone.utc), uuid.uuid4())
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _items_plan(list_fn, **kwargs) -> tuple[set[str], str]:
+    """
+    Kör routerns listfunktion och returnera sidfrågans nodtyper och alla
+    Index Cond (filtret ska användas av indexet, inte bara appliceras på en
+    ordnad scan av hela tidsindexet).
+    """
+    captured = []
+
+    def _capture(_conn, _cursor, statement, parameters, _context, _many):
+        if "ORDER BY" in statement:
+            captured.append((statement, parameters))
+
+    with SessionLocal() as db:
+        # Tomma testtabeller gör seqscan + sort billigast; stäng av de vägarna
+        # så att testet mäter om det finns en indexordnad väg för formen.
+        for opt in ("seqscan", "bitmapscan", "sort", "incremental_sort"):
+            db.execute(text(f"SET LOCAL enable_{opt} = off"))
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            list_fn(db, **kwargs)
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        ((statement, parameters),) = captured
+        plan = (
+            db.connection()
+            .exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            .scalar_one()
+        )
+        nodes = list(_nodes(plan[0]["Plan"]))
+        return (
+            {n["Node Type"] for n in nodes},
+            " ".join(n.get("Index Cond", "") for n in nodes),
+        )
+
+
+def _assert_index_order(nodes: set[str], conds: str, shape: dict, ts_col: str):
+    assert not {"Sort", "Incremental Sort"} & nodes, nodes
+    assert {"Index Scan", "Index Only Scan"} & nodes, nodes
+    # minst en filterkolumn i indexvillkoret; med flera filter väljer
+    # planeraren fritt bland de sammansatta indexen på tomma tabeller
+    cols = {ts_col if arg.startswith("ts_") else arg for arg in shape}
+    assert any(col in conds for col in cols), (cols, conds)
+
+
+ODDS_SHAPES = {
+    "match": dict(match_id="m1"),
+    "match_bookmaker_selection": dict(
+        match_id="m1", bookmaker_id=BOOKMAKER_ID, selection_id=SELECTION_ID
+    ),
+    "bookmaker": dict(bookmaker_id=BOOKMAKER_ID),
+    "selection": dict(selection_id=SELECTION_ID),
+    "time_range": dict(
+        ts_from=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        ts_to=datetime(2026, 2, 1, tzinfo=timezone.utc),
+    ),
+}
+
+
+@pytest.mark.parametrize("sort", ["asc", "desc"])
+@pytest.mark.parametrize("cursor", [None, CURSOR], ids=["first", "cursor"])
+@pytest.mark.parametrize("shape", ODDS_SHAPES)
+def test_odds_list_uses_index_order(shape, cursor, sort):
+    args = dict(
+        match_id=None,
+        bookmaker_id=None,
+        selection_id=None,
+        ts_from=None,
+        ts_to=None,
+        limit=100,
+        offset=0,
+        cursor=cursor,
+        sort=sort,
+        total_mode="none",
+    )
+    nodes, conds = _items_plan(_list_odds, **{**args, **ODDS_SHAPES[shape]})
+    _assert_index_order(nodes, conds, ODDS_SHAPES[shape], "captured_at")
+
+
+PREDICTION_SHAPES = {
+    "match": dict(match_id="m1"),
+    "model_version": dict(model_id=MODEL_ID, version="v1"),
+    "model": dict(model_id=MODEL_ID),
+    "selection": dict(selection_id=SELECTION_ID),
+    "time_range": dict(
+        ts_from=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        ts_to=datetime(2026, 2, 1, tzinfo=timezone.utc),
+    ),
+}
+
+
+@pytest.mark.parametrize("sort", ["asc", "desc"])
+@pytest.mark.parametrize("cursor", [None, CURSOR], ids=["first", "cursor"])
+@pytest.mark.parametrize("shape", PREDICTION_SHAPES)
+def test_predictions_list_uses_index_order(shape, cursor, sort):
+    args = dict(
+        match_id=None,
+        model_id=None,
+        version=None,
+        selection_id=None,
+        ts_from=None,
+        ts_to=None,
+        limit=100,
+        cursor=cursor,
+        offset=0,
+        sort=sort,
+        total_mode="none",
+    )
+    nodes, conds = _items_plan(
+        _list_predictions, **{**args, **PREDICTION_SHAPES[shape]}
+    )
+    _assert_index_order(nodes, conds, PREDICTION_SHAPES[shape], "predicted_at")
@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+MODEL_ID = "5c53bd4d-088d-48ca-8530-6d517a6597f9"
+TS_FIELDS = {"captured_at", "created_at", "predicted_at"}
+
+
+def _normalized(page: dict) -> dict:
+    # Postgres kortar bråkdelssekunder ("…05.12+00:00"); jämför tidpunkter, inte text
+    items = [
+        {
+            k: datetime.fromisoformat(v) if k in TS_FIELDS and v else v
+            for k, v in it.items()
+        }
+        for it in page["items"]
+    ]
+    return {**page, "items": items}
+
+
+def _both(client, headers, url):
+    rows = client.get(f"{url}&read=rows", headers=headers)
+    js = client.get(f"{url}&read=json", headers=headers)
+    assert rows.status_code == js.status_code == 200, (rows.text, js.text)
+    assert js.headers["content-type"] == "application/json"
+    return rows.json(), js.json()
+
+
+@pytest.fixture()
+def odds_match(client, writer_headers):
+    match_id = f"m_read_{uuid.uuid4().hex[:8]}"
+    base = datetime(2026, 4, 1, 12, 0, 0, 120000, tzinfo=timezone.utc)
+    items = [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": 2 + i / 4,
+            "probability": 0.25 if i % 2 else None,
+            "captured_at": (base + timedelta(seconds=i)).isoformat(),
+            "source": "test",
+        }
+        for i in range(5)
+    ]
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    return match_id
+
+
+@pytest.mark.parametrize("sort", ["asc", "desc"])
+def test_odds_json_mode_matches_rows_mode(client, reader_headers, odds_match, sort):
+    url = f"/odds?match_id={odds_match}&limit=2&sort={sort}"
+    rows, js = _both(client, reader_headers, url)
+    assert _normalized(js) == _normalized(rows)
+    assert js["next_cursor"] == rows["next_cursor"] and js["next_offset"] == 2
+
+    # cursor från json-läget fortsätter på samma ställe
+    rows2, js2 = _both(client, reader_headers, f"{url}&cursor={js['next_cursor']}")
+    assert _normalized(js2) == _normalized(rows2)
+    assert len(js2["items"]) == 2 and js2["total"] is None
+
+
+def test_odds_json_mode_empty_page(client, reader_headers):
+    rows, js = _both(client, reader_headers, "/odds?match_id=m_read_none&limit=5")
+    assert (
+        js
+        == rows
+        == {
+            "items": [],
+            "total": 0,
+            "next_cursor": None,
+            "next_offset": None,
+        }
+    )
+
+
+def test_predictions_json_mode_matches_rows_mode(
+    client, writer_headers, reader_headers
+):
+    match_id = f"m_read_{uuid.uuid4().hex[:8]}"
+    items = [
+        {
+            "match_id": match_id,
+            "model_id": MODEL_ID,
+            "version": f"read-{i}",
+            "selection_id": SELECTION_ID,
+            "probability": 0.5,
+            "odds_fair": 2.0 if i else None,
+            "features": {"form": i, "nested": {"home": True}},
+            "predicted_at": f"2026-04-01T12:00:0{i}Z",
+        }
+        for i in range(3)
+    ]
+    r = client.post("/predictions", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+
+    url = f"/predictions?match_id={match_id}&limit=2&total=none"
+    rows, js = _both(client, reader_headers, url)
+    assert _normalized(js) == _normalized(rows)
+    assert js["items"][1]["features"] == {"form": 1, "nested": {"home": True}}
+    assert js["next_cursor"] == rows["next_cursor"] is not None
+
+
+def test_read_mode_default_from_settings(client, reader_headers, monkeypatch):
+    from app.core.settings import settings
+
+    monkeypatch.setattr(settings, "LIST_READ_MODE", "json")
+    r = client.get("/odds?match_id=m_read_none", headers=reader_headers)
+    assert r.status_code == 200 and r.json()["items"] == []
+    r = client.get("/odds?match_id=m1&read=xml", headers=reader_headers)
+    assert r.status_code == 422
@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.observability.metrics import (
+    REQUESTS,
+    UNMATCHED_ROUTE,
+    _parse_buckets,
+    method_label,
+)
+from app.observability.middleware import ObservabilityMiddleware
+
+
+def _count(method: str, path: str, status: str) -> float:
+    return REQUESTS.labels(method, path, status)._value.get()
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ObservabilityMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    return app
+
+
+def test_labels_use_route_template():
+    c = TestClient(_app())
+    before = _count("GET", "/items/{item_id}", "200")
+    c.get("/items/a")
+    c.get("/items/b")
+    assert _count("GET", "/items/{item_id}", "200") == before + 2
+
+
+def test_unmatched_paths_share_overflow_label(client):
+    before = _count("GET", UNMATCHED_ROUTE, "404")
+    client.get("/wp-admin/setup.php")
+    client.get("/.env")
+    assert _count("GET", UNMATCHED_ROUTE, "404") == before + 2
+
+    body = client.get("/metrics").text
+    assert "wp-admin" not in body
+
+
+def test_unknown_methods_bucketed():
+    assert method_label("GET") == "GET"
+    assert method_label("PROPFIND") == "OTHER"
+
+
+def test_parse_buckets_sorted():
+    assert _parse_buckets("0.01, 0.001,,1") == [0.001, 0.01, 1.0]
@@ -0,0 +1,63 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
+
+from app.observability.metrics import REQUESTS
+from app.observability.middleware import ObservabilityMiddleware
+
+
+def _count(method: str, path: str, status: str) -> float:
+    return REQUESTS.labels(method, path, status)._value.get()
+
+
+def test_request_id_generated_and_echoed(client):
+    r = client.get("/healthz")
+    assert r.status_code == 200
+    assert r.headers.get("X-Request-ID")
+
+    r = client.get("/healthz", headers={"X-Request-ID": "rid-123"})
+    assert r.headers["X-Request-ID"] == "rid-123"
+
+
+def test_error_trace_id_matches_request_id(client):
+    r = client.get("/odds", headers={"X-Request-ID": "rid-401"})
+    assert r.status_code == 401
+    assert r.json()["traceId"] == "rid-401"
+    assert r.headers["X-Request-ID"] == "rid-401"
+
+
+def test_metrics_and_access_log(client, caplog):
+    before = _count("GET", "/healthz", "200")
+    with caplog.at_level(logging.INFO, logger="access"):
+        client.get("/healthz", headers={"X-Request-ID": "rid-log"})
+    assert _count("GET", "/healthz", "200") == before + 1
+    assert any('"request_id": "rid-log"' in m for m in caplog.messages)
+
+
+def test_trace_headers_from_current_span(monkeypatch):
+    import app.observability.middleware as mw
+
+    sc = SpanContext(
+        trace_id=0x1234, span_id=0x56, is_remote=False, trace_flags=TraceFlags(1)
+    )
+    monkeypatch.setattr(mw.trace, "get_current_span", lambda: NonRecordingSpan(sc))
+
+    app = FastAPI()
+    app.add_middleware(ObservabilityMiddleware)
+
+    @app.get("/t")
+    def t():
+        return {"ok": True}
+
+    r = TestClient(app).get("/t")
+    assert r.headers["trace-id"] == format(0x1234, "032x")
+    assert r.headers["span-id"] == format(0x56, "016x")
+
+
+def test_unhandled_error_counted_as_500(client):
+    before = _count("GET", "/_boom", "500")
+    r = client.get("/_boom")
+    assert r.status_code == 500
+    assert _count("GET", "/_boom", "500") == before + 1
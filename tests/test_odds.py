@@ -92,7 +92,7 @@ def test_post_odds_upsert_and_cursor_paging(client, writer_headers, reader_heade
     r = client.post("/odds", headers=writer_headers, json=payload)
     assert r.status_code == 200
     body = r.json()
-    assert body["inserted"] + body["updated"] == 1
+    assert body["inserted"] + body["updated"] + body["unchanged"] == 1
 
     # 2) GET med limit=1 ska returnera items + next_cursor
     r = client.get(
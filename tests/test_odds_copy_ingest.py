@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from app.core.settings import settings
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _items(match_id: str, n: int, price: float):
+    base = datetime(2031, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": price,
+            "probability": 0.5,
+            "captured_at": (base + timedelta(seconds=i)).isoformat(),
+            "source": "copy-test",
+            "checksum": f"c{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def test_post_odds_copy_path_counts(client, writer_headers, monkeypatch):
+    # Tvinga COPY-vägen även för små batcher
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", 2)
+
+    match_id = f"m_copy_{uuid.uuid4().hex[:8]}"
+    r = client.post(
+        "/odds", headers=writer_headers, json={"items": _items(match_id, 5, 2.5)}
+    )
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 5, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    # Samma nycklar igen -> uppdateringar
+    r = client.post(
+        "/odds", headers=writer_headers, json={"items": _items(match_id, 5, 2.6)}
+    )
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 0, "updated": 5, "unchanged": 0, "collapsed": 0}
+
+
+def test_post_odds_below_threshold_uses_values_path(
+    client, writer_headers, reader_headers, monkeypatch
+):
+    import app.crud.odds as crud
+
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", 100)
+
+    def _fail(*_a, **_k):
+        raise AssertionError("COPY-vägen ska inte användas under tröskeln")
+
+    monkeypatch.setattr(crud, "_bulk_upsert_odds_copy", _fail)
+
+    r = client.post(
+        "/odds", headers=writer_headers, json={"items": _items("m_copy_2", 3, 2.5)}
+    )
+    assert r.status_code == 200, r.text
+    assert sum(r.json().values()) == 3
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.settings import settings
+from app.crud.odds import dedup_odds
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _item(match_id: str, ts, price: float, source: str | None = None) -> dict:
+    return {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": price,
+        "captured_at": ts,
+        "source": source,
+    }
+
+
+def _prices(client, headers, match_id):
+    r = client.get("/odds", headers=headers, params={"match_id": match_id})
+    assert r.status_code == 200, r.text
+    return [it["price"] for it in r.json()["items"]]
+
+
+@pytest.mark.parametrize("copy_threshold", [0, 2])
+def test_duplicate_keys_collapse_last_wins(
+    client, writer_headers, reader_headers, monkeypatch, copy_threshold
+):
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", copy_threshold)
+    match_id = f"m_dedup_{uuid.uuid4().hex[:8]}"
+    items = [
+        _item(match_id, "2031-04-01T10:00:00Z", 2.0),
+        _item(match_id, "2031-04-01T11:00:00Z", 3.0),
+        _item(match_id, "2031-04-01T10:00:00+00:00", 2.1),  # samma nyckel
+        _item(match_id, "2031-04-01T10:00:00", 2.2),  # naiv = UTC, samma nyckel
+    ]
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 2, "updated": 0, "unchanged": 0, "collapsed": 2}
+    assert _prices(client, reader_headers, match_id) == [2.2, 3.0]
+
+
+def test_source_priority(monkeypatch):
+    monkeypatch.setattr(settings, "ODDS_DEDUP_SOURCE_PRIORITY", "feed-a, feed-b")
+    ts = datetime(2031, 4, 1, 10, tzinfo=timezone.utc)
+    rows = [
+        _item("m", ts, 2.0, "feed-b"),
+        _item("m", ts, 2.1, "feed-a"),
+        _item("m", ts, 2.2, "feed-b"),  # lägre prio
+        _item("m", ts, 2.3, None),  # okänd källa
+        _item("m", ts, 2.4, "feed-a"),  # samma prio -> senast
+    ]
+    unique, collapsed = dedup_odds(rows)
+    assert (collapsed, [r["price"] for r in unique]) == (4, [2.4])
+
+    monkeypatch.setattr(settings, "ODDS_DEDUP_SOURCE_PRIORITY", "")
+    unique, collapsed = dedup_odds(rows[:4])
+    assert (collapsed, [r["price"] for r in unique]) == (3, [2.3])
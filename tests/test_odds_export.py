@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import uuid
+
+from app.core.export import stream_query
+from app.core.settings import settings
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _seed(client, writer_headers, n: int) -> str:
+    match_id = f"m_export_{uuid.uuid4().hex[:8]}"
+    items = [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": 2.0 + i / 100,
+            "captured_at": f"2031-04-01T00:00:{i:02d}Z",
+            "source": "export-test" if i % 2 else None,
+        }
+        for i in range(n)
+    ]
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    return match_id
+
+
+def test_export_ndjson(client, writer_headers, reader_headers, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_FETCH_SIZE", 2)
+    match_id = _seed(client, writer_headers, 7)
+
+    r = client.get(
+        "/odds/export", headers=reader_headers, params={"match_id": match_id}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 7
+    assert [x["price"] for x in rows] == [2.0 + i / 100 for i in range(7)]
+    assert rows[0]["source"] is None and rows[1]["source"] == "export-test"
+
+
+def test_export_csv(client, writer_headers, reader_headers):
+    match_id = _seed(client, writer_headers, 3)
+
+    r = client.get(
+        "/odds/export",
+        headers=reader_headers,
+        params={"match_id": match_id, "format": "csv"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert "odds.csv" in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 3
+    assert rows[2]["price"] == "2.02"
+    assert rows[0]["source"] == ""
+
+
+def test_export_streams_in_fetch_size_chunks(client, writer_headers):
+    match_id = _seed(client, writer_headers, 5)
+    chunks = list(
+        stream_query(
+            "SELECT price FROM core.odds WHERE match_id = :m ORDER BY captured_at",
+            {"m": match_id},
+            lambda r: {"price": float(r["price"])},
+            "ndjson",
+            ["price"],
+            fetch_size=2,
+        )
+    )
+    assert [c.count("\n") for c in chunks] == [2, 2, 1]
+
+
+def test_export_validation(client, reader_headers):
+    r = client.get("/odds/export", headers=reader_headers, params={"format": "xml"})
+    assert r.status_code == 422
+    assert client.get("/odds/export").status_code == 401
@@ -0,0 +1,242 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import app.crud.ingest as ingest
+from app.core.db import SessionLocal
+from app.core.ingest_worker import IngestWorkerPool
+from app.core.settings import settings
+from app.crud.ingest import drain_odds_queue, enqueue_odds_batch, get_ingest_batch
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+ASYNC = {"Prefer": "respond-async"}
+
+
+@pytest.fixture()
+def async_ingest(monkeypatch):
+    from app.core.settings import settings
+
+    monkeypatch.setattr(settings, "INGEST_ASYNC_ENABLED", True)
+
+
+def _item(match_id, second=0, price=2.0):
+    return {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": price,
+        "captured_at": f"2026-05-01T12:00:{second:02d}+00:00",
+        "source": "feed-q",
+    }
+
+
+def _post(client, headers, items):
+    return client.post("/odds", headers={**headers, **ASYNC}, json={"items": items})
+
+
+def _drain_all():
+    with SessionLocal() as db:
+        while drain_odds_queue(db):
+            pass
+
+
+def test_prefer_async_ignored_when_disabled(client, writer_headers):
+    r = _post(client, writer_headers, [_item(f"m_q_{uuid.uuid4().hex[:8]}")])
+    assert r.status_code == 200
+    assert r.json() == {"inserted": 1, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+
+def test_async_post_returns_202_and_status(
+    client, writer_headers, reader_headers, async_ingest
+):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    r = _post(client, writer_headers, [_item(match_id, s) for s in range(3)])
+    assert r.status_code == 202, r.text
+    body = r.json()
+    assert body["status"] == "queued" and body["count"] == 3
+    assert r.headers["location"] == f"/odds/ingest/{body['batch_id']}"
+    assert r.headers["preference-applied"] == "respond-async"
+
+    status = client.get(r.headers["location"], headers=reader_headers).json()
+    assert status["status"] == "queued" and status["source"] == "feed-q"
+    assert (
+        client.get(f"/odds?match_id={match_id}", headers=reader_headers).json()["items"]
+        == []
+    )
+
+    _drain_all()
+    status = client.get(r.headers["location"], headers=reader_headers).json()
+    assert status["status"] == "ok" and status["finished_at"]
+    assert status["details"]["inserted"] >= 3
+    page = client.get(f"/odds?match_id={match_id}", headers=reader_headers).json()
+    assert len(page["items"]) == 3
+
+
+def test_small_batches_are_coalesced_last_write_wins(client, writer_headers):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    _drain_all()
+    with SessionLocal() as db:
+        ids = [
+            enqueue_odds_batch(db, [_item(match_id, 0, 2.0), _item(match_id, 1)]),
+            enqueue_odds_batch(db, [_item(match_id, 0, 2.5)]),
+            enqueue_odds_batch(db, [_item(match_id, 2)]),
+        ]
+        assert drain_odds_queue(db) == 3
+        assert drain_odds_queue(db) == 0
+        batches = [get_ingest_batch(db, i) for i in ids]
+
+    assert {b["status"] for b in batches} == {"ok"}
+    assert batches[0]["details"] == {
+        "inserted": 3,
+        "updated": 0,
+        "unchanged": 0,
+        "collapsed": 0,
+        "coalesced_batches": 3,
+        "coalesced_rows": 3,
+    }
+    r = client.get(f"/odds?match_id={match_id}", headers=writer_headers).json()
+    assert [it["price"] for it in r["items"]] == [2.5, 2.0, 2.0]
+
+
+def test_max_rows_limits_group(client):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    _drain_all()
+    with SessionLocal() as db:
+        for s in range(3):
+            enqueue_odds_batch(db, [_item(match_id, s * 2), _item(match_id, s * 2 + 1)])
+        assert drain_odds_queue(db, max_rows=4) == 2
+        assert drain_odds_queue(db, max_rows=4) == 1
+
+
+def test_failed_batch_is_isolated(client):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    _drain_all()
+    with SessionLocal() as db:
+        good = enqueue_odds_batch(db, [_item(match_id, 0)])
+        bad = enqueue_odds_batch(db, [_item(match_id, 1, price=0.5)])
+        good2 = enqueue_odds_batch(db, [_item(match_id, 2)])
+        assert drain_odds_queue(db) == 3
+        assert drain_odds_queue(db) == 0
+        status = {i: get_ingest_batch(db, i) for i in (good, bad, good2)}
+
+    assert status[good]["status"] == status[good2]["status"] == "ok"
+    assert status[bad]["status"] == "failed"
+    assert "price" in status[bad]["details"]["error"]
+
+
+def _failing_upsert(monkeypatch, exc, times=None):
+    real, calls = ingest.bulk_upsert_odds, []
+
+    def upsert(db, rows):
+        calls.append(len(rows))
+        if times is None or len(calls) <= times:
+            raise exc
+        return real(db, rows)
+
+    monkeypatch.setattr(ingest, "bulk_upsert_odds", upsert)
+    return calls
+
+
+def _queue_row(db, batch_id):
+    return db.execute(
+        text(
+            "SELECT attempts, next_attempt_at > now() AS waiting "
+            "FROM core.ingest_queue WHERE batch_id = :id"
+        ),
+        {"id": batch_id},
+    ).first()
+
+
+def _make_ready(db, batch_id):
+    db.execute(
+        text(
+            "UPDATE core.ingest_queue SET next_attempt_at = now() WHERE batch_id = :id"
+        ),
+        {"id": batch_id},
+    )
+    db.commit()
+
+
+def test_transient_error_keeps_batch_queued_with_backoff(client, monkeypatch):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    _drain_all()
+    deadlock = OperationalError("INSERT", {}, Exception("deadlock detected"))
+    calls = _failing_upsert(monkeypatch, deadlock, times=1)
+    with SessionLocal() as db:
+        batch_id = enqueue_odds_batch(db, [_item(match_id, 0)])
+        assert drain_odds_queue(db) == 1
+        assert tuple(_queue_row(db, batch_id)) == (1, True)
+        batch = get_ingest_batch(db, batch_id)
+        assert batch["status"] == "queued" and batch["details"]["attempts"] == 1
+        assert "deadlock" in batch["details"]["error"]
+
+        assert drain_odds_queue(db) == 0  # backoff: inte redo än
+        _make_ready(db, batch_id)
+        assert drain_odds_queue(db) == 1
+        assert _queue_row(db, batch_id) is None
+        assert get_ingest_batch(db, batch_id)["status"] == "ok"
+    assert len(calls) == 2
+
+
+def test_transient_error_fails_after_max_attempts(client, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_MAX_ATTEMPTS", 2)
+    _failing_upsert(monkeypatch, OperationalError("INSERT", {}, Exception("timeout")))
+    _drain_all()
+    with SessionLocal() as db:
+        batch_id = enqueue_odds_batch(db, [_item(f"m_q_{uuid.uuid4().hex[:8]}")])
+        assert drain_odds_queue(db) == 1
+        assert get_ingest_batch(db, batch_id)["status"] == "queued"
+        _make_ready(db, batch_id)
+        assert drain_odds_queue(db) == 1
+        batch = get_ingest_batch(db, batch_id)
+        assert _queue_row(db, batch_id) is None
+    assert batch["status"] == "failed" and "timeout" in batch["details"]["error"]
+
+
+def test_permanent_error_fails_without_retry(client, monkeypatch):
+    calls = _failing_upsert(
+        monkeypatch, IntegrityError("INSERT", {}, Exception("fk violation"))
+    )
+    _drain_all()
+    with SessionLocal() as db:
+        batch_id = enqueue_odds_batch(db, [_item(f"m_q_{uuid.uuid4().hex[:8]}")])
+        assert drain_odds_queue(db) == 1
+        assert _queue_row(db, batch_id) is None
+        assert get_ingest_batch(db, batch_id)["status"] == "failed"
+    assert len(calls) == 1
+
+
+def test_unknown_batch_and_fk_404(client, writer_headers, reader_headers, async_ingest):
+    r = client.get(f"/odds/ingest/{uuid.uuid4()}", headers=reader_headers)
+    assert r.status_code == 404
+
+    bad = {**_item("m_q_fk"), "selection_id": str(uuid.uuid4())}
+    r = _post(client, writer_headers, [bad])
+    assert r.status_code == 404
+
+
+def test_worker_pool_drains_after_notify(client):
+    match_id = f"m_q_{uuid.uuid4().hex[:8]}"
+    pool = IngestWorkerPool(drain_odds_queue)
+
+    async def scenario():
+        pool.start(workers=2)
+        try:
+            with SessionLocal() as db:
+                batch_id = enqueue_odds_batch(db, [_item(match_id, 0)])
+            pool.notify()
+            for _ in range(200):
+                with SessionLocal() as db:
+                    batch = get_ingest_batch(db, batch_id)
+                if batch["status"] != "queued":
+                    return batch
+                await asyncio.sleep(0.01)
+        finally:
+            await pool.stop()
+
+    assert asyncio.run(scenario())["status"] == "ok"
+    assert not pool.running
@@ -0,0 +1,89 @@
+import uuid
+
+from app.core.settings import settings
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _item(match_id: str, ts: str, price: float) -> dict:
+    return {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": price,
+        "captured_at": ts,
+        "source": "latest-test",
+    }
+
+
+def _latest(client, headers, match_id):
+    r = client.get("/odds/latest", headers=headers, params={"match_id": match_id})
+    assert r.status_code == 200, r.text
+    return r.json()["items"]
+
+
+def test_latest_keeps_newest_snapshot(client, writer_headers, reader_headers):
+    match_id = f"m_latest_{uuid.uuid4().hex[:8]}"
+    r = client.post(
+        "/odds",
+        headers=writer_headers,
+        json={
+            "items": [
+                _item(match_id, "2031-02-01T10:00:00Z", 2.0),
+                _item(match_id, "2031-02-01T12:00:00Z", 2.2),
+                _item(match_id, "2031-02-01T11:00:00Z", 2.1),
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+
+    items = _latest(client, reader_headers, match_id)
+    assert len(items) == 1
+    assert items[0]["price"] == 2.2
+    assert items[0]["captured_at"].startswith("2031-02-01T12:00:00")
+
+    # Äldre snapshot i en senare batch ersätter inte
+    r = client.post(
+        "/odds",
+        headers=writer_headers,
+        json={"items": [_item(match_id, "2031-01-01T00:00:00Z", 3.0)]},
+    )
+    assert r.status_code == 200, r.text
+    assert _latest(client, reader_headers, match_id)[0]["price"] == 2.2
+
+    # Korrigering av samma snapshot slår igenom
+    r = client.post(
+        "/odds",
+        headers=writer_headers,
+        json={"items": [_item(match_id, "2031-02-01T12:00:00Z", 2.25)]},
+    )
+    assert r.json() == {"inserted": 0, "updated": 1, "unchanged": 0, "collapsed": 0}
+    assert _latest(client, reader_headers, match_id)[0]["price"] == 2.25
+
+
+def test_latest_maintained_by_copy_and_chunked_paths(
+    client, writer_headers, reader_headers, monkeypatch
+):
+    match_id = f"m_latest_{uuid.uuid4().hex[:8]}"
+    items = [
+        _item(match_id, f"2031-03-01T00:00:{i:02d}Z", 2.0 + i / 100) for i in range(6)
+    ]
+
+    monkeypatch.setattr(settings, "UPSERT_CHUNK_SIZE", 2)
+    r = client.post("/odds", headers=writer_headers, json={"items": items[:3]})
+    assert r.status_code == 200, r.text
+    assert _latest(client, reader_headers, match_id)[0]["price"] == 2.02
+
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", 2)
+    r = client.post("/odds", headers=writer_headers, json={"items": items[3:]})
+    assert r.status_code == 200, r.text
+    assert _latest(client, reader_headers, match_id)[0]["price"] == 2.05
+
+
+def test_latest_requires_match_id_and_read_scope(client, reader_headers):
+    r = client.get("/odds/latest", headers=reader_headers)
+    assert r.status_code == 422
+    r = client.get("/odds/latest", params={"match_id": "x"})
+    assert r.status_code == 401
+    assert _latest(client, reader_headers, "no-such-match") == []
@@ -0,0 +1,191 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.core.microbatch import MicroBatcher, odds_microbatcher
+from app.crud.odds import bulk_upsert_odds_grouped, odds_key
+
+BOOKMAKER_ID = uuid.UUID("024c6a47-1a14-4549-935f-31e22e747670")
+SELECTION_ID = uuid.UUID("bea8671c-e889-4e3d-91d3-b407bc186408")
+
+
+@pytest.fixture()
+def window(monkeypatch):
+    from app.core.settings import settings
+
+    monkeypatch.setattr(settings, "ODDS_MICROBATCH_WINDOW_MS", 5.0)
+    monkeypatch.setattr(settings, "ODDS_MICROBATCH_MAX_ROWS", 1000)
+    monkeypatch.setattr(settings, "ODDS_MICROBATCH_MAX_REQUEST_ROWS", 20)
+    return settings
+
+
+def _row(match_id, second=0, price=2.0):
+    return {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": price,
+        "probability": None,
+        "captured_at": datetime(2026, 6, 1, 12, 0, second, tzinfo=timezone.utc),
+        "source": "scraper",
+        "checksum": None,
+    }
+
+
+class RecordingFlush:
+    def __init__(self, fail_match=None):
+        self.calls = []
+        self.fail_match = fail_match
+
+    def __call__(self, groups):
+        self.calls.append(groups)
+        if any(r["match_id"] == self.fail_match for g in groups for r in g):
+            raise RuntimeError("boom")
+        return [
+            {"inserted": len(g), "updated": 0, "unchanged": 0, "collapsed": 0}
+            for g in groups
+        ]
+
+
+def test_concurrent_small_writes_share_one_flush(window):
+    flush = RecordingFlush()
+    batcher = MicroBatcher(flush, odds_key)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(
+                batcher.submit([_row(f"m{i}", s) for s in range(i + 1)])
+                for i in range(5)
+            )
+        )
+
+    results = asyncio.run(scenario())
+    assert len(flush.calls) == 1 and len(flush.calls[0]) == 5
+    assert [r["inserted"] for r in results] == [1, 2, 3, 4, 5]
+
+
+def test_max_rows_seals_window_early(window, monkeypatch):
+    monkeypatch.setattr(window, "ODDS_MICROBATCH_MAX_ROWS", 4)
+    flush = RecordingFlush()
+    batcher = MicroBatcher(flush, odds_key)
+
+    async def scenario():
+        await asyncio.gather(
+            *(batcher.submit([_row(f"m{i}", 0), _row(f"m{i}", 1)]) for i in range(4))
+        )
+
+    asyncio.run(scenario())
+    assert [len(c) for c in flush.calls] == [2, 2]
+
+
+def test_request_that_would_overflow_max_rows_starts_new_batch(window, monkeypatch):
+    monkeypatch.setattr(window, "ODDS_MICROBATCH_MAX_ROWS", 4)
+    flush = RecordingFlush()
+    batcher = MicroBatcher(flush, odds_key)
+
+    async def scenario():
+        await asyncio.gather(
+            *(batcher.submit([_row(f"m{i}", s) for s in range(3)]) for i in range(3))
+        )
+
+    asyncio.run(scenario())
+    assert [sum(len(g) for g in call) for call in flush.calls] == [3, 3, 3]
+
+
+def test_microbatch_max_rows_is_bounded_by_bind_params():
+    from pydantic import ValidationError
+
+    from app.core.settings import ODDS_MICROBATCH_ROW_LIMIT, Settings
+
+    assert ODDS_MICROBATCH_ROW_LIMIT * 9 <= 65535
+    with pytest.raises(ValidationError):
+        Settings(ODDS_MICROBATCH_MAX_ROWS=ODDS_MICROBATCH_ROW_LIMIT + 1)
+    with pytest.raises(ValidationError):
+        Settings(ODDS_MICROBATCH_MAX_ROWS=10, ODDS_MICROBATCH_MAX_REQUEST_ROWS=20)
+
+
+def test_overlapping_key_goes_to_next_batch_in_order(window):
+    flush = RecordingFlush()
+    batcher = MicroBatcher(flush, odds_key)
+
+    async def scenario():
+        await asyncio.gather(
+            batcher.submit([_row("m", 0, 2.0)]),
+            batcher.submit([_row("other", 0)]),
+            batcher.submit([_row("m", 0, 3.0)]),
+        )
+
+    asyncio.run(scenario())
+    prices = [[r["price"] for g in call for r in g] for call in flush.calls]
+    assert prices == [[2.0, 2.0], [3.0]]
+
+
+def test_failing_request_is_isolated(window):
+    flush = RecordingFlush(fail_match="bad")
+    batcher = MicroBatcher(flush, odds_key)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.submit([_row("ok1")]),
+            batcher.submit([_row("bad")]),
+            batcher.submit([_row("ok2")]),
+            return_exceptions=True,
+        )
+
+    ok1, bad, ok2 = asyncio.run(scenario())
+    assert ok1 == ok2 == {"inserted": 1, "updated": 0, "unchanged": 0, "collapsed": 0}
+    assert isinstance(bad, RuntimeError)
+    assert len(flush.calls) == 4  # gruppen + en i taget
+
+
+def test_accepts_only_small_unique_writes(window, monkeypatch):
+    assert odds_microbatcher.accepts([_row("m", 0)])
+    assert not odds_microbatcher.accepts([])
+    assert not odds_microbatcher.accepts([_row("m", s % 60) for s in range(21)])
+    assert not odds_microbatcher.accepts([_row("m", 0), _row("m", 0)])
+    monkeypatch.setattr(window, "ODDS_MICROBATCH_WINDOW_MS", 0)
+    assert not odds_microbatcher.accepts([_row("m", 0)])
+
+
+def test_grouped_upsert_counts_per_group():
+    a, b = (f"m_mb_{uuid.uuid4().hex[:8]}" for _ in range(2))
+    with SessionLocal() as db:
+        first = bulk_upsert_odds_grouped(db, [[_row(a, 0)], [_row(b, 0), _row(b, 1)]])
+        again = bulk_upsert_odds_grouped(db, [[_row(b, 0, 2.2)], [], [_row(a, 1)]])
+    assert first == [
+        {"inserted": 1, "updated": 0, "unchanged": 0, "collapsed": 0},
+        {"inserted": 2, "updated": 0, "unchanged": 0, "collapsed": 0},
+    ]
+    assert again == [
+        {"inserted": 0, "updated": 1, "unchanged": 0, "collapsed": 0},
+        {"inserted": 0, "updated": 0, "unchanged": 0, "collapsed": 0},
+        {"inserted": 1, "updated": 0, "unchanged": 0, "collapsed": 0},
+    ]
+
+
+def test_post_odds_through_batcher(client, writer_headers, reader_headers, window):
+    match_id = f"m_mb_{uuid.uuid4().hex[:8]}"
+    item = {
+        "match_id": match_id,
+        "bookmaker_id": str(BOOKMAKER_ID),
+        "selection_id": str(SELECTION_ID),
+        "price": 1.9,
+        "captured_at": "2026-06-01T12:00:00",  # naiv -> UTC
+    }
+    r = client.post("/odds", headers=writer_headers, json={"items": [item]})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 1, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    r = client.post(
+        "/odds", headers=writer_headers, json={"items": [{**item, "price": 2.1}]}
+    )
+    assert r.json() == {"inserted": 0, "updated": 1, "unchanged": 0, "collapsed": 0}
+    page = client.get(f"/odds?match_id={match_id}", headers=reader_headers).json()
+    assert [it["price"] for it in page["items"]] == [2.1]
+
+    bad = {**item, "selection_id": str(uuid.uuid4())}
+    r = client.post("/odds", headers=writer_headers, json={"items": [bad]})
+    assert r.status_code == 404
@@ -0,0 +1,98 @@
+import re
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.db import SessionLocal
+from app.crud.partitions import ensure_odds_partitions, drop_expired_odds_partitions
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _month_name(dt: datetime) -> str:
+    return f"odds_p{dt:%Y%m}"
+
+
+def _explain(db, sql: str, params: dict) -> str:
+    rows = db.execute(text(f"EXPLAIN {sql}"), params).scalars().all()
+    return "\n".join(rows)
+
+
+def test_ensure_partitions_covers_current_month():
+    with SessionLocal() as db:
+        names = ensure_odds_partitions(db, months_ahead=1)
+    assert _month_name(datetime.now(timezone.utc)) in names
+    assert len(names) == 2
+
+
+def test_time_filter_prunes_partitions():
+    now = datetime.now(timezone.utc)
+    this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        ensure_odds_partitions(db, months_ahead=1)
+        # samma form som cursor-frågan i GET /odds (radjämförelse + enkel gräns)
+        plan = _explain(
+            db,
+            "SELECT odds_id FROM core.odds "
+            "WHERE captured_at >= :ts_from AND captured_at < :ts_to "
+            "AND (captured_at, odds_id) > (:cur_ts, :cur_id) "
+            "AND captured_at >= :cur_ts",
+            {
+                "ts_from": this_month,
+                "ts_to": now,
+                "cur_ts": this_month,
+                "cur_id": uuid.uuid4(),
+            },
+        )
+    scanned = set(re.findall(r" on (odds_\w+?)(?:_\w+_idx)? ", plan))
+    assert scanned == {_month_name(now)}
+
+
+def test_default_rows_move_and_expired_partition_is_dropped(client, writer_headers):
+    match_id = f"m_part_{uuid.uuid4().hex[:8]}"
+    ts = datetime(1990, 1, 15, tzinfo=timezone.utc)
+    r = client.post(
+        "/odds",
+        headers=writer_headers,
+        json={
+            "items": [
+                {
+                    "match_id": match_id,
+                    "bookmaker_id": BOOKMAKER_ID,
+                    "selection_id": SELECTION_ID,
+                    "price": 2.1,
+                    "captured_at": ts.isoformat(),
+                }
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+
+    where = {"m": match_id}
+    with SessionLocal() as db:
+        part = db.execute(
+            text("SELECT tableoid::regclass::text FROM core.odds WHERE match_id = :m"),
+            where,
+        ).scalar_one()
+        assert part == "core.odds_default"
+
+        # ny månadspartition plockar över raden från default
+        db.execute(text("SELECT core.create_odds_partition(:ts)"), {"ts": ts})
+        db.commit()
+        part = db.execute(
+            text("SELECT tableoid::regclass::text FROM core.odds WHERE match_id = :m"),
+            where,
+        ).scalar_one()
+        assert part == "core.odds_p199001"
+
+        # 30 års retention: bara 1990-partitionen är utgången
+        dropped = drop_expired_odds_partitions(db, retention_months=360)
+        assert dropped == ["odds_p199001"]
+        left = db.execute(
+            text("SELECT count(*) FROM core.odds WHERE match_id = :m"), where
+        ).scalar_one()
+        assert left == 0
+
+        assert drop_expired_odds_partitions(db, retention_months=0) == []
@@ -0,0 +1,110 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+import app.core.snapshot_cache as snapshot_cache
+import app.crud.odds as crud
+from app.core.db import SessionLocal
+from app.core.settings import settings
+from app.core.snapshot_cache import SnapshotCache
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _items(match_id: str, prices: list[float]) -> list[dict]:
+    return [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": p,
+            "captured_at": f"2031-03-01T10:0{i}:00Z",
+            "source": "unchanged-test",
+            "checksum": f"c{i}",
+        }
+        for i, p in enumerate(prices)
+    ]
+
+
+def _row_versions(match_id: str) -> list[str]:
+    with SessionLocal() as db:
+        return list(
+            db.execute(
+                text(
+                    "SELECT xmin::text FROM core.odds WHERE match_id = :m "
+                    "ORDER BY captured_at"
+                ),
+                {"m": match_id},
+            ).scalars()
+        )
+
+
+@pytest.mark.parametrize("copy_threshold", [0, 2])
+def test_resend_is_unchanged_and_not_rewritten(
+    client, writer_headers, monkeypatch, copy_threshold
+):
+    monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", copy_threshold)
+    match_id = f"m_unch_{uuid.uuid4().hex[:8]}"
+    items = _items(match_id, [2.0, 2.1, 2.2])
+
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.json() == {"inserted": 3, "updated": 0, "unchanged": 0, "collapsed": 0}
+    before = _row_versions(match_id)
+
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 0, "updated": 0, "unchanged": 3, "collapsed": 0}
+    assert _row_versions(match_id) == before
+
+    # bara ändrade värden skrivs; 2.10 är samma numeric som 2.1
+    changed = _items(match_id, [2.0, 2.10, 2.3])
+    r = client.post("/odds", headers=writer_headers, json={"items": changed})
+    assert r.json() == {"inserted": 0, "updated": 1, "unchanged": 2, "collapsed": 0}
+    after = _row_versions(match_id)
+    assert after[:2] == before[:2] and after[2] != before[2]
+
+
+def test_recent_cache_skips_database(client, writer_headers, monkeypatch):
+    monkeypatch.setattr(crud, "recent_odds", SnapshotCache(60, 100))
+    match_id = f"m_unch_{uuid.uuid4().hex[:8]}"
+    items = _items(match_id, [2.0, 2.1])
+
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.json() == {"inserted": 2, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    def _fail(*_a, **_k):
+        raise AssertionError("exakt omsändning ska inte nå databasen")
+
+    monkeypatch.setattr(crud, "_write_odds", _fail)
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 0, "updated": 0, "unchanged": 2, "collapsed": 0}
+
+    monkeypatch.undo()
+    monkeypatch.setattr(crud, "recent_odds", SnapshotCache(60, 100))
+    r = client.post(
+        "/odds", headers=writer_headers, json={"items": _items(match_id, [2.0, 2.5])}
+    )
+    assert r.json() == {"inserted": 0, "updated": 1, "unchanged": 1, "collapsed": 0}
+
+
+def test_snapshot_cache_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(snapshot_cache.time, "monotonic", lambda: now[0])
+    c = SnapshotCache(ttl_seconds=10, max_entries=2)
+    key, value = (lambda r: r[0]), (lambda r: r[1])
+
+    c.remember([("a", 1), ("b", 1)], key, value)
+    assert c.unseen([("a", 1), ("a", 2), ("c", 1)], key, value) == [
+        ("a", 2),
+        ("c", 1),
+    ]
+    c.remember([("c", 1)], key, value)  # b är minst nyligen använd -> evictas
+    assert c.unseen([("a", 1), ("b", 1), ("c", 1)], key, value) == [("b", 1)]
+
+    now[0] += 11
+    assert c.unseen([("a", 1)], key, value) == [("a", 1)]
+    c.clear()
+    assert SnapshotCache(0, 10).unseen([("a", 1)], key, value) == [("a", 1)]
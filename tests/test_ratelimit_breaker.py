@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError, NoScriptError
+
+import app.core.ratelimit as rl
+from app.observability.metrics import (
+    RATELIMIT_BREAKER_TRIPS,
+    RATELIMIT_FALLBACK,
+    RATELIMIT_REDIS_ERRORS,
+)
+
+
+class ScriptedRedis:
+    """evalsha-svar styrs per anrop: värde, exception eller fördröjning (s)."""
+
+    def __init__(self, *, fail=None, delay=0.0, reply=(1, 1, 9, 0, 1)):
+        self.fail = fail
+        self.delay = delay
+        self.reply = list(reply)
+        self.evalsha_calls = 0
+        self.loads = 0
+
+    async def script_load(self, _lua):
+        self.loads += 1
+        return f"sha{self.loads}"
+
+    async def evalsha(self, *_args):
+        self.evalsha_calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail is not None:
+            exc = self.fail
+            if isinstance(exc, NoScriptError):
+                self.fail = None  # bara första anropet
+            raise exc
+        return self.reply
+
+    async def eval(self, *_args):
+        raise AssertionError("EVAL med hela scriptet ska inte användas")
+
+
+def _client(dep):
+    app = FastAPI()
+
+    @app.get("/ping", dependencies=[Depends(dep)])
+    def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def _value(counter, *labels):
+    metric = counter.labels(*labels) if labels else counter
+    return metric._value.get()
+
+
+@pytest.fixture()
+def breaker(monkeypatch):
+    b = rl.CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+    monkeypatch.setattr(rl, "redis_breaker", b)
+    monkeypatch.setattr(rl.settings, "RL_REDIS_TIMEOUT", 0.02)
+    return b
+
+
+def test_noscript_reloads_instead_of_eval(monkeypatch, breaker):
+    fake = ScriptedRedis(fail=NoScriptError("NOSCRIPT"))
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+
+    c = _client(rl.rate_limit_dependency("b_noscript", 10, 1.0, lease=0))
+    assert c.get("/ping").status_code == 200
+    assert (fake.loads, fake.evalsha_calls) == (2, 2)
+    assert breaker.state == "closed"
+
+
+def test_timeout_falls_back_locally(monkeypatch, breaker):
+    fake = ScriptedRedis(delay=1.0)
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+    timeouts = _value(RATELIMIT_REDIS_ERRORS, "timeout")
+    fallbacks = _value(RATELIMIT_FALLBACK, "b_slow", "allowed")
+
+    c = _client(rl.rate_limit_dependency("b_slow", 10, 1.0, lease=0))
+    r = c.get("/ping")
+
+    assert r.status_code == 200
+    assert _value(RATELIMIT_REDIS_ERRORS, "timeout") == timeouts + 1
+    assert _value(RATELIMIT_FALLBACK, "b_slow", "allowed") == fallbacks + 1
+
+
+def test_breaker_opens_and_skips_redis(monkeypatch, breaker):
+    fake = ScriptedRedis(fail=ConnectionError("down"))
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+    trips = _value(RATELIMIT_BREAKER_TRIPS)
+
+    # lokal fallback: 2 tokens, sedan 429 utan att Redis tillfrågas
+    c = _client(rl.rate_limit_dependency("b_down", 2, 0.001, lease=0))
+    codes = [c.get("/ping").status_code for _ in range(4)]
+
+    assert codes == [200, 200, 429, 429]
+    assert fake.evalsha_calls == 2
+    assert breaker.state == "open"
+    assert _value(RATELIMIT_BREAKER_TRIPS) == trips + 1
+
+
+def test_breaker_half_open_recovers(monkeypatch):
+    b = rl.CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    now = [100.0]
+    monkeypatch.setattr(rl.time, "monotonic", lambda: now[0])
+
+    b.record_failure()
+    assert b.state == "open" and not b.allow_request()
+
+    now[0] += 10
+    assert b.state == "half-open"
+    assert b.allow_request()
+    assert not b.allow_request()  # bara ett provanrop i taget
+
+    b.record_failure()
+    assert b.state == "open"
+
+    now[0] += 10
+    assert b.allow_request()
+    b.record_success()
+    assert b.state == "closed" and b.allow_request()
+
+
+def test_fallback_share_zero_fails_open():
+    buckets = rl.LocalTokenBuckets(share=0, max_entries=10)
+    for _ in range(5):
+        allowed, granted, _ = buckets.allow_many([("k", 1, 0.001)], cost=1)
+        assert (allowed, granted) == (1, 1)
+
+
+def test_fallback_cost_capped_to_scaled_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rl.time, "monotonic", lambda: now[0])
+    buckets = rl.LocalTokenBuckets(share=0.5, max_entries=10)
+    spec = [("k", 10, 2.0)]  # lokalt: 5 tokens, 1/s
+
+    # en request som ryms i Redis-hinken (8) tömmer den lokala hinken
+    allowed, granted, [(tokens, _, _)] = buckets.allow_many(spec, cost=8)
+    assert (allowed, granted, tokens) == (1, 5, 0.0)
+    allowed, _, [(_, retry_after, _)] = buckets.allow_many(spec, cost=8)
+    assert (allowed, retry_after) == (0, 5)
+
+
+def test_oversized_bulk_gets_413_while_small_consumers_share_bucket(
+    monkeypatch, breaker
+):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Redis nere -> lokal hink (5 tokens); små anropare håller den under full
+    monkeypatch.setattr(rl, "get_redis", lambda: ScriptedRedis(fail=ConnectionError()))
+    monkeypatch.setattr(rl.settings, "RL_FALLBACK_SHARE", 1.0)
+    monkeypatch.setattr(rl.settings, "RL_ROWS_PER_TOKEN", 1)
+    dep = rl.rate_limit_dependency(
+        "b_shared", 5, 1.0, cost_getter=rl.bulk_items_cost, lease=0
+    )
+    app = FastAPI()
+
+    @app.post("/bulk", dependencies=[Depends(dep)])
+    def bulk(payload: dict):
+        return {"n": len(payload["items"])}
+
+    c = TestClient(app)
+
+    def post(n):
+        return c.post("/bulk", json={"items": list(range(n))})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sizes = [1] * 20 + [40] * 4
+        responses = list(pool.map(post, sizes))
+
+    small = [r.status_code for n, r in zip(sizes, responses) if n == 1]
+    large = [r for n, r in zip(sizes, responses) if n == 40]
+    assert small.count(200) >= 5 and set(small) <= {200, 429}
+    # aldrig 429 (som skulle bli evig under last), alltid ett tydligt 413
+    assert {r.status_code for r in large} == {413}
+    assert "at most 5 items" in large[0].text
@@ -11,10 +11,10 @@ class FakeRedis:
         return (1_000, 0)
 
     async def evalsha(self, *_args):
-        return [0, 0.0, 3, 5]
+        return [0, 0, 0.0, 3, 5]
 
     async def eval(self, *_args):
-        return [0, 0.0, 3, 5]
+        return [0, 0, 0.0, 3, 5]
 
 
 def build_app_with(dep):
@@ -50,3 +50,190 @@ def test_rate_limit_noop_allows():
     r = c.get("/ping")
     assert r.status_code == 200
     assert r.json() == {"ok": True}
+
+
+class RecordingRedis(FakeRedis):
+    """Spelar in EVALSHA-anrop; TIME får inte längre anropas från klienten."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def time(self):
+        raise AssertionError("klockan ska tas i Lua-scriptet")
+
+    async def evalsha(self, *args):
+        self.calls.append(args)
+        return self.reply
+
+
+def test_combined_limiter_single_round_trip(monkeypatch):
+    import app.core.ratelimit as rl
+
+    # per-nyckel: 7 kvar, global: 2 kvar -> headers från den globala hinken
+    fake = RecordingRedis([1, 1, 7, 0, 1, 2, 0, 3])
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+
+    dep = rl.combined_limiter("odds_post", 10, 10.0, 100, 50.0)
+    c = TestClient(build_app_with(dep))
+    r = c.get("/ping", headers={"X-API-Key": "writer1"})
+
+    assert r.status_code == 200
+    assert r.headers["X-RateLimit-Limit"] == "100"
+    assert r.headers["X-RateLimit-Remaining"] == "2"
+    assert len(fake.calls) == 1
+    sha, numkeys, k1, k2, cost, lease, *caps = fake.calls[0]
+    assert (sha, numkeys, cost, lease) == ("sha", 2, 1, 1)
+    assert (k1, k2) == ("rl:{odds_post}:writer1", "rl:{odds_post}:global")
+    assert caps == [10, 10.0, 100, 50.0]
+
+
+def test_combined_limiter_denied_reports_blocking_bucket(monkeypatch):
+    import app.core.ratelimit as rl
+
+    # global hinken är tom (retry 4 s), per-nyckel hade räckt
+    fake = RecordingRedis([0, 0, 5, 0, 1, 0, 4, 9])
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+
+    dep = rl.combined_limiter("odds_post", 10, 10.0, 100, 50.0)
+    r = TestClient(build_app_with(dep)).get("/ping")
+
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "4"
+    assert r.headers["X-RateLimit-Limit"] == "100"
+    assert r.headers["X-RateLimit-Reset"] == "9"
+
+
+class LeasingRedis(FakeRedis):
+    """En hink i minnet som beviljar upp till `lease` tokens per anrop."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.calls = 0
+
+    async def evalsha(self, _sha, _numkeys, _key, cost, lease, _cap, _refill):
+        self.calls += 1
+        if self.tokens < cost:
+            return [0, 0, self.tokens, 1, 1]
+        granted = max(cost, min(lease, self.tokens))
+        self.tokens -= granted
+        return [1, granted, self.tokens, 0, 1]
+
+
+def test_lease_admits_locally_until_lease_runs_out(monkeypatch):
+    import app.core.ratelimit as rl
+
+    fake = LeasingRedis(tokens=12)
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+
+    dep = rl.rate_limit_dependency("lease_bucket", 12, 1.0, lease=5)
+    c = TestClient(build_app_with(dep))
+
+    codes = [c.get("/ping").status_code for _ in range(13)]
+    # 12 tokens totalt: tre lån (5, 5, 2) + ett nekat Redis-anrop
+    assert codes == [200] * 12 + [429]
+    assert fake.calls == 4
+
+
+def test_lease_remaining_header_counts_local_tokens(monkeypatch):
+    import app.core.ratelimit as rl
+
+    fake = LeasingRedis(tokens=10)
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+
+    dep = rl.rate_limit_dependency("lease_bucket", 10, 1.0, lease=4)
+    c = TestClient(build_app_with(dep))
+
+    assert c.get("/ping").headers["X-RateLimit-Remaining"] == "9"
+    assert c.get("/ping").headers["X-RateLimit-Remaining"] == "8"
+    assert fake.calls == 1
+
+
+def test_lease_expires(monkeypatch):
+    import app.core.ratelimit as rl
+
+    leases = rl.LocalLeases(ttl_seconds=0.5, max_entries=10)
+    leases.put(("k",), 3, 10, 5.0, 1)
+    assert leases.take(("k",), 1) == (10, 7.0, 1)
+    assert leases.take(("k",), 5) is None  # räcker inte
+
+    monkeypatch.setattr(rl.time, "monotonic", lambda: 10**9)
+    assert leases.take(("k",), 1) is None
+
+
+def build_bulk_app_with(dep):
+    app = FastAPI()
+
+    @app.post("/bulk", dependencies=[Depends(dep)])
+    def bulk(payload: dict):
+        return {"n": len(payload["items"])}
+
+    return app
+
+
+def test_bulk_items_cost_per_rows(monkeypatch):
+    import json
+    import app.core.ratelimit as rl
+    import starlette.requests
+
+    fake = RecordingRedis([1, 3, 97, 0, 1])
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+    monkeypatch.setattr(rl.settings, "RL_ROWS_PER_TOKEN", 100)
+
+    # body:n ska bara parsas en gång (FastAPI), kostnaden läser cachen
+    parses = []
+    real_loads = json.loads
+    monkeypatch.setattr(
+        starlette.requests.json,
+        "loads",
+        lambda *a, **k: parses.append(1) or real_loads(*a, **k),
+    )
+
+    dep = rl.rate_limit_dependency(
+        "bulk", 100, 10.0, cost_getter=rl.bulk_items_cost, lease=0
+    )
+    c = TestClient(build_bulk_app_with(dep))
+    r = c.post("/bulk", json={"items": [{"i": i} for i in range(250)]})
+
+    assert len(parses) == 1
+    assert r.status_code == 200
+    assert r.json() == {"n": 250}
+    _sha, _n, _key, cost, *_ = fake.calls[0]
+    assert cost == 3
+
+
+def test_bulk_cost_above_capacity_is_413(monkeypatch):
+    import app.core.ratelimit as rl
+
+    fake = RecordingRedis([1, 5, 0, 0, 5])
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+    monkeypatch.setattr(rl.settings, "RL_ROWS_PER_TOKEN", 1)
+
+    dep = rl.rate_limit_dependency(
+        "bulk", 5, 1.0, cost_getter=rl.bulk_items_cost, lease=0
+    )
+    c = TestClient(build_bulk_app_with(dep))
+    r = c.post("/bulk", json={"items": list(range(40))})
+    assert r.status_code == 413
+    assert "at most 5 items" in r.text
+    assert fake.calls == []  # ingen token dras
+
+    # en batch som ryms i hinken debiteras hela sin kostnad
+    assert c.post("/bulk", json={"items": list(range(5))}).status_code == 200
+    _sha, _n, _key, cost, *_ = fake.calls[0]
+    assert cost == 5
+
+
+def test_bulk_items_cost_disabled(monkeypatch):
+    import app.core.ratelimit as rl
+
+    fake = RecordingRedis([1, 1, 9, 0, 1])
+    monkeypatch.setattr(rl, "get_redis", lambda: fake)
+    monkeypatch.setattr(rl.settings, "RL_ROWS_PER_TOKEN", 0)
+
+    dep = rl.rate_limit_dependency(
+        "bulk", 10, 1.0, cost_getter=rl.bulk_items_cost, lease=0
+    )
+    c = TestClient(build_bulk_app_with(dep))
+    assert c.post("/bulk", json={"items": list(range(40))}).status_code == 200
+    assert fake.calls[0][3] == 1
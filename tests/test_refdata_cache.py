@@ -0,0 +1,58 @@
+import uuid
+
+import app.core.refdata as refdata
+from app.core.refdata import RefDataCache, find_missing
+
+
+class FakeDB:
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.calls = 0
+
+    def execute(self, _stmt, params):
+        self.calls += 1
+        return [(i,) for i in params["ids"] if i in self.existing]
+
+
+def test_cache_split_add_and_lru():
+    c = RefDataCache(ttl_seconds=60, max_entries=2)
+    a, b, d = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    c.add("bookmaker", [a, b])
+    assert c.split("bookmaker", [a, b]) == ({a, b}, [])
+    c.add("bookmaker", [d])  # a är äldst -> evictas
+    hits, misses = c.split("bookmaker", [a, b, d])
+    assert hits == {b, d} and misses == [a]
+
+
+def test_cache_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(refdata.time, "monotonic", lambda: now[0])
+    c = RefDataCache(ttl_seconds=10, max_entries=10)
+    a = uuid.uuid4()
+    c.add("model", [a])
+    assert c.split("model", [a]) == ({a}, [])
+    now[0] += 11
+    assert c.split("model", [a]) == (set(), [a])
+
+
+def test_find_missing_only_queries_misses(monkeypatch):
+    monkeypatch.setattr(refdata, "ref_cache", RefDataCache(60, 100))
+    known, unknown = uuid.uuid4(), uuid.uuid4()
+    db = FakeDB([known])
+
+    assert find_missing(db, "bookmaker", [known, unknown]) == [unknown]
+    assert db.calls == 1
+    # känd -> från cache; okänd cachas inte negativt
+    assert find_missing(db, "bookmaker", [known]) == []
+    assert db.calls == 1
+    assert find_missing(db, "bookmaker", [unknown]) == [unknown]
+    assert db.calls == 2
+
+
+def test_find_missing_disabled_cache_always_queries(monkeypatch):
+    monkeypatch.setattr(refdata, "ref_cache", RefDataCache(0, 100))
+    known = uuid.uuid4()
+    db = FakeDB([known])
+    find_missing(db, "model", [known])
+    find_missing(db, "model", [known])
+    assert db.calls == 2
@@ -0,0 +1,108 @@
+import uuid
+
+import app.core.counting as counting
+from app.core.counting import CountCache
+from app.core.settings import settings
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+
+
+def _seed(client, headers, n: int = 3) -> str:
+    match_id = f"m_total_{uuid.uuid4().hex[:8]}"
+    items = [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": 2.0,
+            "captured_at": f"2031-04-01T00:0{i}:00Z",
+        }
+        for i in range(n)
+    ]
+    r = client.post("/odds", headers=headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    return match_id
+
+
+def _get(client, headers, **params):
+    r = client.get("/odds", headers=headers, params=params)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_total_none_and_cursor_pages_skip_count(client, writer_headers, reader_headers):
+    match_id = _seed(client, writer_headers)
+
+    page = _get(client, reader_headers, match_id=match_id, limit=2, total="none")
+    assert page["total"] is None
+    assert page["next_offset"] == 2
+
+    page2 = _get(
+        client, reader_headers, match_id=match_id, limit=2, cursor=page["next_cursor"]
+    )
+    assert page2["total"] is None
+    assert len(page2["items"]) == 1
+
+
+def test_total_exact_default(client, writer_headers, reader_headers):
+    match_id = _seed(client, writer_headers)
+    page = _get(client, reader_headers, match_id=match_id, limit=3)
+    assert page["total"] == 3
+    assert page["next_offset"] is None
+
+
+def test_total_estimate_small_sets_exact_and_cached(
+    client, writer_headers, reader_headers, monkeypatch
+):
+    monkeypatch.setattr(counting, "count_cache", CountCache(60, 10))
+    match_id = _seed(client, writer_headers)
+
+    page = _get(client, reader_headers, match_id=match_id, total="estimate")
+    assert page["total"] == 3
+
+    # ny rad syns inte förrän cachen gått ut
+    _seed_more = {
+        "match_id": match_id,
+        "bookmaker_id": BOOKMAKER_ID,
+        "selection_id": SELECTION_ID,
+        "price": 2.0,
+        "captured_at": "2031-04-01T01:00:00Z",
+    }
+    client.post("/odds", headers=writer_headers, json={"items": [_seed_more]})
+    page = _get(client, reader_headers, match_id=match_id, total="estimate")
+    assert page["total"] == 3
+
+
+def test_total_estimate_uses_planner(
+    client, writer_headers, reader_headers, monkeypatch
+):
+    monkeypatch.setattr(counting, "count_cache", CountCache(0, 0))
+    monkeypatch.setattr(settings, "COUNT_ESTIMATE_EXACT_BELOW", -1)
+    match_id = _seed(client, writer_headers)
+    r = client.get(
+        "/predictions",
+        headers=reader_headers,
+        params={"match_id": match_id, "total": "estimate"},
+    )
+    assert r.status_code == 200
+    assert isinstance(r.json()["total"], int)
+
+    page = _get(client, reader_headers, match_id=match_id, total="estimate")
+    assert isinstance(page["total"], int)
+
+
+def test_total_invalid_mode_422(client, reader_headers):
+    r = client.get("/odds", headers=reader_headers, params={"total": "approx"})
+    assert r.status_code == 422
+
+
+def test_count_cache_ttl_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(counting.time, "monotonic", lambda: now[0])
+    c = CountCache(ttl_seconds=5, max_entries=1)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") is None and c.get("b") == 2
+    now[0] += 6
+    assert c.get("b") is None
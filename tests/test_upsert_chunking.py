@@ -0,0 +1,205 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.core.db import SessionLocal
+from app.core.settings import settings
+from app.crud.chunking import sort_and_chunk, PG_MAX_PARAMS
+from app.crud.odds import (
+    _STAGE_MERGE,
+    _odds_grouped_sql,
+    bulk_upsert_odds,
+    bulk_upsert_odds_grouped,
+)
+
+BOOKMAKER_ID = "024c6a47-1a14-4549-935f-31e22e747670"
+SELECTION_ID = "bea8671c-e889-4e3d-91d3-b407bc186408"
+MODEL_ID = "5c53bd4d-088d-48ca-8530-6d517a6597f9"
+
+
+def test_sort_and_chunk_orders_by_key_and_splits():
+    rows = [{"k": k, "v": i} for i, k in enumerate(["c", "a", "d", "b", "e"])]
+    chunks = sort_and_chunk(rows, ["k"], size=2, n_cols=2)
+    assert [[r["k"] for r in c] for c in chunks] == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_sort_and_chunk_caps_bind_params():
+    rows = [{"k": i} for i in range(10)]
+    chunks = sort_and_chunk(rows, ["k"], size=10**9, n_cols=PG_MAX_PARAMS // 3)
+    assert max(len(c) for c in chunks) == 3
+
+
+def test_sort_and_chunk_matches_sql_lock_order():
+    # str() gav fel ordning för tider med olika offset; text jämförs som
+    # COLLATE "C" (versaler före gemener, å/ä efter z) oavsett databasens kollation
+    cest = timezone(timedelta(hours=2))
+    rows = [
+        {"m": m, "u": uuid.UUID(u), "t": t}
+        for m in ["b", "B", "ä", "a-b", "ab"]
+        for u in ["ffffffff-0000-4000-8000-000000000000", BOOKMAKER_ID]
+        for t in [
+            datetime(2031, 2, 1, 11, 30, tzinfo=cest),  # 09:30 UTC
+            datetime(2031, 2, 1, 10, 0, tzinfo=timezone.utc),
+            datetime(2031, 2, 1, 9, 0),  # naiv = UTC
+        ]
+    ]
+    (chunk,) = sort_and_chunk(rows, ["m", "u", "t"], size=len(rows), n_cols=3)
+
+    values = ", ".join(
+        f"(:m{i}, CAST(:u{i} AS uuid), CAST(:t{i} AS timestamptz), {i})"
+        for i in range(len(rows))
+    )
+    params = {}
+    for i, r in enumerate(rows):
+        t = r["t"] if r["t"].tzinfo else r["t"].replace(tzinfo=timezone.utc)
+        params.update({f"m{i}": r["m"], f"u{i}": r["u"], f"t{i}": t})
+    with SessionLocal() as db:
+        sql_order = db.execute(
+            text(
+                f"SELECT i FROM (VALUES {values}) AS v(m, u, t, i) "
+                'ORDER BY m COLLATE "C", u, t'
+            ),
+            params,
+        ).scalars()
+        assert chunk == [rows[i] for i in sql_order]
+
+
+@pytest.fixture()
+def insert_order():
+    """Loggar i vilken ordning rader når core.odds (= radlåsordningen)."""
+    ddl = [
+        "CREATE TABLE public.test_insert_order "
+        "(seq bigserial, match_id text, captured_at timestamptz)",
+        """
+        CREATE FUNCTION public.test_log_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO public.test_insert_order (match_id, captured_at)
+            VALUES (NEW.match_id, NEW.captured_at);
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+        """,
+        "CREATE TRIGGER test_log_insert BEFORE INSERT ON core.odds "
+        "FOR EACH ROW EXECUTE FUNCTION public.test_log_insert()",
+    ]
+    with SessionLocal() as db:
+        for stmt in ddl:
+            db.execute(text(stmt))
+        db.commit()
+
+    def read(prefix: str) -> list[tuple]:
+        with SessionLocal() as db:
+            return [
+                tuple(r)
+                for r in db.execute(
+                    text(
+                        "SELECT match_id, captured_at FROM public.test_insert_order "
+                        "WHERE match_id LIKE :p ORDER BY seq"
+                    ),
+                    {"p": prefix + "%"},
+                )
+            ]
+
+    try:
+        yield read
+    finally:
+        with SessionLocal() as db:
+            db.execute(text("DROP TRIGGER IF EXISTS test_log_insert ON core.odds"))
+            db.execute(text("DROP FUNCTION IF EXISTS public.test_log_insert()"))
+            db.execute(text("DROP TABLE IF EXISTS public.test_insert_order"))
+            db.commit()
+
+
+def test_all_odds_write_paths_lock_in_same_order(insert_order, monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_CHUNK_SIZE", 4)
+    cest = timezone(timedelta(hours=2))
+    run = uuid.uuid4().hex[:8]
+
+    def rows(path: str) -> list[dict]:
+        return [
+            {
+                "match_id": f"lo_{run}_{path}_{m}",
+                "bookmaker_id": uuid.UUID(BOOKMAKER_ID),
+                "selection_id": uuid.UUID(SELECTION_ID),
+                "price": 2.0,
+                "probability": None,
+                "captured_at": t,
+                "source": None,
+                "checksum": None,
+            }
+            for m in ["b", "B", "ä", "a-b", "ab"]
+            for t in [
+                datetime(2031, 2, 1, 11, 30, tzinfo=cest),
+                datetime(2031, 2, 1, 10, 0, tzinfo=timezone.utc),
+            ]
+        ]
+
+    with SessionLocal() as db:
+        monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", 0)
+        bulk_upsert_odds(db, rows("pipe"))
+        monkeypatch.setattr(settings, "ODDS_COPY_THRESHOLD", 1)
+        bulk_upsert_odds(db, rows("copy"))
+        grouped = rows("group")
+        results = bulk_upsert_odds_grouped(db, [grouped[::2], grouped[1::2]])
+    assert [r["inserted"] for r in results] == [5, 5]
+
+    orders = {}
+    for path in ("pipe", "copy", "group"):
+        prefix = f"lo_{run}_{path}_"
+        orders[path] = [(m[len(prefix) :], t) for m, t in insert_order(prefix)]
+    assert len(orders["pipe"]) == 10
+    assert orders["pipe"] == orders["copy"] == orders["group"]
+    assert [m for m, _ in orders["pipe"][::2]] == ["B", "a-b", "ab", "b", "ä"]
+    # testdatabasen kan själv ha kollation C; SQL-vägarna ska inte bero på det
+    for sql in (_STAGE_MERGE, _odds_grouped_sql(1)):
+        assert 'ORDER BY match_id COLLATE "C"' in sql
+
+
+def test_post_odds_chunked_counts(client, writer_headers, monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_CHUNK_SIZE", 2)
+    match_id = f"m_chunk_{uuid.uuid4().hex[:8]}"
+    base = datetime(2031, 2, 1, tzinfo=timezone.utc)
+    items = [
+        {
+            "match_id": match_id,
+            "bookmaker_id": BOOKMAKER_ID,
+            "selection_id": SELECTION_ID,
+            "price": 2.0,
+            "captured_at": (base + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(5)
+    ]
+    r = client.post("/odds", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 5, "updated": 0, "unchanged": 0, "collapsed": 0}
+
+    changed = [{**it, "price": 2.1} for it in items[:3]]
+    r = client.post("/odds", headers=writer_headers, json={"items": changed})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 0, "updated": 3, "unchanged": 0, "collapsed": 0}
+
+
+def test_post_predictions_chunked_counts(client, writer_headers, monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_CHUNK_SIZE", 2)
+    match_id = f"m_chunk_{uuid.uuid4().hex[:8]}"
+    items = [
+        {
+            "match_id": match_id,
+            "model_id": MODEL_ID,
+            "version": f"v{i}",
+            "selection_id": SELECTION_ID,
+            "probability": 0.5,
+            "odds_fair": None,
+            "features": {"i": i} if i % 2 else None,
+            "predicted_at": "2031-02-01T00:00:00Z",
+        }
+        for i in range(5)
+    ]
+    r = client.post("/predictions", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 5, "updated": 0}
+
+    r = client.post("/predictions", headers=writer_headers, json={"items": items})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"inserted": 0, "updated": 5}